@@ -9,9 +9,14 @@ from utility.audio.audio_generator import generate_audio
 from utility.captions.timed_captions_generator import generate_timed_captions
 from utility.video.background_video_generator import generate_video_url
 from utility.render.render_engine import get_output_media
+from utility.render.render_context import RenderContext
+from utility.utils import get_media_duration
 from utility.video.video_search_query_generator import getVideoSearchQueriesTimed, merge_empty_intervals
-from utility.templates.template_manager import TemplateManager
+from utility.templates.template_manager import get_template_manager
 from utility.render.template_render_engine import TemplateRenderEngine
+from utility.captions.subtitle_writer import SUBTITLE_MODES
+from utility.render.segment_renderer import RENDER_MODES
+from utility.render.encoder_profiles import ENCODER_PROFILES
 import argparse
 
 # Importar banco de dados apenas quando necessário
@@ -22,7 +27,7 @@ except Exception as e:
     print(f"⚠️ Banco de dados não disponível: {e}")
     DB_AVAILABLE = False
 
-async def generate_video_with_template(topic: str, template_id: str = None, credentials_name: str = "default", use_db: bool = True):
+async def generate_video_with_template(topic: str, template_id: str = None, credentials_name: str = "default", use_db: bool = True, render_options: dict = None):
     """Gera vídeo com template aplicado"""
     
     print(f"🎬 INICIANDO GERAÇÃO DE VÍDEO")
@@ -31,7 +36,7 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
     print("="*60)
     
     # Inicializar sistema de templates
-    template_manager = TemplateManager()
+    template_manager = get_template_manager()
     template_render_engine = TemplateRenderEngine()
     
     # Auto-detect template se não especificado
@@ -81,18 +86,23 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
             print(f"⚠️ Erro ao conectar com banco: {e}. Continuando sem banco...")
             use_db = False
     
+    # Workspace isolado do job (áudio, clips, configurações e saída)
+    context = RenderContext(video_id)
+    
     try:
         # Aplicar template se especificado
+        render_plan = None
         if template_id:
             print(f"🎨 APLICANDO TEMPLATE: {template_id}")
             template = template_manager.get_template(template_id)
             if template:
                 # Aplicar configurações do template
-                template_render_engine.apply_template_to_video(
+                render_plan = template_render_engine.apply_template_to_video(
                     video_path="",  # Será definido depois
                     template_id=template_id,
                     script="",  # Será definido depois
-                    audio_path=""  # Será definido depois
+                    audio_path="",  # Será definido depois
+                    context=context
                 )
             else:
                 print(f"⚠️ Template {template_id} não encontrado, usando geração padrão")
@@ -103,10 +113,10 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
         
         # Atualizar script no banco se estiver usando
         if use_db and video_id:
-            await db.update_video_status(video_id, "PROCESSING")
+            await db.update_video_script(video_id, response)
         
         # Gerar áudio
-        SAMPLE_FILE_NAME = f"audio_tts_{video_id}.wav" if video_id else "audio_tts.wav"
+        SAMPLE_FILE_NAME = context.audio_path
         await generate_audio(response, SAMPLE_FILE_NAME)
         print(f"🎵 Áudio gerado: {SAMPLE_FILE_NAME}")
         
@@ -133,7 +143,9 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
         # Renderizar vídeo final
         if background_video_urls is not None:
             print("🎬 Iniciando renderização com template...")
-            output_video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls, VIDEO_SERVER)
+            output_video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls, VIDEO_SERVER,
+                                            context=context, render_plan=render_plan,
+                                            **(render_options or {}))
             print(f"✅ Vídeo renderizado: {output_video}")
             
             # Atualizar banco com caminhos dos arquivos
@@ -143,7 +155,7 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
                     status="COMPLETED",
                     audio_path=SAMPLE_FILE_NAME,
                     video_path=output_video,
-                    duration=42.5  # Você pode calcular a duração real
+                    duration=get_media_duration(output_video)
                 )
                 print(f"✅ Vídeo '{topic}' gerado com sucesso!")
                 print(f"📁 Arquivo: {output_video}")
@@ -166,7 +178,7 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
         if db:
             await db.disconnect()
 
-async def generate_video_with_db(topic: str, credentials_name: str = "default", use_db: bool = True):
+async def generate_video_with_db(topic: str, credentials_name: str = "default", use_db: bool = True, render_options: dict = None):
     """Gera vídeo e salva no banco de dados (método original)"""
     
     db = None
@@ -207,6 +219,9 @@ async def generate_video_with_db(topic: str, credentials_name: str = "default",
             print(f"⚠️ Erro ao conectar com banco: {e}. Continuando sem banco...")
             use_db = False
     
+    # Workspace isolado do job (áudio, clips, configurações e saída)
+    context = RenderContext(video_id)
+    
     try:
         # Gerar script
         response = generate_script(topic)
@@ -214,10 +229,10 @@ async def generate_video_with_db(topic: str, credentials_name: str = "default",
         
         # Atualizar script no banco se estiver usando
         if use_db and video_id:
-            await db.update_video_status(video_id, "PROCESSING")
+            await db.update_video_script(video_id, response)
         
         # Gerar áudio
-        SAMPLE_FILE_NAME = f"audio_tts_{video_id}.wav" if video_id else "audio_tts.wav"
+        SAMPLE_FILE_NAME = context.audio_path
         await generate_audio(response, SAMPLE_FILE_NAME)
         
         # Gerar legendas
@@ -242,7 +257,8 @@ async def generate_video_with_db(topic: str, credentials_name: str = "default",
         
         # Renderizar vídeo final
         if background_video_urls is not None:
-            output_video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls, VIDEO_SERVER)
+            output_video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls, VIDEO_SERVER,
+                                            context=context, **(render_options or {}))
             print(f"Vídeo renderizado: {output_video}")
             
             # Atualizar banco com caminhos dos arquivos
@@ -252,7 +268,7 @@ async def generate_video_with_db(topic: str, credentials_name: str = "default",
                     status="COMPLETED",
                     audio_path=SAMPLE_FILE_NAME,
                     video_path=output_video,
-                    duration=42.5  # Você pode calcular a duração real
+                    duration=get_media_duration(output_video)
                 )
                 print(f"✅ Vídeo '{topic}' gerado com sucesso!")
                 print(f"📁 Arquivo: {output_video}")
@@ -284,6 +300,13 @@ if __name__ == "__main__":
     parser.add_argument("--list-templates", action="store_true", help="List available templates")
     parser.add_argument("--suggest", type=str, help="Get template suggestions for a topic")
     parser.add_argument("--preview", type=str, help="Preview template assets")
+    parser.add_argument("--subtitles", type=str, default="burn", choices=SUBTITLE_MODES,
+                        help="Caption output: burned into frames, sidecar file (srt/vtt/ass) or muxed track (mov_text/ass_stream)")
+    parser.add_argument("--render-mode", type=str, default="single", choices=RENDER_MODES,
+                        help="Render the whole video in one encode or in parallel segments")
+    parser.add_argument("--workers", type=int, help="Number of processes for segmented rendering (default: CPU count)")
+    parser.add_argument("--profile", type=str, choices=list(ENCODER_PROFILES),
+                        help="Encoder profile: draft/preview for fast approval renders, standard or archival (default: template setting or standard)")
 
     args = parser.parse_args()
     
@@ -291,7 +314,7 @@ if __name__ == "__main__":
     
     # Listar templates
     if args.list_templates:
-        template_manager = TemplateManager()
+        template_manager = get_template_manager()
         templates = template_manager.list_templates()
         print("🎨 TEMPLATES DISPONÍVEIS:")
         print("="*50)
@@ -336,8 +359,15 @@ if __name__ == "__main__":
         parser.print_help()
         exit(1)
     
+    render_options = {
+        'subtitle_mode': args.subtitles,
+        'render_mode': args.render_mode,
+        'workers': args.workers,
+        'encoder_profile': args.profile
+    }
+    
     # Gerar vídeo com template se especificado
     if args.template:
-        asyncio.run(generate_video_with_template(args.topic, args.template, args.credentials, use_db))
+        asyncio.run(generate_video_with_template(args.topic, args.template, args.credentials, use_db, render_options))
     else:
-        asyncio.run(generate_video_with_db(args.topic, args.credentials, use_db))
\ No newline at end of file
+        asyncio.run(generate_video_with_db(args.topic, args.credentials, use_db, render_options))
\ No newline at end of file
@@ -10,10 +10,12 @@ from utility.audio.audio_generator import generate_audio
 from utility.captions.timed_captions_generator import generate_timed_captions
 from utility.video.background_video_generator import generate_video_url
 from utility.render.render_engine import get_output_media
+from utility.render.render_context import RenderContext
+from utility.utils import get_media_duration
 from utility.video.video_search_query_generator import getVideoSearchQueriesTimed, merge_empty_intervals
 
 # Importar sistema de templates
-from utility.templates.template_manager import TemplateManager
+from utility.templates.template_manager import get_template_manager
 from utility.script.template_script_generator import TemplateScriptGenerator
 from utility.render.template_render_engine import TemplateRenderEngine
 
@@ -85,6 +87,9 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
             print(f"⚠️ Erro ao conectar com banco: {e}. Continuando sem banco...")
             use_db = False
     
+    # Workspace isolado do job (áudio, clips, configurações e saída)
+    context = RenderContext(video_id)
+    
     try:
         # Gerar script usando template ou método padrão
         if template_id:
@@ -105,10 +110,10 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
         
         # Atualizar script no banco se estiver usando
         if use_db and video_id:
-            await db.update_video_status(video_id, "PROCESSING")
+            await db.update_video_script(video_id, response)
         
         # Gerar áudio
-        SAMPLE_FILE_NAME = f"audio_tts_{video_id}.wav" if video_id else "audio_tts.wav"
+        SAMPLE_FILE_NAME = context.audio_path
         await generate_audio(response, SAMPLE_FILE_NAME)
         
         # Gerar legendas
@@ -133,7 +138,8 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
         
         # Renderizar vídeo final
         if background_video_urls is not None:
-            output_video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls, VIDEO_SERVER)
+            output_video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls, VIDEO_SERVER,
+                                            context=context)
             print(f"✅ Vídeo renderizado: {output_video}")
             
             # Atualizar banco com caminhos dos arquivos
@@ -143,7 +149,7 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
                     status="COMPLETED",
                     audio_path=SAMPLE_FILE_NAME,
                     video_path=output_video,
-                    duration=42.5  # Você pode calcular a duração real
+                    duration=get_media_duration(output_video)
                 )
                 print(f"✅ Vídeo '{topic}' gerado com sucesso!")
                 print(f"📁 Arquivo: {output_video}")
@@ -168,7 +174,7 @@ async def generate_video_with_template(topic: str, template_id: str = None, cred
 
 def list_templates():
     """Lista todos os templates disponíveis"""
-    template_manager = TemplateManager()
+    template_manager = get_template_manager()
     templates = template_manager.list_templates()
     
     print("📋 TEMPLATES DISPONÍVEIS:")
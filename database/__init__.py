@@ -1,3 +1,4 @@
 from .database import VideoDatabase
+from .service import DatabaseService, get_database_service
 
-__all__ = ['VideoDatabase'] 
\ No newline at end of file
+__all__ = ['VideoDatabase', 'DatabaseService', 'get_database_service']
@@ -1,12 +1,14 @@
 import os
 import asyncio
 from prisma import Prisma
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
+from utility.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
 class VideoDatabase:
-    def __init__(self):
-        self.db = Prisma()
+    def __init__(self, datasource_url: Optional[str] = None):
+        self.db = Prisma(datasource={'url': datasource_url}) if datasource_url else Prisma()
     
     async def connect(self):
         await self.db.connect()
@@ -47,7 +49,8 @@ class VideoDatabase:
     async def update_video_status(self, video_id: str, status: str, 
                                  audio_path: Optional[str] = None, 
                                  video_path: Optional[str] = None,
-                                 duration: Optional[float] = None):
+                                 duration: Optional[float] = None,
+                                 preview_hash: Optional[str] = None):
         """Atualiza o status e caminhos do vídeo"""
         return await self.db.video.update({
             'where': {'id': video_id},
@@ -55,10 +58,70 @@ class VideoDatabase:
                 'status': status,
                 'audioPath': audio_path,
                 'videoPath': video_path,
-                'duration': duration
+                'duration': duration,
+                'previewHash': preview_hash
             }
         })
     
+    async def update_video_script(self, video_id: str, script: str):
+        """Salva o script gerado"""
+        return await self.db.video.update({
+            'where': {'id': video_id},
+            'data': {'script': script}
+        })
+    
+    async def start_stage(self, video_id: str, stage: str):
+        """Registra o início de uma etapa do pipeline"""
+        return await self.db.pipelinestage.create({
+            'data': {
+                'videoId': video_id,
+                'stage': stage,
+                'status': 'RUNNING'
+            }
+        })
+    
+    async def finish_stage(self, stage_id: str, status: str, duration_ms: int, cache_hit: bool = False,
+                           bytes_downloaded: int = 0, artifact_hash: Optional[str] = None,
+                           artifact_path: Optional[str] = None, error: Optional[str] = None):
+        """Registra o fim de uma etapa: tempo, cache, bytes baixados e hash do artefato"""
+        return await self.db.pipelinestage.update({
+            'where': {'id': stage_id},
+            'data': {
+                'status': status,
+                'finishedAt': datetime.now(timezone.utc),
+                'durationMs': duration_ms,
+                'cacheHit': cache_hit,
+                'bytesDownloaded': bytes_downloaded,
+                'artifactHash': artifact_hash,
+                'artifactPath': artifact_path,
+                'error': error
+            }
+        })
+    
+    async def list_stages(self, video_id: str):
+        """Etapas registradas de um vídeo, em ordem de execução"""
+        return await self.db.pipelinestage.find_many(
+            where={'videoId': video_id},
+            order={'startedAt': 'asc'}
+        )
+    
+    async def stage_latency_stats(self, days: int = 7):
+        """p50/p95 de duração por etapa nos últimos dias (PostgreSQL percentile_cont)"""
+        return await self.db.query_raw(
+            '''
+            SELECT stage,
+                   COUNT(*) AS runs,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY "durationMs") AS p50_ms,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY "durationMs") AS p95_ms,
+                   AVG(CASE WHEN "cacheHit" THEN 1.0 ELSE 0.0 END) AS cache_hit_ratio
+            FROM pipeline_stages
+            WHERE status = 'COMPLETED' AND "startedAt" > NOW() - make_interval(days => $1)
+            GROUP BY stage
+            ORDER BY stage
+            ''',
+            days
+        )
+    
     async def get_video(self, video_id: str):
         """Busca um vídeo por ID"""
         return await self.db.video.find_unique({
@@ -67,12 +130,40 @@ class VideoDatabase:
         })
     
     async def list_videos(self, limit: int = 10):
-        """Lista os vídeos mais recentes"""
-        return await self.db.video.find_many(
-            take=limit,
-            order=[{'createdAt': 'desc'}],
-            include={'credentials': True}
+        """Lista os vídeos mais recentes (sem carregar as credenciais)"""
+        videos, _ = await self.list_videos_page(limit=limit)
+        return videos
+    
+    async def list_videos_page(self, limit: int = 20, cursor: Optional[str] = None,
+                               status: Optional[str] = None, topic: Optional[str] = None):
+        """Página de vídeos do mais novo para o mais antigo: (vídeos, próximo cursor)
+        
+        Paginação por chave (createdAt, id): cada página é uma busca no índice, sem OFFSET.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = []
+        if status:
+            filters.append({'status': status})
+        if topic:
+            filters.append({'topic': {'contains': topic, 'mode': 'insensitive'}})
+        if cursor:
+            created_at, video_id = decode_cursor(cursor)
+            filters.append({'OR': [
+                {'createdAt': {'lt': created_at}},
+                {'createdAt': created_at, 'id': {'lt': video_id}}
+            ]})
+        
+        # Um item a mais indica se existe próxima página
+        videos = await self.db.video.find_many(
+            where={'AND': filters} if filters else None,
+            take=limit + 1,
+            order=[{'createdAt': 'desc'}, {'id': 'desc'}]
         )
+        next_cursor = None
+        if len(videos) > limit:
+            videos = videos[:limit]
+            next_cursor = encode_cursor(videos[-1].createdAt, videos[-1].id)
+        return videos, next_cursor
     
     async def delete_video(self, video_id: str):
         """Deleta um vídeo"""
@@ -0,0 +1,99 @@
+import asyncio
+import atexit
+import os
+import threading
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .database import VideoDatabase
+
+# Tempo máximo (s) de uma chamada ao banco feita a partir de código síncrono
+DB_CALL_TIMEOUT = float(os.environ.get("DB_CALL_TIMEOUT", "15"))
+
+# Conexões no pool do query engine do Prisma (vazio = padrão do Prisma)
+DB_CONNECTION_LIMIT = os.environ.get("DB_CONNECTION_LIMIT", "")
+
+# Credenciais usadas pelos vídeos criados pelo servidor
+DEFAULT_CREDENTIALS = "default"
+
+def pooled_database_url(url: Optional[str] = None, connection_limit: str = DB_CONNECTION_LIMIT) -> Optional[str]:
+    """DATABASE_URL com o tamanho do pool de conexões definido"""
+    url = url or os.environ.get("DATABASE_URL")
+    if not url or not connection_limit:
+        return None
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query['connection_limit'] = connection_limit
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+class DatabaseService:
+    """Conexão Prisma persistente em um event loop dedicado, com ponte síncrona
+
+    Métodos assíncronos do VideoDatabase ficam disponíveis como chamadas síncronas:
+    service.list_videos() executa db.list_videos() no loop do serviço e devolve o resultado.
+    """
+
+    def __init__(self, database: Optional[VideoDatabase] = None):
+        self.database = database or VideoDatabase(datasource_url=pooled_database_url())
+        self.loop = asyncio.new_event_loop()
+        self._connect_lock = asyncio.Lock()
+        self._default_credentials_id = None
+        self._thread = threading.Thread(target=self._run_loop, name="db-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _ensure_connected(self):
+        """Conecta na primeira chamada (e reconecta se a conexão caiu)"""
+        async with self._connect_lock:
+            if not self.database.db.is_connected():
+                await self.database.connect()
+                print("🗄️ Conexão com o banco aberta")
+
+    def run(self, method, *args, timeout: float = DB_CALL_TIMEOUT, **kwargs):
+        """Executa um método assíncrono do banco no loop do serviço e espera o resultado"""
+        async def call():
+            await self._ensure_connected()
+            return await method(*args, **kwargs)
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result(timeout)
+
+    def __getattr__(self, name):
+        method = getattr(self.database, name)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+        return lambda *args, **kwargs: self.run(method, *args, **kwargs)
+
+    def default_credentials_id(self) -> Optional[str]:
+        """ID das credenciais padrão (consultado uma vez)"""
+        if self._default_credentials_id is None:
+            credentials = self.get_credentials(DEFAULT_CREDENTIALS)
+            if credentials:
+                self._default_credentials_id = credentials.id
+        return self._default_credentials_id
+
+    def close(self):
+        """Desconecta e encerra o loop do serviço"""
+        if not self.loop.is_running():
+            return
+        try:
+            if self.database.db.is_connected():
+                asyncio.run_coroutine_threadsafe(self.database.disconnect(), self.loop).result(DB_CALL_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Erro ao desconectar do banco: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+_service: Optional[DatabaseService] = None
+_service_lock = threading.Lock()
+
+def get_database_service() -> DatabaseService:
+    """Serviço de banco compartilhado do processo (conexão aberta no primeiro uso)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = DatabaseService()
+                atexit.register(_service.close)
+    return _service
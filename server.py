@@ -5,31 +5,39 @@ Gerencia criação, status e visualização de vídeos
 """
 
 import os
-import asyncio
 import json
 import uuid
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
-from flask_socketio import SocketIO, emit
+import mimetypes
+from urllib.parse import quote
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, send_file
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import threading
 import time
 
 # Importar módulos do projeto
-from utility.script.script_generator import generate_script
-from utility.audio.audio_generator import generate_audio
-from utility.captions.timed_captions_generator import generate_timed_captions
-from utility.video.background_video_generator import generate_video_url
-from utility.render.render_engine import get_output_media
-from utility.video.video_search_query_generator import getVideoSearchQueriesTimed, merge_empty_intervals
+from utility.captions.subtitle_writer import SUBTITLE_MODES
+from utility.render.segment_renderer import RENDER_MODES
+from utility.render.encoder_profiles import ENCODER_PROFILES
+from utility.render.render_context import RENDER_WORKDIR
+from utility.render.previews import preview_path
+from utility.pagination import MAX_PAGE_SIZE, VIDEO_STATUSES, decode_cursor, encode_cursor
 
 # Importar sistema de templates
-from utility.templates.template_manager import TemplateManager
+from utility.templates.template_manager import get_template_manager
 from utility.script.template_script_generator import TemplateScriptGenerator
-from utility.render.template_render_engine import TemplateRenderEngine
+from utility.templates.asset_catalog import get_asset_catalog
+
+# Pipeline de geração e execução dos jobs (agendador local ou workers via broker)
+from utility.jobs.pipeline import JobReporter, build_job_state, schedule_pipeline, update_db_status
+from utility.jobs.scheduler import get_job_scheduler, PRIORITIES, QueueFullError, SCHEDULER_MAX_QUEUE
+from utility.jobs.broker import get_job_broker
+from utility.jobs.notifier import RoomNotifier, job_room
+from utility.jobs.registry import FINISHED_STATUSES, JobArchive, JobRegistry
 
 # Importar banco de dados (opcional)
 try:
-    from database import VideoDatabase
+    from database import get_database_service
     DB_AVAILABLE = True
 except Exception as e:
     print(f"⚠️ Banco de dados não disponível: {e}")
@@ -39,28 +47,81 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'textoemvideos_secret_key_2024'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Armazenamento temporário de jobs (se não houver banco)
-jobs = {}
-completed_videos = {}
+# Itens por página em /api/jobs quando o cliente não informa limit
+DEFAULT_PAGE_SIZE = 20
+
+# Sugestão (s) de nova tentativa quando a fila está cheia
+QUEUE_RETRY_AFTER = 30
+
+# Onde os jobs rodam: "inline" (threads deste processo) ou "worker" (python -m utility.jobs.worker)
+JOB_EXECUTION = os.environ.get("JOB_EXECUTION", "inline")
+
+# Entrega de mídia: "flask" (o próprio Flask envia, com Range/ETag), "x-accel" (nginx) ou "x-sendfile" (Apache)
+MEDIA_OFFLOAD = os.environ.get("MEDIA_OFFLOAD", "flask")
+
+# Location interna do nginx que aponta para RENDER_WORKDIR (ex.: location /_media/ { internal; alias /app/renders/; })
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/_media/")
+
+# Cache (s) de vídeos finalizados no navegador/CDN; a revalidação usa ETag e Last-Modified
+MEDIA_MAX_AGE = int(os.environ.get("MEDIA_MAX_AGE", "86400"))
+
+# Cache (s) das prévias: endereçadas pelo hash do vídeo, nunca mudam
+PREVIEW_MAX_AGE = 365 * 24 * 3600
+
+app.config['USE_X_SENDFILE'] = MEDIA_OFFLOAD == 'x-sendfile'
+
+# Eventos de job entregues só à sala dos inscritos, com limite de taxa por sala
+room_notifier = RoomNotifier(lambda event, data, room: socketio.emit(event, data, to=room))
+
+# Intervalo (s) de leitura dos eventos publicados pelos workers
+RELAY_INTERVAL = float(os.environ.get("RELAY_INTERVAL", "0.5"))
+
+# Jobs em memória: ativos sempre, finalizados até o TTL/limite (depois só no banco ou no arquivo SQLite)
+jobs = JobRegistry()
 
 # Inicializar sistema de templates
-template_manager = TemplateManager()
+template_manager = get_template_manager()
 template_script_generator = TemplateScriptGenerator()
-template_render_engine = TemplateRenderEngine()
+
+# Modo worker: o servidor só enfileira e retransmite; nenhum pool de render neste processo
+job_scheduler = get_job_scheduler() if JOB_EXECUTION != 'worker' else None
+job_broker = get_job_broker() if JOB_EXECUTION == 'worker' else None
+
+# Conexão com o banco de longa duração (loop asyncio dedicado)
+db_service = get_database_service() if DB_AVAILABLE else None
+
+# Sem banco, os jobs finalizados são gravados em SQLite para sobreviver à saída da memória
+job_archive = JobArchive() if not DB_AVAILABLE else None
 
 class VideoJob:
-    def __init__(self, topic, user_id=None, template_id=None):
+    __slots__ = ('id', 'topic', 'user_id', 'template_id', 'render_options', 'priority', 'seed',
+                 'script_template_id', 'use_db', 'status', 'progress', 'stage', 'eta', 'progress_detail',
+                 'created_at', 'updated_at', 'video_path', 'audio_path', 'duration', 'preview_hash', 'error')
+    
+    def __init__(self, topic, user_id=None, template_id=None, render_options=None, priority='normal',
+                 seed=None, script_template_id=None):
         self.id = str(uuid.uuid4())
         self.topic = topic
         self.user_id = user_id
         self.template_id = template_id
+        self.render_options = render_options or {}
+        self.priority = priority
+        # Linhagem do conteúdo (checkpoints): re-renders herdam seed e template do script do job original
+        self.seed = seed
+        self.script_template_id = script_template_id if script_template_id is not None else template_id
+        self.use_db = False
         self.status = "PENDING"
         self.progress = 0
+        # Etapa em execução, segundos restantes estimados da etapa e detalhe ("codificação", "download 2/5")
+        self.stage = None
+        self.eta = None
+        self.progress_detail = None
         self.created_at = datetime.now()
         self.updated_at = datetime.now()
         self.video_path = None
         self.audio_path = None
         self.duration = None
+        self.preview_hash = None
         self.error = None
 
     def to_dict(self):
@@ -68,232 +129,317 @@ class VideoJob:
             'id': self.id,
             'topic': self.topic,
             'template_id': self.template_id,
+            'render_options': self.render_options,
+            'priority': self.priority,
+            'seed': self.seed or self.id,
+            'script_template_id': self.script_template_id,
             'status': self.status,
             'progress': self.progress,
+            'stage': self.stage,
+            'eta': self.eta,
+            'progress_detail': self.progress_detail,
+            'queue_position': job_queue_position(self.id),
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'video_path': self.video_path,
             'audio_path': self.audio_path,
             'duration': self.duration,
+            **preview_urls(self.preview_hash),
             'error': self.error
         }
 
-def update_job_progress(job_id, progress, status=None):
-    """Atualiza progresso do job e notifica via WebSocket"""
-    if job_id in jobs:
-        jobs[job_id].progress = progress
-        if status:
-            jobs[job_id].status = status
-        jobs[job_id].updated_at = datetime.now()
-        
-        # Emitir atualização via WebSocket
-        socketio.emit('job_update', {
-            'job_id': job_id,
-            'progress': progress,
-            'status': jobs[job_id].status
-        })
+def job_update_payload(job):
+    """Estado do job enviado no evento job_update (e repetido a quem se inscreve)"""
+    return {
+        'job_id': job.id,
+        'progress': job.progress,
+        'status': job.status,
+        'stage': job.stage,
+        'eta': job.eta,
+        'detail': job.progress_detail
+    }
 
-async def generate_video_async(job_id, topic, template_id=None, use_db=False):
-    """Gera vídeo de forma assíncrona com suporte a templates"""
+def archive_finished_job(job):
+    """Grava o job finalizado no arquivo SQLite (modo sem banco; com banco o vídeo já tem o status final)"""
+    if job_archive is None or job.status not in FINISHED_STATUSES:
+        return
     try:
-        job = jobs[job_id]
-        update_job_progress(job_id, 10, "PROCESSING")
-        
-        # Verificar se as variáveis de ambiente estão configuradas
-        if not os.environ.get("GROQ_API_KEY"):
-            raise Exception("GROQ_API_KEY não configurada. Configure a variável de ambiente.")
-        if not os.environ.get("PEXELS_KEY"):
-            raise Exception("PEXELS_KEY não configurada. Configure a variável de ambiente.")
-        
-        # 1. Gerar script (com ou sem template)
-        update_job_progress(job_id, 20)
-        if template_id:
-            print(f"🎨 Usando template: {template_id}")
-            script_result = template_script_generator.generate_script_with_pauses(topic, template_id)
-            if 'error' in script_result:
-                print(f"❌ Erro no template: {script_result['error']}")
-                print("🔄 Usando geração padrão...")
-                response = generate_script(topic)
-            else:
-                response = script_result['script']
-                print(f"✅ Script gerado com template: {len(response.split())} palavras")
-        else:
-            print("📝 Usando geração padrão de script")
-            response = generate_script(topic)
-        
-        print(f"Script gerado: {response[:100]}...")
-        
-        # 3. Gerar áudio
-        update_job_progress(job_id, 40)
-        audio_filename = f"audio_tts_{job_id}.wav"
-        await generate_audio(response, audio_filename)
-        print(f"Áudio gerado: {audio_filename}")
-        
-        # 4. Gerar legendas
-        update_job_progress(job_id, 50)
-        timed_captions = generate_timed_captions(audio_filename)
-        print(f"Legendas geradas: {len(timed_captions)} segmentos")
-        
-        # 4.5. Aplicar template com timestamps reais se especificado
-        if template_id:
-            print(f"🎨 APLICANDO TEMPLATE COM TIMESTAMPS REAIS: {template_id}")
-            template = template_manager.get_template(template_id)
-            if template:
-                # Aplicar configurações do template usando timestamps reais
-                template_render_engine.apply_template_to_video(
-                    video_path="",  # Será definido depois
-                    template_id=template_id,
-                    script=response,  # Script já gerado
-                    audio_path=audio_filename  # Áudio já gerado
-                )
-                print(f"✅ Template {template_id} aplicado com timestamps reais!")
-            else:
-                print(f"⚠️ Template {template_id} não encontrado, usando geração padrão")
-        
-        # 5. Gerar termos de busca
-        update_job_progress(job_id, 60)
-        search_terms = getVideoSearchQueriesTimed(response, timed_captions)
-        print(f"Termos de busca gerados: {len(search_terms) if search_terms else 0}")
+        job_archive.save(job.id, job.created_at, job.status, job.topic, job.to_dict())
+    except Exception as e:
+        print(f"⚠️ Erro ao arquivar job {job.id}: {e}")
+
+def find_job(job_id):
+    """Estado do job: em memória, no arquivo SQLite ou no banco (None se desconhecido)"""
+    job = jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    if job_archive is not None:
+        return job_archive.get(job_id)
+    if DB_AVAILABLE:
+        try:
+            video = db_service.get_video(job_id)
+            return video_summary(video) if video else None
+        except Exception as e:
+            print(f"⚠️ Erro ao buscar job no banco: {e}")
+    return None
+
+def restore_job(job_id):
+    """VideoJob de um job já fora da memória (arquivo SQLite ou banco), para repetir ou re-renderizar"""
+    record = find_job(job_id)
+    if record is None:
+        return None
+    job = VideoJob(topic=record['topic'], template_id=record.get('template_id'),
+                   render_options=record.get('render_options'), priority=record.get('priority', 'normal'),
+                   seed=record.get('seed'), script_template_id=record.get('script_template_id'))
+    job.id = record['id']
+    # Com banco o registro veio dele; o arquivo SQLite só existe no modo sem banco
+    job.use_db = job_archive is None and DB_AVAILABLE
+    job.status = record['status']
+    job.progress = record.get('progress', 0)
+    job.created_at = datetime.fromisoformat(record['created_at'])
+    job.video_path = record.get('video_path')
+    job.audio_path = record.get('audio_path')
+    job.duration = record.get('duration')
+    job.error = record.get('error')
+    return job
+
+def update_job_progress(job_id, progress, status=None, stage=None, eta=None, detail=None):
+    """Atualiza progresso do job e notifica os inscritos via WebSocket"""
+    job = jobs.get(job_id)
+    if job is not None:
+        # Mudança de status ou de etapa sai na hora; progresso dentro da etapa respeita o limite da sala
+        urgent = (status is not None and status != job.status) or (stage is not None and stage != job.stage)
+        job.progress = progress
+        if status:
+            job.status = status
+        # ETA e detalhe valem só para a etapa que os reportou
+        if stage or status:
+            job.stage = stage or job.stage
+            job.eta = eta
+            job.progress_detail = detail
+        job.updated_at = datetime.now()
+        if status:
+            archive_finished_job(job)
+            jobs.update_status(job_id, job.status)
         
-        # 6. Buscar vídeos de fundo
-        update_job_progress(job_id, 70)
-        background_video_urls = None
-        if search_terms:
-            background_video_urls = generate_video_url(search_terms, "pexel")
-            if background_video_urls:
-                background_video_urls = merge_empty_intervals(background_video_urls)
-                print(f"Vídeos de fundo encontrados: {len(background_video_urls)}")
-            else:
-                print("Nenhum vídeo de fundo encontrado")
+        # Emitir atualização para a sala do job
+        room_notifier.update(job_id, job_update_payload(job), urgent=urgent)
+
+class SocketIOReporter(JobReporter):
+    """Aplica os eventos do pipeline aos jobs em memória e notifica via WebSocket"""
+    
+    def stage_started(self, job_id, stage, progress):
+        update_job_progress(job_id, progress, "PROCESSING", stage=stage)
+    
+    def progress(self, job_id, stage, progress, eta, detail):
+        update_job_progress(job_id, progress, stage=stage, eta=eta, detail=detail)
+    
+    def completed(self, job_id, result):
+        job = jobs.get(job_id)
+        if job is None:
+            return
         
-        # 7. Renderizar vídeo final (com template aplicado)
-        update_job_progress(job_id, 80)
-        if background_video_urls:
-            print("🎬 Iniciando renderização com template...")
-            output_video = get_output_media(audio_filename, timed_captions, background_video_urls, "pexel")
-            print(f"Vídeo renderizado: {output_video}")
-            
-            # Atualizar job com sucesso
-            job.video_path = output_video
-            job.audio_path = audio_filename
-            job.duration = 42.5  # Duração estimada
-            update_job_progress(job_id, 100, "COMPLETED")
-            
-            # Salvar no banco se disponível
-            if use_db and DB_AVAILABLE:
-                try:
-                    db = VideoDatabase()
-                    await db.connect()
-                    await db.update_video_status(
-                        video_id=job_id,
-                        status="COMPLETED",
-                        audio_path=audio_filename,
-                        video_path=output_video,
-                        duration=42.5
-                    )
-                    await db.disconnect()
-                except Exception as e:
-                    print(f"⚠️ Erro ao salvar no banco: {e}")
-            
-            # Emitir evento de conclusão
-            socketio.emit('job_completed', {
-                'job_id': job_id,
-                'video_path': output_video,
-                'duration': 42.5
-            })
-            
-        else:
-            raise Exception("Não foi possível encontrar vídeos de fundo adequados")
-            
-    except Exception as e:
-        print(f"❌ Erro na geração: {e}")
-        job.error = str(e)
-        update_job_progress(job_id, 0, "FAILED")
+        # Atualizar job com sucesso
+        job.video_path = result['video_path']
+        job.audio_path = result['audio_path']
+        job.duration = result['duration']
+        job.preview_hash = result.get('preview_hash')
+        update_job_progress(job_id, 100, "COMPLETED")
         
-        # Salvar erro no banco se disponível
-        if use_db and DB_AVAILABLE:
-            try:
-                db = VideoDatabase()
-                await db.connect()
-                await db.update_video_status(job_id, "FAILED")
-                await db.disconnect()
-            except Exception as db_error:
-                print(f"⚠️ Erro ao salvar erro no banco: {db_error}")
+        # Emitir evento de conclusão
+        room_notifier.event(job_id, 'job_completed', {
+            'job_id': job_id,
+            'video_path': job.video_path,
+            'duration': job.duration
+        })
+    
+    def failed(self, job_id, error):
+        if job_id in jobs:
+            jobs[job_id].error = error
+            update_job_progress(job_id, 0, "FAILED")
         
         # Emitir evento de falha
-        socketio.emit('job_failed', {
+        room_notifier.event(job_id, 'job_failed', {
             'job_id': job_id,
-            'error': str(e)
+            'error': error
         })
+    
+    def cancelled(self, job_id):
+        if job_id in jobs:
+            update_job_progress(job_id, jobs[job_id].progress, "CANCELLED")
+        room_notifier.event(job_id, 'job_cancelled', {'job_id': job_id})
 
-def run_async_generation(job_id, topic, template_id=None, use_db=False):
-    """Executa geração de vídeo em thread separada"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(generate_video_async(job_id, topic, template_id, use_db))
-    finally:
-        loop.close()
+job_reporter = SocketIOReporter()
+
+# Eventos publicados pelos workers no broker -> métodos do reporter
+BROKER_EVENTS = {
+    'stage': lambda job_id, data: job_reporter.stage_started(job_id, data['stage'], data['progress']),
+    'progress': lambda job_id, data: job_reporter.progress(job_id, data['stage'], data['progress'],
+                                                           data.get('eta'), data.get('detail')),
+    'completed': lambda job_id, data: job_reporter.completed(job_id, data),
+    'failed': lambda job_id, data: job_reporter.failed(job_id, data['error']),
+    'cancelled': lambda job_id, data: job_reporter.cancelled(job_id),
+}
+
+def relay_broker_events():
+    """Retransmite os eventos dos workers (broker) para os clientes WebSocket"""
+    last_seq = job_broker.last_seq()
+    last_prune = time.time()
+    while True:
+        try:
+            events = job_broker.events_since(last_seq)
+            # Coalescer: de vários eventos de progresso do mesmo job no lote, só o último é retransmitido
+            latest_progress = {job_id: seq for seq, job_id, event, _ in events if event == 'progress'}
+            for seq, job_id, event, data in events:
+                last_seq = seq
+                if event == 'progress' and latest_progress[job_id] != seq:
+                    continue
+                handler = BROKER_EVENTS.get(event)
+                if handler:
+                    handler(job_id, data)
+            if time.time() - last_prune > 60:
+                job_broker.prune_events()
+                last_prune = time.time()
+            if not events:
+                time.sleep(RELAY_INTERVAL)
+        except Exception as e:
+            print(f"⚠️ Erro ao retransmitir eventos do broker: {e}")
+            time.sleep(RELAY_INTERVAL)
+
+def submit_job(job):
+    """Enfileira o job no agendador local ou no broker dos workers; retorna a posição na fila"""
+    state = build_job_state(job.topic, job.template_id, job.render_options, job.use_db,
+                            seed=job.seed or job.id, script_template_id=job.script_template_id)
+    if JOB_EXECUTION == 'worker':
+        payload = {'state': state, 'priority': job.priority}
+        return job_broker.enqueue(job.id, payload, priority=job.priority, max_queue=SCHEDULER_MAX_QUEUE)
+    return schedule_pipeline(job_scheduler, job.id, state, job_reporter, priority=job.priority)
+
+def cancel_job_execution(job_id):
+    if JOB_EXECUTION == 'worker':
+        return job_broker.request_cancel(job_id) is not None
+    return job_scheduler.cancel(job_id)
+
+def job_queue_position(job_id):
+    if JOB_EXECUTION == 'worker':
+        return job_broker.position(job_id)
+    return job_scheduler.position(job_id)
+
+def queue_is_full():
+    if JOB_EXECUTION == 'worker':
+        return job_broker.active_count() >= SCHEDULER_MAX_QUEUE
+    return job_scheduler.stats()['active_jobs'] >= job_scheduler.max_queue
 
 @app.route('/')
 def index():
     """Página principal"""
     return render_template('index.html')
 
+def video_summary(video):
+    """Campos de um vídeo do banco expostos na listagem (sem credenciais nem script)"""
+    return {
+        'id': str(video.id),
+        'topic': video.topic,
+        'status': video.status,
+        'progress': 100 if video.status == "COMPLETED" else 0,
+        'created_at': video.createdAt.isoformat(),
+        'updated_at': video.updatedAt.isoformat(),
+        'video_path': video.videoPath,
+        'audio_path': video.audioPath,
+        'duration': video.duration,
+        **preview_urls(video.previewHash)
+    }
+
+def list_memory_jobs(limit, cursor=None, status=None, topic=None):
+    """Mesma paginação por (created_at, id) sobre os jobs em memória e os já arquivados"""
+    position = decode_cursor(cursor) if cursor else None
+    live_jobs = jobs.values()
+    live_ids = {job.id for job in live_jobs}
+    candidates = {}
+    for job in live_jobs:
+        if status and job.status != status:
+            continue
+        if topic and topic.lower() not in job.topic.lower():
+            continue
+        if position and (job.created_at, job.id) >= position:
+            continue
+        candidates[job.id] = (job.created_at, job.id, job)
+    
+    # Arquivados: os limit+1 mais recentes bastam. Um job ainda em memória (ex.: nova tentativa) tem
+    # preferência mesmo fora do filtro, pois o registro arquivado dele está desatualizado
+    if job_archive is not None:
+        archived, archive_position = 0, position
+        while archived <= limit:
+            records = job_archive.page(limit + 1, archive_position, status, topic)
+            for record in records:
+                created_at = datetime.fromisoformat(record['created_at'])
+                archive_position = (created_at, record['id'])
+                if record['id'] in live_ids:
+                    continue
+                candidates[record['id']] = (created_at, record['id'], record)
+                archived += 1
+            if len(records) <= limit:
+                break
+    
+    selected = sorted(candidates.values(), key=lambda item: item[:2], reverse=True)
+    page = selected[:limit]
+    next_cursor = encode_cursor(*page[-1][:2]) if len(selected) > limit else None
+    return [item if isinstance(item, dict) else item.to_dict() for _, _, item in page], next_cursor
+
 @app.route('/api/jobs', methods=['GET'])
 def list_jobs():
-    """Lista todos os jobs"""
+    """Lista os jobs paginados: ?limit=&cursor=&status=&topic="""
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit deve ser um número'}), 400
+    cursor = request.args.get('cursor') or None
+    status = request.args.get('status') or None
+    topic = (request.args.get('topic') or '').strip() or None
+    if status and status not in VIDEO_STATUSES:
+        return jsonify({'error': f"Status inválido: {status}"}), 400
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
     try:
         if DB_AVAILABLE:
-            # Tentar carregar do banco de dados
-            async def load_db_videos():
-                try:
-                    db = VideoDatabase()
-                    await db.connect()
-                    videos = await db.list_videos()
-                    await db.disconnect()
-                    return videos
-                except Exception as e:
-                    print(f"⚠️ Erro ao carregar do banco: {e}")
-                    return []
-            
-            def run_async_load():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    return loop.run_until_complete(load_db_videos())
-                finally:
-                    loop.close()
-            
-            # Executar em thread separada para evitar conflito com Flask
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_async_load)
-                videos = future.result()
-            
-            # Converter para formato compatível
-            jobs_list = []
-            for video in videos:
-                job_dict = {
-                    'id': str(video.id),
-                    'topic': video.topic,
-                    'status': video.status,
-                    'progress': 100 if video.status == "COMPLETED" else 0,
-                    'created_at': video.created_at.isoformat() if hasattr(video, 'created_at') else datetime.now().isoformat(),
-                    'updated_at': video.updated_at.isoformat() if hasattr(video, 'updated_at') else datetime.now().isoformat(),
-                    'video_path': video.video_path,
-                    'audio_path': video.audio_path,
-                    'duration': video.duration
-                }
-                jobs_list.append(job_dict)
-            
-            return jsonify(jobs_list)
+            # Conexão persistente do serviço de banco (sem abrir o engine a cada requisição)
+            try:
+                videos, next_cursor = db_service.list_videos_page(limit=limit, cursor=cursor,
+                                                                  status=status, topic=topic)
+                page = [video_summary(video) for video in videos]
+            except Exception as e:
+                print(f"⚠️ Erro ao carregar do banco: {e}")
+                page, next_cursor = [], None
         else:
             # Usar jobs em memória
-            return jsonify([job.to_dict() for job in jobs.values()])
+            page, next_cursor = list_memory_jobs(limit, cursor, status, topic)
+        
+        return jsonify({'jobs': page, 'next_cursor': next_cursor})
     except Exception as e:
         print(f"❌ Erro ao listar jobs: {e}")
-        return jsonify([])
+        return jsonify({'jobs': [], 'next_cursor': None})
+
+def parse_render_options(data):
+    """Valida as opções de renderização enviadas pelo cliente"""
+    render_options = {
+        'subtitle_mode': data.get('subtitle_mode', 'burn'),
+        'render_mode': data.get('render_mode', 'single'),
+        # Vazio = perfil definido pelo template (ou o padrão)
+        'encoder_profile': data.get('encoder_profile')
+    }
+    
+    if render_options['subtitle_mode'] not in SUBTITLE_MODES:
+        return None, f"Modo de legenda inválido: {render_options['subtitle_mode']}"
+    if render_options['render_mode'] not in RENDER_MODES:
+        return None, f"Modo de renderização inválido: {render_options['render_mode']}"
+    if render_options['encoder_profile'] and render_options['encoder_profile'] not in ENCODER_PROFILES:
+        return None, f"Perfil de encoder inválido: {render_options['encoder_profile']}"
+    
+    return render_options, None
 
 @app.route('/api/jobs', methods=['POST'])
 def create_job():
@@ -306,81 +452,252 @@ def create_job():
         if not topic:
             return jsonify({'error': 'Tópico é obrigatório'}), 400
         
-        # Criar job
-        job = VideoJob(topic=topic, template_id=template_id)
-        jobs[job.id] = job
+        render_options, error = parse_render_options(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Salvar no banco se disponível
-        use_db = DB_AVAILABLE
-        if use_db:
-            try:
-                async def save_to_db():
-                    db = VideoDatabase()
-                    await db.connect()
-                    video = await db.create_video(
-                        title=f"Vídeo sobre {topic}",
-                        topic=topic,
-                        script="",
-                        credentials_id=1  # Usar credenciais padrão
-                    )
-                    await db.update_video_status(video.id, "PENDING")
-                    await db.disconnect()
-                    return video.id
-                
-                def run_async_save():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        return loop.run_until_complete(save_to_db())
-                    finally:
-                        loop.close()
-                
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(run_async_save)
-                    db_job_id = future.result()
-                    job.id = str(db_job_id)  # Usar ID do banco
-            except Exception as e:
-                print(f"⚠️ Erro ao salvar no banco: {e}")
-                use_db = False
+        priority = data.get('priority', 'normal')
+        if priority not in PRIORITIES:
+            return jsonify({'error': f"Prioridade inválida: {priority}"}), 400
         
-        # Iniciar geração em thread separada
-        thread = threading.Thread(
-            target=run_async_generation,
-            args=(job.id, topic, template_id, use_db)
-        )
-        thread.daemon = True
-        thread.start()
+        # Fila cheia: recusar antes de gravar qualquer coisa
+        if queue_is_full():
+            return queue_full_response(SCHEDULER_MAX_QUEUE)
         
-        return jsonify({
-            'job_id': job.id,
-            'topic': topic,
-            'template_id': template_id,
-            'status': 'PENDING'
-        })
+        # Criar job
+        job = VideoJob(topic=topic, template_id=template_id, render_options=render_options, priority=priority)
+        return start_job(job)
         
     except Exception as e:
         print(f"❌ Erro ao criar job: {e}")
         return jsonify({'error': str(e)}), 500
 
+def start_job(job, script=""):
+    """Grava o job no banco (se disponível), registra e enfileira; devolve a resposta da API"""
+    job.use_db = DB_AVAILABLE
+    if job.use_db:
+        try:
+            video = db_service.create_video(
+                title=f"Vídeo sobre {job.topic}",
+                topic=job.topic,
+                script=script,
+                credentials_id=db_service.default_credentials_id()  # Usar credenciais padrão
+            )
+            job.id = str(video.id)  # Usar ID do banco
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar no banco: {e}")
+            job.use_db = False
+    
+    # Registrar só depois que o ID é definitivo
+    jobs[job.id] = job
+    
+    # Enfileirar no agendador local ou no broker dos workers
+    try:
+        queue_position = submit_job(job)
+    except QueueFullError as e:
+        del jobs[job.id]
+        if job.use_db:
+            update_db_status(job.id, "FAILED")
+        return queue_full_response(e.limit)
+    
+    return jsonify({
+        'job_id': job.id,
+        'topic': job.topic,
+        'template_id': job.template_id,
+        'render_options': job.render_options,
+        'priority': job.priority,
+        'queue_position': queue_position,
+        'status': 'PENDING'
+    })
+
+@app.route('/api/jobs/<job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Executa de novo um job que falhou ou foi cancelado (etapas já concluídas vêm dos checkpoints)"""
+    job = jobs.get(job_id) or restore_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if job.status not in ('FAILED', 'CANCELLED'):
+        return jsonify({'error': 'Só jobs com falha ou cancelados podem ser repetidos', 'status': job.status}), 409
+    if queue_is_full():
+        return queue_full_response(SCHEDULER_MAX_QUEUE)
+    
+    # Já expirado da memória: volta ao registro antes de receber o progresso
+    if job_id not in jobs:
+        jobs[job_id] = job
+    job.error = None
+    update_job_progress(job_id, 0, "PENDING")
+    try:
+        queue_position = submit_job(job)
+    except QueueFullError as e:
+        update_job_progress(job_id, 0, "FAILED")
+        return queue_full_response(e.limit)
+    if job.use_db:
+        update_db_status(job_id, "PENDING")
+    return jsonify({'job_id': job_id, 'queue_position': queue_position, 'status': 'PENDING'})
+
+@app.route('/api/jobs/<job_id>/rerender', methods=['POST'])
+def rerender_job(job_id):
+    """Novo job com o mesmo conteúdo (script, áudio, legendas, clips) e outro template/perfil de render
+    
+    Só as etapas afetadas pela mudança são executadas; as demais vêm dos checkpoints.
+    """
+    original = jobs.get(job_id) or restore_job(job_id)
+    if original is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    
+    data = request.get_json() or {}
+    render_options, error = parse_render_options({**original.render_options, **data})
+    if error:
+        return jsonify({'error': error}), 400
+    if queue_is_full():
+        return queue_full_response(SCHEDULER_MAX_QUEUE)
+    
+    job = VideoJob(topic=original.topic, template_id=data.get('template_id', original.template_id),
+                   render_options=render_options, priority=data.get('priority', original.priority),
+                   seed=original.seed or original.id, script_template_id=original.script_template_id)
+    if job.priority not in PRIORITIES:
+        return jsonify({'error': f"Prioridade inválida: {job.priority}"}), 400
+    
+    script = ""
+    if original.use_db:
+        try:
+            original_video = db_service.get_video(original.id)
+            script = original_video.script if original_video else ""
+        except Exception as e:
+            print(f"⚠️ Erro ao buscar script no banco: {e}")
+    return start_job(job, script=script)
+
+def queue_full_response(limit):
+    """Resposta 429 quando a fila de jobs está cheia"""
+    response = jsonify({
+        'error': 'Fila de geração cheia, tente novamente em instantes',
+        'queue_limit': limit
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(QUEUE_RETRY_AFTER)
+    return response
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancela um job na fila ou em execução (para ao fim da etapa atual)"""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if not cancel_job_execution(job_id):
+        return jsonify({'error': 'Job já finalizado', 'status': jobs[job_id].status}), 409
+    return jsonify({'job_id': job_id, 'status': jobs[job_id].status})
+
+@app.route('/api/jobs/<job_id>/stages', methods=['GET'])
+def job_stages(job_id):
+    """Etapas registradas do job: tempos, cache, bytes baixados e hashes dos artefatos"""
+    if not DB_AVAILABLE:
+        return jsonify({'error': 'Banco de dados não disponível'}), 503
+    stages = db_service.list_stages(job_id)
+    return jsonify([{
+        'stage': stage.stage,
+        'status': stage.status,
+        'started_at': stage.startedAt.isoformat(),
+        'finished_at': stage.finishedAt.isoformat() if stage.finishedAt else None,
+        'duration_ms': stage.durationMs,
+        'cache_hit': stage.cacheHit,
+        'bytes_downloaded': stage.bytesDownloaded,
+        'artifact_hash': stage.artifactHash,
+        'error': stage.error
+    } for stage in stages])
+
+@app.route('/api/pipeline/stats', methods=['GET'])
+def pipeline_stats():
+    """Latência p50/p95 por etapa do pipeline nos últimos dias (?days=7)"""
+    if not DB_AVAILABLE:
+        return jsonify({'error': 'Banco de dados não disponível'}), 503
+    days = request.args.get('days', 7, type=int)
+    return jsonify(db_service.stage_latency_stats(days))
+
+@app.route('/api/queue', methods=['GET'])
+def queue_status():
+    """Estado do agendador: jobs ativos e filas por tipo de etapa"""
+    if JOB_EXECUTION == 'worker':
+        return jsonify({**job_broker.stats(), 'registry': jobs.stats()})
+    return jsonify({**job_scheduler.stats(), 'registry': jobs.stats()})
+
 @app.route('/api/jobs/<job_id>', methods=['GET'])
 def get_job(job_id):
     """Obtém status de um job específico"""
-    if job_id in jobs:
-        return jsonify(jobs[job_id].to_dict())
-    else:
+    job = find_job(job_id)
+    if job is None:
         return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job)
+
+def media_relative_path(path):
+    """Caminho relativo a RENDER_WORKDIR (None se o arquivo estiver fora dele)"""
+    root = os.path.realpath(RENDER_WORKDIR)
+    real = os.path.realpath(path)
+    if os.path.commonpath([root, real]) != root:
+        return None
+    return os.path.relpath(real, root).replace(os.sep, '/')
+
+def preview_urls(preview_hash):
+    """URLs do pôster e da prévia (endereçadas pelo hash do vídeo: podem ficar em cache para sempre)"""
+    if not preview_hash:
+        return {'poster_url': None, 'preview_url': None}
+    return {'poster_url': f"/media/previews/{preview_hash}/poster",
+            'preview_url': f"/media/previews/{preview_hash}/clip"}
+
+def serve_media(path, download_name=None, max_age=MEDIA_MAX_AGE, immutable=False):
+    """Envia um arquivo de mídia com Range, ETag/Last-Modified e cache
+    
+    Com MEDIA_OFFLOAD o Flask só responde os cabeçalhos e o nginx/Apache envia os bytes.
+    """
+    relative = media_relative_path(path) if MEDIA_OFFLOAD == 'x-accel' else None
+    if relative is not None:
+        # O nginx trata Range, ETag e Last-Modified do arquivo interno
+        response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative)
+        if download_name:
+            response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        response.headers['Cache-Control'] = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+        return response
+    
+    # conditional=True: 206 para Range, 304 para If-None-Match/If-Modified-Since
+    response = send_file(path, conditional=True, etag=True, max_age=max_age,
+                         as_attachment=download_name is not None, download_name=download_name)
+    response.headers['Accept-Ranges'] = 'bytes'
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+def finished_video_path(job_id):
+    """Caminho do vídeo final do job, ou a resposta de erro (404) se não houver"""
+    job = find_job(job_id)
+    if job is None:
+        return None, (jsonify({'error': 'Job não encontrado'}), 404)
+    if not job['video_path'] or not os.path.exists(job['video_path']):
+        return None, (jsonify({'error': 'Vídeo não encontrado'}), 404)
+    return job['video_path'], None
 
 @app.route('/api/videos/<job_id>', methods=['GET'])
 def download_video(job_id):
     """Download do vídeo gerado"""
-    if job_id in jobs:
-        job = jobs[job_id]
-        if job.video_path and os.path.exists(job.video_path):
-            return send_file(job.video_path, as_attachment=True)
-        else:
-            return jsonify({'error': 'Vídeo não encontrado'}), 404
-    else:
-        return jsonify({'error': 'Job não encontrado'}), 404
+    path, error = finished_video_path(job_id)
+    if error:
+        return error
+    return serve_media(path, download_name=f"video_{job_id}{os.path.splitext(path)[1]}")
+
+@app.route('/media/<job_id>', methods=['GET'])
+def stream_video(job_id):
+    """Vídeo gerado para reprodução no navegador (streaming por Range, sem baixar o arquivo inteiro)"""
+    path, error = finished_video_path(job_id)
+    if error:
+        return error
+    return serve_media(path)
+
+@app.route('/media/previews/<video_hash>/<kind>', methods=['GET'])
+def preview_media(video_hash, kind):
+    """Pôster (kind=poster) ou prévia curta (kind=clip) de um vídeo, pelo hash do arquivo final"""
+    path = preview_path(video_hash, kind)
+    if path is None or not path.exists():
+        return jsonify({'error': 'Prévia não encontrada'}), 404
+    # O conteúdo de um hash nunca muda
+    return serve_media(str(path), max_age=PREVIEW_MAX_AGE, immutable=True)
 
 @app.route('/gallery')
 def gallery():
@@ -394,10 +711,17 @@ def status_page(job_id):
 
 @app.route('/api/templates', methods=['GET'])
 def list_templates():
-    """Lista todos os templates disponíveis"""
+    """Lista todos os templates disponíveis (resposta pré-serializada com ETag)"""
     try:
-        templates = template_manager.list_templates()
-        return jsonify(templates)
+        template_manager.reload_if_changed()
+        etag = template_manager.etag
+        if etag in request.if_none_match:
+            return '', 304
+        
+        response = app.response_class(template_manager.templates_json, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         print(f"❌ Erro ao listar templates: {e}")
         return jsonify([])
@@ -478,14 +802,37 @@ def handle_disconnect():
 
 @socketio.on('subscribe_job')
 def handle_subscribe_job(data):
-    """Cliente se inscreve para atualizações de um job"""
-    job_id = data.get('job_id')
+    """Cliente se inscreve para atualizações de um job (entra na sala e recebe o estado atual)"""
+    job_id = (data or {}).get('job_id')
     if job_id:
+        join_room(job_room(job_id))
         print(f"Cliente {request.sid} inscrito para job {job_id}")
+        
+        # Repetir o último estado: eventos anteriores à inscrição não são perdidos
+        job = jobs.get(job_id)
+        if job is not None:
+            emit('job_update', job_update_payload(job))
+
+@socketio.on('unsubscribe_job')
+def handle_unsubscribe_job(data):
+    """Cliente deixa de acompanhar um job"""
+    job_id = (data or {}).get('job_id')
+    if job_id:
+        leave_room(job_room(job_id))
 
 if __name__ == '__main__':
     print("🚀 Iniciando servidor Text-to-Video AI...")
     print(f"📋 Templates carregados: {len(template_manager.list_templates())}")
+    
+    # Catálogo de assets: índice em memória, sondagem em background e verificação de mudanças
+    asset_catalog = get_asset_catalog()
+    asset_catalog.start_watcher()
+    threading.Thread(target=asset_catalog.probe_all, name="asset-probe", daemon=True).start()
     print(f"🗄️ Banco de dados: {'Disponível' if DB_AVAILABLE else 'Não disponível'}")
     
+    if JOB_EXECUTION == 'worker':
+        # Jobs rodam em processos separados; aqui só retransmitimos os eventos
+        threading.Thread(target=relay_broker_events, name="broker-relay", daemon=True).start()
+        print(f"📮 Jobs enviados aos workers via broker: {job_broker.path}")
+    
     socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True) 
\ No newline at end of file
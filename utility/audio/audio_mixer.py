@@ -0,0 +1,118 @@
+import subprocess
+
+import numpy as np
+
+from utility.utils import get_ffmpeg_binary
+from utility.templates.asset_catalog import get_asset_catalog
+
+# Taxa de amostragem da mixagem (a mesma usada na escrita do áudio final)
+MIX_SAMPLE_RATE = 44100
+
+# Ducking: janela de análise da narração e tempo de ataque/liberação da música
+DUCKING_WINDOW = 0.05
+DUCKING_SMOOTHING = 0.25
+DUCKING_THRESHOLD = 0.02
+
+MUSIC_FADE = 1.0
+
+def decode_pcm(path: str, sample_rate: int = MIX_SAMPLE_RATE) -> np.ndarray:
+    """Decodifica um arquivo de áudio para PCM float32 estéreo (amostras x 2) via ffmpeg"""
+    result = subprocess.run([
+        get_ffmpeg_binary(), '-loglevel', 'error',
+        '-i', path,
+        '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', '2', '-ar', str(sample_rate),
+        '-'
+    ], check=True, capture_output=True)
+    pcm = np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, 2)
+    pcm.flags.writeable = False
+    return pcm
+
+def _place(mix: np.ndarray, pcm: np.ndarray, start: float, end: float, gain: float,
+           sample_rate: int, loop: bool = False, fade: float = 0.0) -> np.ndarray:
+    """Soma um trecho de PCM à mixagem entre start e end (em segundos)"""
+    first = max(0, int(round(start * sample_rate)))
+    last = min(len(mix), int(round(end * sample_rate)))
+    length = last - first
+    if length <= 0 or len(pcm) == 0:
+        return mix
+
+    if loop and len(pcm) < length:
+        pcm = np.tile(pcm, (length // len(pcm) + 1, 1))
+    pcm = pcm[:length] * gain
+
+    # Fade de entrada/saída para a música não cortar seco nas trocas de seção
+    fade_samples = min(int(fade * sample_rate), len(pcm) // 2)
+    if fade_samples > 0:
+        ramp = np.linspace(0.0, 1.0, fade_samples, dtype=np.float32)[:, None]
+        pcm[:fade_samples] *= ramp
+        pcm[-fade_samples:] *= ramp[::-1]
+
+    mix[first:first + len(pcm)] += pcm
+    return mix
+
+def ducking_envelope(narration: np.ndarray, ducking: float, sample_rate: int = MIX_SAMPLE_RATE) -> np.ndarray:
+    """Ganho da música por amostra: reduzido para `ducking` enquanto há narração"""
+    window = max(1, int(DUCKING_WINDOW * sample_rate))
+    frames = len(narration) // window + 1
+    padded = np.zeros((frames * window, 2), dtype=np.float32)
+    padded[:len(narration)] = narration
+
+    # RMS por janela -> voz ativa ou não
+    rms = np.sqrt((padded.reshape(frames, window, 2) ** 2).mean(axis=(1, 2)))
+    active = (rms > DUCKING_THRESHOLD).astype(np.float32)
+
+    # Suaviza as transições (ataque/liberação) com média móvel
+    smoothing = max(1, int(DUCKING_SMOOTHING / DUCKING_WINDOW))
+    active = np.convolve(active, np.ones(smoothing, dtype=np.float32) / smoothing, mode='same')
+
+    gain = 1.0 - (1.0 - ducking) * np.clip(active, 0.0, 1.0)
+    return np.repeat(gain, window)[:len(narration), None]
+
+def mix_template_audio(narration: np.ndarray, timeline, audio_settings,
+                       sample_rate: int = MIX_SAMPLE_RATE) -> np.ndarray:
+    """Mixa narração, efeitos sonoros e trilha das seções da timeline em uma única passada vetorizada"""
+    mix = narration * np.float32(audio_settings.volume)
+
+    music = np.zeros_like(mix)
+    catalog = get_asset_catalog()
+    effects_volume = audio_settings.effects_volume
+    music_volume = audio_settings.bg_music_volume
+
+    for section in timeline.sections:
+        start, end = section.start, section.end
+        if section.background_music:
+            try:
+                music = _place(music, catalog.load_audio(section.background_music, sample_rate), start, end,
+                               music_volume, sample_rate, loop=True, fade=MUSIC_FADE)
+                print(f"   🎼 Trilha '{section.name}' em {start:.1f}s-{end:.1f}s")
+            except Exception as e:
+                print(f"   ❌ Erro ao carregar trilha {section.background_music}: {e}")
+
+        # Efeitos distribuídos pela janela da seção, cada um a partir do início da sua fatia
+        effects = [path for path in section.audio_effects if catalog.exists(path)]
+        for missing in set(section.audio_effects) - set(effects):
+            print(f"   ❌ Efeito não encontrado: {missing}")
+        if not effects:
+            continue
+        slot = (end - start) / len(effects)
+        for index, effect_path in enumerate(effects):
+            try:
+                mix = _place(mix, catalog.load_audio(effect_path, sample_rate), start + index * slot, end,
+                             effects_volume, sample_rate)
+                print(f"   ✅ Efeito em {start + index * slot:.1f}s: {effect_path}")
+            except Exception as e:
+                print(f"   ❌ Erro ao aplicar efeito {effect_path}: {e}")
+
+    if music.any():
+        mix += music * ducking_envelope(narration, audio_settings.music_ducking, sample_rate)
+
+    # Evita clipping: normaliza só se a soma passar do limite
+    peak = float(np.abs(mix).max()) if len(mix) else 0.0
+    if peak > 0.98:
+        mix *= np.float32(0.98 / peak)
+    return mix
+
+def to_audio_clip(pcm: np.ndarray, sample_rate: int = MIX_SAMPLE_RATE):
+    """Envolve o PCM mixado em um clip do MoviePy (leitura por fatias do array)"""
+    from moviepy.audio.AudioClip import AudioArrayClip
+    return AudioArrayClip(pcm, fps=sample_rate)
@@ -0,0 +1,60 @@
+from bisect import bisect_left, bisect_right
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+class PauseRemap:
+    """Converte tempos da narração original para a timeline com as pausas inseridas"""
+
+    def __init__(self, positions: List[float], durations: List[float]):
+        self.positions = positions
+        # offsets[i] = silêncio acumulado antes da i-ésima posição de pausa
+        self.offsets = [0.0]
+        for duration in durations:
+            self.offsets.append(self.offsets[-1] + duration)
+
+    @property
+    def total_pause(self) -> float:
+        return self.offsets[-1]
+
+    def __call__(self, t: float, is_end: bool = False) -> float:
+        """Desloca t pelo silêncio inserido antes dele
+
+        Um início exatamente na posição da pausa vai para depois do silêncio;
+        um fim exatamente na posição termina antes dele.
+        """
+        index = bisect_left(self.positions, t) if is_end else bisect_right(self.positions, t)
+        return t + self.offsets[index]
+
+    def interval(self, t1: float, t2: float, cover_pauses: bool = False) -> Tuple[float, float]:
+        """Remapeia um intervalo; com cover_pauses o intervalo estica sobre a pausa que o encerra"""
+        return self(t1), self(t2, is_end=not cover_pauses)
+
+def insert_pauses(pcm: np.ndarray, pauses, sample_rate: int) -> Tuple[np.ndarray, PauseRemap]:
+    """Insere silêncio no PCM da narração nas posições das pausas (uma única concatenação)"""
+    duration = len(pcm) / sample_rate
+    sorted_pauses = sorted((pause for pause in pauses if pause.duration > 0 and 0 <= pause.position <= duration),
+                           key=lambda pause: pause.position)
+
+    pieces = []
+    positions, durations = [], []
+    cursor = 0
+    for pause in sorted_pauses:
+        split = int(round(pause.position * sample_rate))
+        pieces.append(pcm[cursor:split])
+        pieces.append(np.zeros((int(round(pause.duration * sample_rate)), pcm.shape[1]), dtype=pcm.dtype))
+        positions.append(pause.position)
+        durations.append(pause.duration)
+        cursor = split
+        print(f"   ⏸️ Pausa em {pause.position:.1f}s por {pause.duration:.1f}s: {pause.description}")
+    pieces.append(pcm[cursor:])
+
+    return np.concatenate(pieces), PauseRemap(positions, durations)
+
+def remap_timeline(timed_captions, background_video_data, remap: Callable) -> Tuple[list, list]:
+    """Aplica o remapeamento às legendas e aos intervalos dos vídeos de fundo"""
+    shifted_captions = [(remap.interval(t1, t2), text) for (t1, t2), text in timed_captions]
+    # Vídeos de fundo cobrem o silêncio para não deixar buracos na imagem
+    shifted_background = [[list(remap.interval(t1, t2, cover_pauses=True)), video_url]
+                          for (t1, t2), video_url in background_video_data]
+    return shifted_captions, shifted_background
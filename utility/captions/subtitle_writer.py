@@ -0,0 +1,166 @@
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import ImageColor
+
+from utility.utils import get_ffmpeg_binary
+from utility.render.encoder_profiles import FASTSTART_PARAMS
+
+# Modos de saída das legendas
+# - burn: legendas desenhadas nos frames (padrão)
+# - srt / vtt / ass: arquivo de legenda ao lado do vídeo
+# - mov_text / ass_stream: faixa de legenda embutida no container
+SUBTITLE_MODES = ['burn', 'srt', 'vtt', 'ass', 'mov_text', 'ass_stream']
+SIDECAR_MODES = ['srt', 'vtt', 'ass']
+MUXED_MODES = ['mov_text', 'ass_stream']
+
+# Resolução usada no ASS quando o vídeo não informa a sua (vertical 9:16)
+DEFAULT_VIDEO_SIZE = (1080, 1920)
+
+def _format_timestamp(seconds: float, separator: str = ',') -> str:
+    """Formata segundos como HH:MM:SS,mmm (SRT) ou HH:MM:SS.mmm (VTT)"""
+    millis = int(round(max(seconds, 0) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def _format_ass_timestamp(seconds: float) -> str:
+    """Formata segundos como H:MM:SS.cc (ASS)"""
+    centis = int(round(max(seconds, 0) * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+def _ass_color(color: str) -> str:
+    """Converte uma cor (nome ou #hex) para o formato &HAABBGGRR do ASS"""
+    try:
+        r, g, b = ImageColor.getrgb(color)[:3]
+    except ValueError:
+        r, g, b = 255, 255, 255
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+def _cue_text(text: str) -> str:
+    """Texto da legenda sem linhas em branco (no SRT/VTT uma linha vazia encerra o bloco)"""
+    return "\n".join(line.strip() for line in str(text).splitlines() if line.strip())
+
+def _ass_text(text: str) -> str:
+    """Escapa chaves e barras invertidas (seriam lidas como tags de override) e converte quebras em \\N"""
+    escaped = "".join(f"\\{char}" if char in "\\{}" else char for char in _cue_text(text))
+    return "\\N".join(escaped.splitlines())
+
+def to_srt(timed_captions: List[Tuple[Tuple[float, float], str]]) -> str:
+    """Gera o conteúdo SRT a partir das legendas temporizadas"""
+    blocks = []
+    for index, ((t1, t2), text) in enumerate(timed_captions, 1):
+        blocks.append(f"{index}\n{_format_timestamp(t1)} --> {_format_timestamp(t2)}\n{_cue_text(text)}\n")
+    return "\n".join(blocks)
+
+def to_vtt(timed_captions: List[Tuple[Tuple[float, float], str]]) -> str:
+    """Gera o conteúdo WebVTT a partir das legendas temporizadas"""
+    blocks = ["WEBVTT\n"]
+    for (t1, t2), text in timed_captions:
+        blocks.append(f"{_format_timestamp(t1, '.')} --> {_format_timestamp(t2, '.')} align:center\n{_cue_text(text)}\n")
+    return "\n".join(blocks)
+
+def to_ass(timed_captions: List[Tuple[Tuple[float, float], str]], text_style: Optional[Dict] = None,
+           video_size: Optional[Tuple[int, int]] = None) -> str:
+    """Gera o conteúdo ASS usando o text_style do template"""
+    text_style = text_style or {}
+    font = text_style.get('font', 'Arial-Bold')
+    bold = -1 if 'bold' in font.lower() else 0
+    font_name = font.replace('-Bold', '').replace('-bold', '')
+    fontsize = text_style.get('fontsize', 90)
+    color = _ass_color(text_style.get('color', 'white'))
+    outline = text_style.get('stroke_width', 4)
+    margin_bottom = text_style.get('margin_bottom', 100)
+    width, height = video_size or DEFAULT_VIDEO_SIZE
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+        "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{fontsize},{color},{color},&H00000000,&H00000000,"
+        f"{bold},0,0,0,100,100,0,0,1,{outline},0,2,10,10,{margin_bottom},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for (t1, t2), text in timed_captions:
+        lines.append(f"Dialogue: 0,{_format_ass_timestamp(t1)},{_format_ass_timestamp(t2)},"
+                     f"Default,,0,0,0,,{{\\fad(300,300)}}{_ass_text(text)}")
+    return "\n".join(lines) + "\n"
+
+def write_subtitles(timed_captions, output_path: str, subtitle_format: str = 'srt',
+                    text_style: Optional[Dict] = None, video_size: Optional[Tuple[int, int]] = None) -> str:
+    """Escreve o arquivo de legenda no formato pedido e retorna o caminho"""
+    if subtitle_format == 'srt':
+        content = to_srt(timed_captions)
+    elif subtitle_format == 'vtt':
+        content = to_vtt(timed_captions)
+    elif subtitle_format == 'ass':
+        content = to_ass(timed_captions, text_style, video_size)
+    else:
+        raise ValueError(f"Formato de legenda não suportado: {subtitle_format}")
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    print(f"📝 Legendas salvas: {output_path}")
+    return output_path
+
+def mux_subtitles(video_path: str, subtitle_path: str, output_path: str, codec: str = 'mov_text') -> str:
+    """Embute a faixa de legenda no container sem recodificar o vídeo"""
+    command = [
+        get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-i', video_path,
+        '-i', subtitle_path,
+        '-map', '0', '-map', '1',
+        '-c', 'copy', '-c:s', codec,
+        '-metadata:s:s:0', 'language=por',
+        *(FASTSTART_PARAMS if output_path.endswith('.mp4') else []),
+        output_path
+    ]
+    subprocess.run(command, check=True)
+    print(f"📝 Faixa de legenda ({codec}) embutida: {output_path}")
+    return output_path
+
+def export_subtitles(timed_captions, video_path: str, subtitle_mode: str,
+                     text_style: Optional[Dict] = None, video_size: Optional[Tuple[int, int]] = None) -> str:
+    """Gera as legendas fora dos frames conforme o modo e retorna o vídeo final"""
+    video_path = Path(video_path)
+
+    if subtitle_mode in SIDECAR_MODES:
+        write_subtitles(timed_captions, str(video_path.with_suffix(f'.{subtitle_mode}')),
+                        subtitle_mode, text_style, video_size)
+        return str(video_path)
+
+    if subtitle_mode == 'mov_text':
+        subtitle_path = write_subtitles(timed_captions, str(video_path.with_suffix('.srt')),
+                                        'srt', text_style, video_size)
+        muxed_path = video_path.with_name(f"{video_path.stem}_subs.mp4")
+        mux_subtitles(str(video_path), subtitle_path, str(muxed_path), 'mov_text')
+    elif subtitle_mode == 'ass_stream':
+        # MP4 não suporta faixas ASS, então o resultado vai para MKV
+        subtitle_path = write_subtitles(timed_captions, str(video_path.with_suffix('.ass')),
+                                        'ass', text_style, video_size)
+        muxed_path = video_path.with_suffix('.mkv')
+        mux_subtitles(str(video_path), subtitle_path, str(muxed_path), 'ass')
+    else:
+        raise ValueError(f"Modo de legenda não suportado: {subtitle_mode}")
+
+    os.remove(subtitle_path)
+    if muxed_path.suffix == video_path.suffix:
+        os.replace(muxed_path, video_path)
+        return str(video_path)
+
+    os.remove(video_path)
+    return str(muxed_path)
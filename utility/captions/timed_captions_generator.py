@@ -1,17 +1,93 @@
+import importlib
+import threading
+import types
+from contextlib import contextmanager
 import whisper
 import re
+import tqdm
 
-def generate_timed_captions(audio_filename, model_size="base"):
+# Callback de progresso da transcrição em andamento em cada thread
+_progress_local = threading.local()
+
+# Transcrições em andamento com a barra substituída (a referência original volta quando chega a zero)
+_patch_lock = threading.Lock()
+_patch_count = 0
+_original_reference = None
+
+class _TranscribeProgressBar(tqdm.tqdm):
+    """Barra do Whisper (frames de áudio decodificados) que repassa o avanço ao callback da thread"""
+
+    def update(self, n=1):
+        result = super().update(n)
+        callback = getattr(_progress_local, 'callback', None)
+        if callback is not None and self.total:
+            callback(min(self.n / self.total, 1.0), "transcrição")
+        return result
+
+class _TqdmModuleProxy(types.ModuleType):
+    """Módulo tqdm visto só pelo whisper.transcribe: tqdm.tqdm é a barra com progresso, o resto é o original"""
+
+    def __init__(self):
+        super().__init__(tqdm.__name__)
+        self.tqdm = _TranscribeProgressBar
+
+    def __getattr__(self, name):
+        return getattr(tqdm, name)
+
+def _progress_reference(reference):
+    """Substituto para a referência ao tqdm em whisper.transcribe (None se o uso for desconhecido)"""
+    if reference is tqdm:
+        return _TqdmModuleProxy()        # import tqdm; tqdm.tqdm(...)
+    if reference is tqdm.tqdm:
+        return _TranscribeProgressBar    # from tqdm import tqdm; tqdm(...)
+    return None
+
+@contextmanager
+def _transcribe_progress(on_progress):
+    """Durante a chamada, o whisper.transcribe usa uma barra que reporta o progresso por janela
+
+    Só a referência dentro do módulo do Whisper é trocada e restaurada ao fim; o tqdm do processo não
+    muda. Se a versão do Whisper usar o tqdm de outra forma, a transcrição roda sem progresso.
+    """
+    global _patch_count, _original_reference
+    module = importlib.import_module("whisper.transcribe")  # o módulo, não a função homônima
+    with _patch_lock:
+        replacement = _progress_reference(_original_reference if _patch_count else getattr(module, 'tqdm', None))
+        if on_progress is None or not hasattr(module, 'tqdm') or replacement is None:
+            replacement = None
+        elif _patch_count == 0:
+            _original_reference = module.tqdm
+            module.tqdm = replacement
+        if replacement is not None:
+            _patch_count += 1
+    if replacement is None:
+        yield
+        return
+
+    previous = getattr(_progress_local, 'callback', None)
+    _progress_local.callback = on_progress
+    try:
+        yield
+    finally:
+        _progress_local.callback = previous
+        with _patch_lock:
+            _patch_count -= 1
+            if _patch_count == 0:
+                module.tqdm = _original_reference
+                _original_reference = None
+
+def generate_timed_captions(audio_filename, model_size="base", on_progress=None):
     WHISPER_MODEL = whisper.load_model(model_size)
     
-    # Forçar português e desabilitar detecção automática
-    result = WHISPER_MODEL.transcribe(
-        audio_filename, 
-        language="pt", 
-        task="transcribe",
-        verbose=False,
-        fp16=False
-    )
+    with _transcribe_progress(on_progress):
+        # Forçar português e desabilitar detecção automática
+        result = WHISPER_MODEL.transcribe(
+            audio_filename, 
+            language="pt", 
+            task="transcribe",
+            verbose=False,
+            fp16=False
+        )
     
     return getCaptionsWithTime(result)
 
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from utility.jobs.scheduler import PRIORITIES, QueueFullError
+
+# Arquivo SQLite da fila compartilhada entre o servidor e os workers
+JOB_BROKER_PATH = os.environ.get("JOB_BROKER_PATH", "renders/_broker.sqlite3")
+
+# Job sem heartbeat por mais que isso volta para a fila (worker morreu)
+BROKER_LEASE_SECONDS = float(os.environ.get("BROKER_LEASE_SECONDS", "120"))
+
+# Eventos já retransmitidos são apagados depois deste tempo (s)
+BROKER_EVENT_RETENTION = float(os.environ.get("BROKER_EVENT_RETENTION", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'QUEUED',
+    worker TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Estados em que o job ainda ocupa a fila
+ACTIVE_STATUSES = ('QUEUED', 'RUNNING')
+
+class JobBroker:
+    """Fila durável de jobs em SQLite: o servidor enfileira, os workers reivindicam e publicam eventos"""
+
+    def __init__(self, path: str = JOB_BROKER_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._db().executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão por thread (WAL: leitores não bloqueiam o worker que escreve)"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        """Transação IMMEDIATE: reserva a escrita já no início (claim atômico entre processos)"""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _publish(self, db: sqlite3.Connection, job_id: str, event: str, data: Dict):
+        db.execute("INSERT INTO events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                   (job_id, event, json.dumps(data), time.time()))
+
+    def enqueue(self, job_id: str, payload: Dict, priority: str = 'normal', max_queue: Optional[int] = None) -> int:
+        """Enfileira um job; retorna a posição na fila (QueueFullError se já houver max_queue ativos)
+
+        Um job finalizado com o mesmo ID (retry) volta para a fila com o novo payload.
+        """
+        with self._transaction() as db:
+            if max_queue is not None:
+                active = db.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES).fetchone()[0]
+                if active >= max_queue:
+                    raise QueueFullError(max_queue)
+            db.execute("INSERT INTO jobs (id, payload, priority, created_at) VALUES (?, ?, ?, ?) "
+                       "ON CONFLICT(id) DO UPDATE SET payload = excluded.payload, priority = excluded.priority, "
+                       "status = 'QUEUED', worker = NULL, cancel_requested = 0, created_at = excluded.created_at "
+                       "WHERE jobs.status NOT IN ('QUEUED', 'RUNNING')",
+                       (job_id, json.dumps(payload), PRIORITIES.get(priority, PRIORITIES['normal']), time.time()))
+        return self.position(job_id) or 0
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, Dict]]:
+        """Reivindica o próximo job da fila (prioridade, depois ordem de chegada)"""
+        with self._transaction() as db:
+            row = db.execute("SELECT id, payload FROM jobs WHERE status = 'QUEUED' "
+                             "ORDER BY priority, created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'RUNNING', worker = ?, heartbeat_at = ? WHERE id = ?",
+                       (worker_id, time.time(), row[0]))
+        return row[0], json.loads(row[1])
+
+    def heartbeat(self, worker_id: str):
+        """Renova a posse dos jobs em execução no worker"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND status = 'RUNNING'",
+                       (time.time(), worker_id))
+
+    def requeue_stale(self, lease: float = BROKER_LEASE_SECONDS) -> int:
+        """Devolve à fila os jobs de workers que pararam de renovar a posse"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'QUEUED', worker = NULL "
+                                "WHERE status = 'RUNNING' AND heartbeat_at < ? AND cancel_requested = 0",
+                                (time.time() - lease,))
+            return cursor.rowcount
+
+    def finish(self, job_id: str, status: str, event: str, data: Dict):
+        """Marca o job como finalizado e publica o evento final na mesma transação"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, worker = NULL WHERE id = ?", (status, job_id))
+            self._publish(db, job_id, event, data)
+
+    def publish(self, job_id: str, event: str, data: Dict):
+        """Publica um evento de progresso para o servidor retransmitir"""
+        with self._transaction() as db:
+            self._publish(db, job_id, event, data)
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancela um job: na fila sai na hora, em execução o worker para na próxima etapa
+
+        Retorna o status do job no momento do pedido, ou None se já finalizado/desconhecido.
+        """
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] not in ACTIVE_STATUSES:
+                return None
+            if row[0] == 'QUEUED':
+                db.execute("UPDATE jobs SET status = 'CANCELLED' WHERE id = ?", (job_id,))
+                self._publish(db, job_id, 'cancelled', {})
+            else:
+                db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return row[0]
+
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Quais dos jobs informados tiveram cancelamento pedido"""
+        if not job_ids:
+            return []
+        placeholders = ','.join('?' * len(job_ids))
+        rows = self._db().execute(f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({placeholders})",
+                                  job_ids).fetchall()
+        return [row[0] for row in rows]
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Posição na fila (0 = em execução, None = finalizado/desconhecido)"""
+        db = self._db()
+        row = db.execute("SELECT status, priority, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] not in ACTIVE_STATUSES:
+            return None
+        if row[0] == 'RUNNING':
+            return 0
+        ahead = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'QUEUED' "
+                           "AND (priority < ? OR (priority = ? AND created_at < ?))",
+                           (row[1], row[1], row[2])).fetchone()[0]
+        return ahead + 1
+
+    def active_count(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES).fetchone()[0]
+
+    def last_seq(self) -> int:
+        return self._db().execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def events_since(self, seq: int, limit: int = 500) -> List[Tuple[int, str, str, Dict]]:
+        """Eventos publicados depois de seq: (seq, job_id, evento, dados)"""
+        rows = self._db().execute("SELECT seq, job_id, event, data FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+                                  (seq, limit)).fetchall()
+        return [(row[0], row[1], row[2], json.loads(row[3])) for row in rows]
+
+    def prune_events(self, max_age: float = BROKER_EVENT_RETENTION) -> int:
+        with self._transaction() as db:
+            return db.execute("DELETE FROM events WHERE created_at < ?", (time.time() - max_age,)).rowcount
+
+    def stats(self) -> Dict:
+        """Contagem de jobs por status e workers ativos"""
+        db = self._db()
+        counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        workers = db.execute("SELECT COUNT(DISTINCT worker) FROM jobs WHERE status = 'RUNNING'").fetchone()[0]
+        return {'jobs': counts, 'busy_workers': workers}
+
+_broker: Optional[JobBroker] = None
+_broker_lock = threading.Lock()
+
+def get_job_broker() -> JobBroker:
+    """Broker compartilhado do processo"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = JobBroker()
+    return _broker
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Diretório dos checkpoints das etapas do pipeline
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "renders/_cache/checkpoints")
+
+# Limites do cache: checkpoints sem uso há mais de N dias saem; acima do tamanho, os menos usados saem
+CHECKPOINT_MAX_AGE_DAYS = float(os.environ.get("CHECKPOINT_MAX_AGE_DAYS", "14"))
+CHECKPOINT_MAX_MB = float(os.environ.get("CHECKPOINT_MAX_MB", "5120"))
+
+# Intervalo mínimo (s) entre duas limpezas do cache no mesmo processo
+CHECKPOINT_PRUNE_INTERVAL = 600
+
+# Incrementar quando o formato/semântica de alguma etapa mudar (invalida todos os checkpoints)
+CHECKPOINT_VERSION = 2
+
+CHECKPOINT_FILE = "checkpoint.pkl"
+
+@dataclass(frozen=True)
+class CheckpointSpec:
+    """Como uma etapa é identificada e o que ela produz
+
+    inputs: partes da chave calculadas a partir do estado (chaves das etapas anteriores e parâmetros)
+    outputs: campos do estado produzidos pela etapa
+    files: campos de saída com caminho (ou lista de caminhos) de arquivo; os arquivos são copiados para
+           o checkpoint e restaurados no workspace do job atual com o mesmo nome
+    """
+    inputs: Callable[[Dict], Tuple]
+    outputs: Tuple[str, ...]
+    files: Tuple[str, ...] = ()
+
+def stage_key(stage: str, parts: Tuple) -> str:
+    """Chave de conteúdo da etapa: muda sempre que alguma entrada muda"""
+    raw = json.dumps([stage, CHECKPOINT_VERSION, list(parts)], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _checkpoint_dir(stage: str, key: str) -> Path:
+    return Path(CHECKPOINT_DIR) / stage / key
+
+def _paths(value) -> List[str]:
+    """Campo de arquivo como lista (aceita caminho único, lista ou None)"""
+    if not value:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+def _copy(source, target):
+    """Cópia independente: reescrever o arquivo no workspace não altera o checkpoint (e vice-versa)"""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    shutil.copy2(source, temp_path)
+    os.replace(temp_path, target)
+
+def load_checkpoint(stage: str, key: str, spec: CheckpointSpec, context) -> Optional[Dict]:
+    """Saídas salvas da etapa, ou None se não houver checkpoint válido (arquivos inclusive)"""
+    directory = _checkpoint_dir(stage, key)
+    path = directory / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            checkpoint = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ Checkpoint corrompido ignorado ({stage}): {e}")
+        return None
+
+    outputs = dict(checkpoint['outputs'])
+    for field in spec.files:
+        names = _paths(outputs.get(field))
+        if any(not (directory / name).exists() for name in names):
+            return None
+        restored = []
+        for name in names:
+            target = Path(context.work_dir) / name
+            _copy(directory / name, target)
+            restored.append(str(target))
+        outputs[field] = restored if isinstance(outputs.get(field), (list, tuple)) else (restored or [None])[0]
+    outputs['artifact_hash'] = checkpoint.get('artifact_hash')
+
+    # Marca de uso: a limpeza por tamanho retira primeiro os menos usados
+    os.utime(path)
+    return outputs
+
+def save_checkpoint(stage: str, key: str, spec: CheckpointSpec, state: Dict, artifact_hash: Optional[str] = None):
+    """Copia os arquivos e grava as saídas da etapa (diretório temporário + rename: atômico)"""
+    directory = _checkpoint_dir(stage, key)
+    if (directory / CHECKPOINT_FILE).exists():
+        return
+    temp_dir = directory.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        outputs = {field: state.get(field) for field in spec.outputs}
+        for field in spec.files:
+            value = outputs.get(field)
+            names = []
+            for source in _paths(value):
+                names.append(Path(source).name)
+                _copy(source, temp_dir / Path(source).name)
+            # No checkpoint ficam só os nomes; o diretório é o do próprio checkpoint
+            outputs[field] = names if isinstance(value, (list, tuple)) else (names or [None])[0]
+        with open(temp_dir / CHECKPOINT_FILE, 'wb') as f:
+            pickle.dump({'outputs': outputs, 'artifact_hash': artifact_hash}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            os.replace(temp_dir, directory)
+        except OSError:
+            # Outro job gravou a mesma chave primeiro
+            pass
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    prune_checkpoints()
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+def prune_checkpoints(max_age_days: float = CHECKPOINT_MAX_AGE_DAYS, max_mb: float = CHECKPOINT_MAX_MB,
+                      force: bool = False) -> int:
+    """Remove checkpoints sem uso há mais de max_age_days e, acima de max_mb, os menos usados
+
+    Executa no máximo uma vez por CHECKPOINT_PRUNE_INTERVAL (a menos que force); retorna quantos saíram.
+    """
+    global _last_prune
+    now = time.time()
+    with _prune_lock:
+        if not force and now - _last_prune < CHECKPOINT_PRUNE_INTERVAL:
+            return 0
+        _last_prune = now
+
+        entries = []
+        for path in Path(CHECKPOINT_DIR).glob(f"*/*/{CHECKPOINT_FILE}"):
+            try:
+                used_at = path.stat().st_mtime
+                size = sum(file.stat().st_size for file in path.parent.iterdir() if file.is_file())
+            except OSError:
+                continue
+            entries.append((used_at, size, path.parent))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        expired_before = now - max_age_days * 86400
+        removed = 0
+        for used_at, size, directory in entries:
+            if used_at >= expired_before and total <= max_mb * 1024 * 1024:
+                break
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            removed += 1
+    if removed:
+        print(f"🧹 {removed} checkpoints removidos do cache")
+    return removed
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+# Intervalo mínimo (s) entre atualizações de progresso entregues à sala de um job
+SOCKET_ROOM_INTERVAL = float(os.environ.get("SOCKET_ROOM_INTERVAL", "0.5"))
+
+def job_room(job_id: str) -> str:
+    """Sala do WebSocket com os clientes inscritos em um job"""
+    return f"job:{job_id}"
+
+class RoomNotifier:
+    """Entrega os eventos de cada job só à sua sala, com limite de taxa e coalescência por sala
+
+    Atualizações acima da taxa ficam pendentes (só a mais recente por sala) e saem juntas no
+    próximo ciclo do flusher; mudanças de status/etapa e eventos finais saem na hora.
+    emit(evento, dados, sala) faz a entrega de fato (socketio.emit no servidor).
+    """
+
+    def __init__(self, emit: Callable[[str, Dict, str], None], interval: float = SOCKET_ROOM_INTERVAL):
+        self._emit = emit
+        self.interval = interval
+        self._pending: Dict[str, Dict] = {}
+        self._last_sent: Dict[str, float] = {}
+        # Entregas serializadas: uma atualização pendente nunca sai depois do evento final do job
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def update(self, job_id: str, data: Dict, urgent: bool = False):
+        """Atualização de progresso; urgent ignora o limite (mudança de status ou de etapa)"""
+        room = job_room(job_id)
+        now = time.monotonic()
+        with self._lock:
+            if not urgent and now - self._last_sent.get(room, 0.0) < self.interval:
+                self._pending[room] = data
+                self._ensure_flusher()
+                return
+            self._pending.pop(room, None)
+            self._last_sent[room] = now
+            self._emit('job_update', data, room)
+
+    def event(self, job_id: str, event: str, data: Dict):
+        """Evento final (concluído, falha, cancelado): descarta o pendente e entrega imediatamente"""
+        room = job_room(job_id)
+        with self._lock:
+            self._pending.pop(room, None)
+            self._last_sent.pop(room, None)
+            self._emit(event, data, room)
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="socket-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                due = [room for room in self._pending if now - self._last_sent.get(room, 0.0) >= self.interval]
+                for room in due:
+                    self._last_sent[room] = now
+                    self._emit('job_update', self._pending.pop(room), room)
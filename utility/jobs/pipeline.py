@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from utility.script.script_generator import generate_script
+from utility.audio.audio_generator import generate_audio
+from utility.captions.timed_captions_generator import generate_timed_captions
+from utility.captions.subtitle_writer import SIDECAR_MODES
+from utility.video.background_video_generator import generate_video_url
+from utility.render.render_engine import get_output_media
+from utility.render.render_context import RenderContext
+from utility.video.video_search_query_generator import getVideoSearchQueriesTimed, merge_empty_intervals
+from utility.templates.template_manager import get_template_manager
+from utility.script.template_script_generator import TemplateScriptGenerator
+from utility.render.template_render_engine import TemplateRenderEngine
+from utility.render.previews import generate_previews
+from utility.utils import get_media_duration
+from utility.jobs.scheduler import JobCancelled, Stage, STAGE_IO, STAGE_CPU
+from utility.jobs.progress import StageProgress
+from utility.jobs.checkpoints import CheckpointSpec, load_checkpoint, save_checkpoint, stage_key
+
+# Banco de dados (opcional)
+try:
+    from database import get_database_service
+    DB_AVAILABLE = True
+except Exception:
+    DB_AVAILABLE = False
+
+template_manager = get_template_manager()
+template_script_generator = TemplateScriptGenerator()
+template_render_engine = TemplateRenderEngine()
+
+def run_coroutine(coro):
+    """Executa uma corrotina em um event loop próprio (threads dos workers)"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+def db_call(method: str, *args, **kwargs):
+    """Chama um método do banco pelo serviço compartilhado (erros só são registrados)"""
+    try:
+        return getattr(get_database_service(), method)(*args, **kwargs)
+    except Exception as e:
+        print(f"⚠️ Erro ao salvar no banco ({method}): {e}")
+        return None
+
+def update_db_status(job_id, status, **fields):
+    """Atualiza o status do vídeo no banco"""
+    db_call('update_video_status', job_id, status, **fields)
+
+def content_hash(value) -> str:
+    """SHA-256 de um artefato em memória (texto, legendas, listas)"""
+    data = value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+def file_hash(path: str) -> str:
+    """SHA-256 de um artefato em disco (lido em blocos)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def record_artifact(state: Dict, value=None, path: Optional[str] = None, **metrics):
+    """Registra o artefato (e métricas extras) da etapa em execução"""
+    stage_metrics = state['metrics']
+    if path:
+        stage_metrics['artifact_path'] = path
+        stage_metrics['artifact_hash'] = file_hash(path)
+    if value is not None:
+        stage_metrics['artifact_hash'] = content_hash(value)
+    stage_metrics.update(metrics)
+
+def stage_script(scheduled):
+    """Etapa 1: gerar script (com ou sem template)"""
+    state = scheduled.state
+    topic, template_id = state['topic'], state['script_template_id']
+    
+    # Verificar se as variáveis de ambiente estão configuradas
+    if not os.environ.get("GROQ_API_KEY"):
+        raise Exception("GROQ_API_KEY não configurada. Configure a variável de ambiente.")
+    if not os.environ.get("PEXELS_KEY"):
+        raise Exception("PEXELS_KEY não configurada. Configure a variável de ambiente.")
+    
+    if template_id:
+        print(f"🎨 Usando template: {template_id}")
+        script_result = template_script_generator.generate_script_with_pauses(topic, template_id)
+        if 'error' in script_result:
+            print(f"❌ Erro no template: {script_result['error']}")
+            print("🔄 Usando geração padrão...")
+            response = generate_script(topic)
+        else:
+            response = script_result['script']
+            print(f"✅ Script gerado com template: {len(response.split())} palavras")
+    else:
+        print("📝 Usando geração padrão de script")
+        response = generate_script(topic)
+    
+    print(f"Script gerado: {response[:100]}...")
+    state['script'] = response
+    record_artifact(state, response)
+    if state['use_db'] and DB_AVAILABLE:
+        db_call('update_video_script', scheduled.job_id, response)
+
+def stage_audio(scheduled):
+    """Etapa 2: gerar áudio (TTS)"""
+    state = scheduled.state
+    audio_filename = state['context'].audio_path
+    run_coroutine(generate_audio(state['script'], audio_filename))
+    print(f"Áudio gerado: {audio_filename}")
+    state['audio_path'] = audio_filename
+    record_artifact(state, path=audio_filename)
+
+def stage_captions(scheduled):
+    """Etapa 3: gerar legendas"""
+    state = scheduled.state
+    timed_captions = generate_timed_captions(state['audio_path'], on_progress=state['context'].report_progress)
+    print(f"Legendas geradas: {len(timed_captions)} segmentos")
+    state['timed_captions'] = timed_captions
+    record_artifact(state, timed_captions)
+
+def stage_template(scheduled):
+    """Etapa 4: aplicar o template com timestamps reais"""
+    state = scheduled.state
+    template_id = state['template_id']
+    state['render_plan'] = None
+    if template_id:
+        print(f"🎨 APLICANDO TEMPLATE COM TIMESTAMPS REAIS: {template_id}")
+        template = template_manager.get_template(template_id)
+        if template:
+            # Aplicar configurações do template usando timestamps reais
+            state['render_plan'] = template_render_engine.apply_template_to_video(
+                video_path="",  # Será definido depois
+                template_id=template_id,
+                script=state['script'],  # Script já gerado
+                audio_path=state['audio_path'],  # Áudio já gerado
+                context=state['context']
+            )
+            print(f"✅ Template {template_id} aplicado com timestamps reais!")
+        else:
+            print(f"⚠️ Template {template_id} não encontrado, usando geração padrão")
+    record_artifact(state, state['render_plan'])
+
+def stage_keywords(scheduled):
+    """Etapa 5: gerar termos de busca"""
+    state = scheduled.state
+    search_terms = getVideoSearchQueriesTimed(state['script'], state['timed_captions'])
+    print(f"Termos de busca gerados: {len(search_terms) if search_terms else 0}")
+    state['search_terms'] = search_terms
+    record_artifact(state, search_terms)
+
+def stage_clips(scheduled):
+    """Etapa 6: buscar vídeos de fundo"""
+    state = scheduled.state
+    search_terms = state['search_terms']
+    background_video_urls = None
+    if search_terms:
+        background_video_urls = generate_video_url(search_terms, "pexel")
+        if background_video_urls:
+            background_video_urls = merge_empty_intervals(background_video_urls)
+            print(f"Vídeos de fundo encontrados: {len(background_video_urls)}")
+        else:
+            print("Nenhum vídeo de fundo encontrado")
+    
+    if not background_video_urls:
+        raise Exception("Não foi possível encontrar vídeos de fundo adequados")
+    state['background_video_urls'] = background_video_urls
+    record_artifact(state, background_video_urls)
+
+def stage_render(scheduled):
+    """Etapa 7: renderizar vídeo final (com template aplicado)"""
+    state = scheduled.state
+    print("🎬 Iniciando renderização com template...")
+    output_video = get_output_media(state['audio_path'], state['timed_captions'], state['background_video_urls'],
+                                    "pexel", context=state['context'], render_plan=state['render_plan'],
+                                    **(state['render_options'] or {}))
+    print(f"Vídeo renderizado: {output_video}")
+    state['video_path'] = output_video
+    # Legendas externas (.srt/.vtt/.ass) ao lado do vídeo fazem parte do resultado
+    state['subtitle_paths'] = [
+        str(path) for path in (Path(output_video).with_suffix(f'.{mode}') for mode in SIDECAR_MODES) if path.exists()
+    ]
+    record_artifact(state, path=output_video, bytes_downloaded=state['context'].downloaded_bytes)
+
+def stage_previews(scheduled):
+    """Etapa 8: pôster e prévia curta do vídeo final (cache pelo hash do vídeo)"""
+    state = scheduled.state
+    video_hash = state['artifact_hashes'].get('render') or file_hash(state['video_path'])
+    state['preview_hash'] = None
+    try:
+        previews = generate_previews(state['video_path'], video_hash)
+        state['preview_hash'] = video_hash
+        record_artifact(state, path=previews['clip'])
+    except Exception as e:
+        # Sem prévia o vídeo continua válido; a galeria mostra o ícone padrão
+        print(f"⚠️ Erro ao gerar prévias: {e}")
+
+# Pipeline de geração: etapas de I/O (LLM, TTS, HTTP) e de CPU (Whisper, renderização)
+VIDEO_PIPELINE = [
+    Stage('script', STAGE_IO, stage_script),
+    Stage('audio', STAGE_IO, stage_audio),
+    Stage('captions', STAGE_CPU, stage_captions),
+    Stage('template', STAGE_CPU, stage_template),
+    Stage('keywords', STAGE_IO, stage_keywords),
+    Stage('clips', STAGE_IO, stage_clips),
+    Stage('render', STAGE_CPU, stage_render),
+    Stage('previews', STAGE_CPU, stage_previews),
+]
+
+# Progresso do job ao iniciar cada etapa
+STAGE_PROGRESS = {'script': 20, 'audio': 40, 'captions': 50, 'template': 55, 'keywords': 60, 'clips': 70,
+                  'render': 80, 'previews': 96}
+
+# Faixa de progresso de cada etapa: do seu início ao início da seguinte (a última vai até 100)
+STAGE_RANGES = {
+    stage.name: (STAGE_PROGRESS[stage.name],
+                 STAGE_PROGRESS[VIDEO_PIPELINE[index + 1].name] if index + 1 < len(VIDEO_PIPELINE) else 100)
+    for index, stage in enumerate(VIDEO_PIPELINE)
+}
+
+def template_version(template_id: Optional[str]) -> Optional[str]:
+    """Hash do conteúdo do template (editar o JSON invalida as etapas que dependem dele)"""
+    template = template_manager.get_template(template_id) if template_id else None
+    return content_hash(template) if template else None
+
+# Checkpoints: a chave de cada etapa encadeia as chaves das etapas de que ela depende,
+# então mudar o template ou o perfil de encoder só invalida as etapas a jusante
+CHECKPOINTS = {
+    'script': CheckpointSpec(
+        inputs=lambda state: (state['topic'], state['script_template_id'], state['seed']),
+        outputs=('script',)),
+    'audio': CheckpointSpec(
+        inputs=lambda state: (state['stage_keys']['script'],),
+        outputs=('audio_path',),
+        files=('audio_path',)),
+    'captions': CheckpointSpec(
+        inputs=lambda state: (state['stage_keys']['audio'],),
+        outputs=('timed_captions',)),
+    'template': CheckpointSpec(
+        inputs=lambda state: (state['stage_keys']['captions'], state['template_id'],
+                              template_version(state['template_id'])),
+        outputs=('render_plan',)),
+    'keywords': CheckpointSpec(
+        inputs=lambda state: (state['stage_keys']['script'], state['stage_keys']['captions']),
+        outputs=('search_terms',)),
+    'clips': CheckpointSpec(
+        inputs=lambda state: (state['stage_keys']['keywords'],),
+        outputs=('background_video_urls',)),
+    'render': CheckpointSpec(
+        inputs=lambda state: (state['stage_keys']['template'], state['stage_keys']['clips'],
+                              sorted((state['render_options'] or {}).items())),
+        # O vídeo pode sair como .mp4 ou .mkv (ass_stream); ambos restaurados com a extensão original
+        outputs=('video_path', 'subtitle_paths'),
+        files=('video_path', 'subtitle_paths')),
+}
+
+class JobReporter:
+    """Destino dos eventos do pipeline (WebSocket no servidor, broker nos workers)"""
+
+    def stage_started(self, job_id: str, stage: str, progress: int):
+        pass
+
+    def progress(self, job_id: str, stage: str, progress: float, eta: Optional[int], detail: Optional[str]):
+        """Avanço dentro da etapa (já limitado pelo StageProgress); eta em segundos restantes da etapa"""
+        pass
+
+    def completed(self, job_id: str, result: Dict):
+        pass
+
+    def failed(self, job_id: str, error: str):
+        pass
+
+    def cancelled(self, job_id: str):
+        pass
+
+def build_job_state(topic: str, template_id: Optional[str] = None, render_options: Optional[Dict] = None,
+                    use_db: bool = False, seed: Optional[str] = None,
+                    script_template_id: Optional[str] = None) -> Dict:
+    """Estado inicial do pipeline (serializável, para poder atravessar o broker)
+
+    seed identifica a "linhagem" do conteúdo: uma nova tentativa ou um re-render com outro
+    template/perfil reutiliza a mesma seed (e o mesmo script) e só refaz as etapas invalidadas.
+    """
+    return {
+        'topic': topic,
+        'template_id': template_id,
+        'script_template_id': script_template_id if script_template_id is not None else template_id,
+        'render_options': render_options or {},
+        'use_db': use_db,
+        'seed': seed
+    }
+
+def schedule_pipeline(scheduler, job_id: str, state: Dict, reporter: JobReporter, priority: str = 'normal') -> int:
+    """Enfileira o pipeline de geração no agendador; retorna a posição na fila (QueueFullError se cheia)"""
+    use_db = state.get('use_db') and DB_AVAILABLE
+
+    def tracked(stage: Stage) -> Stage:
+        """Executa a etapa via checkpoint e registra início, fim, cache, bytes e artefato em PipelineStage"""
+        spec = CHECKPOINTS.get(stage.name)
+
+        def run(scheduled):
+            state = scheduled.state
+            # Workspace isolado do job (áudio, clips, configurações e saída)
+            if 'context' not in state:
+                state['context'] = RenderContext(job_id)
+            state.setdefault('stage_keys', {})
+            state.setdefault('artifact_hashes', {})
+            state['metrics'] = metrics = {
+                'cache_hit': False, 'bytes_downloaded': 0, 'artifact_hash': None, 'artifact_path': None
+            }
+            # Progresso real reportado de dentro da etapa (downloads, Whisper, MoviePy)
+            emit = lambda progress, eta, detail: reporter.progress(job_id, stage.name, progress, eta, detail)
+            stage_progress = StageProgress(emit, *STAGE_RANGES[stage.name])
+
+            def report(fraction, detail=None):
+                # Ponto de cancelamento: downloads, transcrição e codificação param no próximo avanço
+                scheduled.raise_if_cancelled()
+                stage_progress.update(fraction, detail)
+
+            state['context'].on_progress = report
+            record = db_call('start_stage', job_id, stage.name) if use_db else None
+            started = time.perf_counter()
+            status, error = 'FAILED', None
+            try:
+                key = stage_key(stage.name, spec.inputs(state)) if spec else None
+                state['stage_keys'][stage.name] = key
+                restored = load_checkpoint(stage.name, key, spec, state['context']) if spec else None
+                if restored is not None:
+                    print(f"♻️ Etapa {stage.name} reaproveitada do checkpoint {key[:12]}")
+                    metrics.update(cache_hit=True, artifact_hash=restored.pop('artifact_hash'))
+                    state.update(restored)
+                else:
+                    stage.run(scheduled)
+                    if spec:
+                        save_checkpoint(stage.name, key, spec, state, metrics['artifact_hash'])
+                state['artifact_hashes'][stage.name] = metrics['artifact_hash']
+                status = 'COMPLETED'
+            except JobCancelled:
+                status = 'CANCELLED'
+                raise
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                state['context'].on_progress = None
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                print(f"⏱️ Etapa {stage.name}: {duration_ms / 1000:.1f}s ({status})")
+                if record is not None:
+                    db_call('finish_stage', record.id, status, duration_ms, error=error, **metrics)
+
+        return Stage(stage.name, stage.kind, run)
+
+    def on_stage(scheduled, stage):
+        reporter.stage_started(job_id, stage.name, STAGE_PROGRESS[stage.name])
+
+    def on_finish(scheduled):
+        result = {
+            'video_path': scheduled.state['video_path'],
+            'audio_path': scheduled.state['audio_path'],
+            'duration': get_media_duration(scheduled.state['video_path']),
+            'preview_hash': scheduled.state.get('preview_hash')
+        }
+        if use_db:
+            update_db_status(job_id, "COMPLETED", **result)
+        reporter.completed(job_id, result)
+
+    def on_error(scheduled, error):
+        print(f"❌ Erro na geração: {error}")
+        if use_db:
+            update_db_status(job_id, "FAILED")
+        reporter.failed(job_id, str(error))
+
+    def on_cancel(scheduled):
+        print(f"🛑 Job cancelado: {job_id}")
+        if use_db:
+            update_db_status(job_id, "CANCELLED")
+        reporter.cancelled(job_id)
+
+    state = dict(state)
+    # Sem seed explícita o conteúdo é próprio do job (nova tentativa com o mesmo ID reaproveita as etapas)
+    state['seed'] = state.get('seed') or job_id
+    return scheduler.submit(job_id, [tracked(stage) for stage in VIDEO_PIPELINE], priority=priority, state=state,
+                            on_stage=on_stage, on_finish=on_finish, on_error=on_error, on_cancel=on_cancel)
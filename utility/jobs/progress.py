@@ -0,0 +1,53 @@
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+# Intervalo mínimo (s) entre eventos de progresso de um mesmo job
+PROGRESS_INTERVAL = float(os.environ.get("PROGRESS_INTERVAL", "1"))
+
+# Avanço mínimo (pontos percentuais) para emitir um novo evento
+PROGRESS_MIN_STEP = float(os.environ.get("PROGRESS_MIN_STEP", "0.5"))
+
+# Fração da etapa já concluída a partir da qual o ETA é estimado
+ETA_MIN_FRACTION = 0.02
+
+class StageProgress:
+    """Progresso de uma etapa (fração 0-1) mapeado na faixa do job, com ETA e limite de eventos
+
+    Atualizações são coalescidas: entre dois eventos só o valor mais recente importa,
+    então a etapa pode reportar a cada frame sem inundar o WebSocket.
+    """
+
+    def __init__(self, emit: Callable, start: float, end: float,
+                 interval: float = PROGRESS_INTERVAL, min_step: float = PROGRESS_MIN_STEP):
+        self.emit = emit
+        self.start = start
+        self.end = end
+        self.interval = interval
+        self.min_step = min_step
+        self.started = time.monotonic()
+        self._last_emit = 0.0
+        self._last_progress = start
+        self._lock = threading.Lock()
+
+    def update(self, fraction: float, detail: Optional[str] = None):
+        """Registra o avanço da etapa; emite só se passou o intervalo e o progresso andou o suficiente"""
+        fraction = min(max(fraction, 0.0), 1.0)
+        progress = round(self.start + (self.end - self.start) * fraction, 1)
+        now = time.monotonic()
+        with self._lock:
+            if fraction < 1.0 and (now - self._last_emit < self.interval
+                                   or progress - self._last_progress < self.min_step):
+                return
+            self._last_emit = now
+            self._last_progress = progress
+        self.emit(progress, self.eta(fraction, now), detail)
+
+    def eta(self, fraction: float, now: Optional[float] = None) -> Optional[int]:
+        """Segundos restantes da etapa, extrapolando o ritmo desde o início (None se cedo demais)"""
+        if fraction < ETA_MIN_FRACTION:
+            return None
+        elapsed = (now or time.monotonic()) - self.started
+        return int(elapsed / fraction * (1.0 - fraction))
+
@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Jobs finalizados mantidos em memória: por quanto tempo (s) e quantos no máximo
+JOB_REGISTRY_TTL = float(os.environ.get("JOB_REGISTRY_TTL", "3600"))
+JOB_REGISTRY_MAX_FINISHED = int(os.environ.get("JOB_REGISTRY_MAX_FINISHED", "500"))
+
+# Arquivo SQLite com os jobs finalizados (modo sem banco: consultas depois que saem da memória)
+JOB_ARCHIVE_PATH = os.environ.get("JOB_ARCHIVE_PATH", "renders/_jobs.sqlite3")
+
+FINISHED_STATUSES = ('COMPLETED', 'FAILED', 'CANCELLED')
+
+class JobRegistry:
+    """Jobs em memória indexados por ID: ativos sempre, finalizados até o TTL ou o limite de tamanho
+
+    Os finalizados ficam em uma OrderedDict na ordem de finalização, então a expiração
+    só olha o início da fila. A busca por ID é O(1) nos dois conjuntos.
+    """
+
+    def __init__(self, ttl: float = JOB_REGISTRY_TTL, max_finished: int = JOB_REGISTRY_MAX_FINISHED):
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._active: Dict[str, Any] = {}
+        self._finished: 'OrderedDict[str, Any]' = OrderedDict()
+        self._finished_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __setitem__(self, job_id: str, job):
+        with self._lock:
+            self._drop_finished(job_id)
+            self._active[job_id] = job
+
+    def __delitem__(self, job_id: str):
+        with self._lock:
+            if self._active.pop(job_id, None) is None and self._drop_finished(job_id) is None:
+                raise KeyError(job_id)
+
+    def __getitem__(self, job_id: str):
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict()
+            return len(self._active) + len(self._finished)
+
+    def get(self, job_id: str, default=None):
+        with self._lock:
+            self._evict()
+            job = self._active.get(job_id)
+            if job is None:
+                job = self._finished.get(job_id, default)
+            return job
+
+    def values(self) -> List:
+        """Cópia dos jobs em memória (ativos e finalizados ainda retidos)"""
+        with self._lock:
+            self._evict()
+            return list(self._active.values()) + list(self._finished.values())
+
+    def update_status(self, job_id: str, status: str):
+        """Move o job entre ativos e finalizados conforme o status e expira os finalizados antigos"""
+        with self._lock:
+            if status in FINISHED_STATUSES:
+                job = self._active.pop(job_id, None) or self._drop_finished(job_id)
+                if job is not None:
+                    self._finished[job_id] = job
+                    self._finished_at[job_id] = time.monotonic()
+            else:
+                job = self._drop_finished(job_id)
+                if job is not None:
+                    # Nova tentativa: volta a ser ativo
+                    self._active[job_id] = job
+            self._evict()
+
+    def _drop_finished(self, job_id: str):
+        self._finished_at.pop(job_id, None)
+        return self._finished.pop(job_id, None)
+
+    def _evict(self):
+        """Retira da memória os finalizados além do limite ou mais velhos que o TTL
+
+        Chamada também nas leituras: sem novas finalizações, os expirados não ficam retidos.
+        """
+        expired_before = time.monotonic() - self.ttl
+        while self._finished:
+            job_id = next(iter(self._finished))
+            if len(self._finished) <= self.max_finished and self._finished_at[job_id] >= expired_before:
+                break
+            self._drop_finished(job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._evict()
+            return {'active': len(self._active), 'finished': len(self._finished),
+                    'ttl': self.ttl, 'max_finished': self.max_finished}
+
+def archive_timestamp(created_at: datetime) -> str:
+    """created_at com largura fixa: a ordem do texto no SQLite é a ordem cronológica"""
+    return created_at.isoformat(timespec='microseconds')
+
+class JobArchive:
+    """Jobs finalizados gravados em SQLite: busca por ID e páginas por (created_at, id)"""
+
+    def __init__(self, path: str = JOB_ARCHIVE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._db().executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                status TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at, id);
+        """)
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão por thread (callbacks do pipeline e requisições gravam/leem em paralelo)"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def save(self, job_id: str, created_at: datetime, status: str, topic: str, record: Dict):
+        self._db().execute("INSERT OR REPLACE INTO jobs (id, created_at, status, topic, data) VALUES (?, ?, ?, ?, ?)",
+                           (job_id, archive_timestamp(created_at), status, topic, json.dumps(record, default=str)))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._db().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def page(self, limit: int, cursor=None, status: Optional[str] = None, topic: Optional[str] = None) -> List[Dict]:
+        """Até limit registros, do mais recente para o mais antigo, depois do cursor (created_at, id)"""
+        query, params = "SELECT data FROM jobs WHERE 1 = 1", []
+        if cursor:
+            created_at, job_id = cursor
+            query += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += [archive_timestamp(created_at), archive_timestamp(created_at), job_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        if topic:
+            query += " AND topic LIKE ?"
+            params.append(f"%{topic}%")
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [json.loads(row[0]) for row in self._db().execute(query, params).fetchall()]
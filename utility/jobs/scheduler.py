@@ -0,0 +1,234 @@
+import heapq
+import itertools
+import os
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# Workers por tipo de etapa: I/O (LLM, TTS, HTTP) e CPU (Whisper, renderização)
+SCHEDULER_IO_WORKERS = int(os.environ.get("SCHEDULER_IO_WORKERS", "4"))
+SCHEDULER_CPU_WORKERS = int(os.environ.get("SCHEDULER_CPU_WORKERS", "1"))
+
+# Máximo de jobs admitidos e ainda não finalizados (acima disso: 429)
+SCHEDULER_MAX_QUEUE = int(os.environ.get("SCHEDULER_MAX_QUEUE", "8"))
+
+STAGE_IO = 'io'
+STAGE_CPU = 'cpu'
+
+# Menor valor = atendido primeiro
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+class QueueFullError(Exception):
+    """Fila do agendador cheia"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Fila cheia ({limit} jobs)")
+        self.limit = limit
+
+class JobCancelled(Exception):
+    """Job cancelado durante a execução"""
+
+@dataclass(frozen=True)
+class Stage:
+    """Etapa do pipeline: função que recebe o ScheduledJob e o pool onde roda"""
+    name: str
+    kind: str
+    run: Callable
+
+class ScheduledJob:
+    """Job no agendador: etapas, prioridade e estado compartilhado entre as etapas"""
+
+    def __init__(self, job_id: str, stages: List[Stage], priority: int, sequence: int, state: Dict,
+                 on_stage=None, on_finish=None, on_error=None, on_cancel=None):
+        self.job_id = job_id
+        self.stages = stages
+        self.priority = priority
+        self.sequence = sequence
+        self.state = state
+        self.stage_index = 0
+        self.running = False
+        self.cancelled = threading.Event()
+        self.on_stage = on_stage
+        self.on_finish = on_finish
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+
+    @property
+    def current_stage(self) -> Optional[Stage]:
+        return self.stages[self.stage_index] if self.stage_index < len(self.stages) else None
+
+    def raise_if_cancelled(self):
+        """Ponto de cancelamento para etapas longas"""
+        if self.cancelled.is_set():
+            raise JobCancelled(self.job_id)
+
+class StagePool:
+    """Pool de threads com fila de prioridade para um tipo de etapa"""
+
+    def __init__(self, kind: str, workers: int, scheduler: 'JobScheduler'):
+        self.kind = kind
+        self.scheduler = scheduler
+        self._heap = []
+        self._cond = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"jobs-{kind}-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job: ScheduledJob):
+        with self._cond:
+            heapq.heappush(self._heap, (job.priority, job.sequence, job))
+            self._cond.notify()
+
+    def waiting(self) -> List[ScheduledJob]:
+        """Jobs aguardando neste pool, na ordem de atendimento"""
+        with self._cond:
+            return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2])
+                    if not entry[2].cancelled.is_set()]
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+            self.scheduler._run_stage(job)
+
+    @property
+    def size(self) -> int:
+        return len(self._threads)
+
+class JobScheduler:
+    """Agendador de jobs: pools limitados por tipo de etapa, fila limitada, prioridades e cancelamento"""
+
+    def __init__(self, io_workers: int = SCHEDULER_IO_WORKERS, cpu_workers: int = SCHEDULER_CPU_WORKERS,
+                 max_queue: int = SCHEDULER_MAX_QUEUE):
+        self.max_queue = max_queue
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.pools = {
+            STAGE_IO: StagePool(STAGE_IO, io_workers, self),
+            STAGE_CPU: StagePool(STAGE_CPU, cpu_workers, self),
+        }
+
+    def submit(self, job_id: str, stages: List[Stage], priority: str = 'normal', state: Optional[Dict] = None,
+               on_stage=None, on_finish=None, on_error=None, on_cancel=None) -> int:
+        """Admite um job e enfileira sua primeira etapa; retorna a posição na fila
+
+        Lança QueueFullError se já houver max_queue jobs não finalizados.
+        """
+        with self._lock:
+            if len(self._jobs) >= self.max_queue:
+                raise QueueFullError(self.max_queue)
+            job = ScheduledJob(job_id, stages, PRIORITIES.get(priority, PRIORITIES['normal']),
+                               next(self._sequence), state if state is not None else {},
+                               on_stage, on_finish, on_error, on_cancel)
+            self._jobs[job_id] = job
+        self.pools[stages[0].kind].submit(job)
+        return self.position(job_id) or 0
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela um job: sai da fila imediatamente ou para na próxima etapa se estiver rodando"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.cancelled.set()
+            if job.running:
+                return True
+            # Ainda na fila: a entrada é descartada quando o pool a retirar
+            del self._jobs[job_id]
+        self._callback(job.on_cancel, job)
+        return True
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Posição do job na fila do pool onde aguarda (0 = executando, None = desconhecido)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.running or job.current_stage is None:
+            return 0
+        for index, waiting in enumerate(self.pools[job.current_stage.kind].waiting()):
+            if waiting is job:
+                return index + 1
+        return 0
+
+    def job_ids(self) -> List[str]:
+        """Jobs admitidos e ainda não finalizados"""
+        with self._lock:
+            return list(self._jobs)
+
+    def stats(self) -> Dict:
+        """Estado atual dos pools e da fila"""
+        return {
+            'active_jobs': len(self._jobs),
+            'max_queue': self.max_queue,
+            'pools': {
+                kind: {'workers': pool.size, 'waiting': len(pool.waiting())}
+                for kind, pool in self.pools.items()
+            }
+        }
+
+    def _callback(self, callback, job: ScheduledJob, *args):
+        if callback is None:
+            return
+        try:
+            callback(job, *args)
+        except Exception as e:
+            print(f"⚠️ Erro no callback do job {job.job_id}: {e}")
+
+    def _finish(self, job: ScheduledJob):
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+
+    def _run_stage(self, job: ScheduledJob):
+        with self._lock:
+            if job.cancelled.is_set():
+                return
+            job.running = True
+        stage = job.current_stage
+
+        try:
+            self._callback(job.on_stage, job, stage)
+            stage.run(job)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job)
+            self._callback(job.on_error, job, e)
+            return
+
+        with self._lock:
+            job.running = False
+            cancelled = job.cancelled.is_set()
+        if cancelled:
+            self._finish(job)
+            self._callback(job.on_cancel, job)
+            return
+
+        job.stage_index += 1
+        next_stage = job.current_stage
+        if next_stage is None:
+            self._finish(job)
+            self._callback(job.on_finish, job)
+            return
+        self.pools[next_stage.kind].submit(job)
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_job_scheduler() -> JobScheduler:
+    """Agendador compartilhado do processo (pools criados no primeiro uso)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = JobScheduler()
+                print(f"🧵 Agendador de jobs: {SCHEDULER_IO_WORKERS} workers de I/O, "
+                      f"{SCHEDULER_CPU_WORKERS} de CPU, fila de {SCHEDULER_MAX_QUEUE}")
+    return _scheduler
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Worker de renderização: consome jobs do broker e publica o progresso de volta
+Uso: python -m utility.jobs.worker [--io-workers N] [--cpu-workers N] [--max-jobs N]
+"""
+
+import argparse
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Optional
+
+from utility.jobs.broker import BROKER_LEASE_SECONDS, get_job_broker
+from utility.jobs.pipeline import JobReporter, schedule_pipeline
+from utility.jobs.scheduler import SCHEDULER_CPU_WORKERS, SCHEDULER_IO_WORKERS, JobScheduler
+
+# Intervalo (s) entre buscas de novos jobs na fila
+WORKER_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "1"))
+
+# Jobs simultâneos por worker (as etapas continuam limitadas pelos pools)
+WORKER_MAX_JOBS = int(os.environ.get("WORKER_MAX_JOBS", "2"))
+
+class BrokerReporter(JobReporter):
+    """Publica os eventos do pipeline no broker para o servidor retransmitir"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def stage_started(self, job_id: str, stage: str, progress: int):
+        self.broker.publish(job_id, 'stage', {'stage': stage, 'progress': progress})
+
+    def progress(self, job_id: str, stage: str, progress: float, eta: Optional[int], detail: Optional[str]):
+        self.broker.publish(job_id, 'progress', {'stage': stage, 'progress': progress, 'eta': eta, 'detail': detail})
+
+    def completed(self, job_id: str, result: Dict):
+        self.broker.finish(job_id, 'COMPLETED', 'completed', result)
+
+    def failed(self, job_id: str, error: str):
+        self.broker.finish(job_id, 'FAILED', 'failed', {'error': error})
+
+    def cancelled(self, job_id: str):
+        self.broker.finish(job_id, 'CANCELLED', 'cancelled', {})
+
+def run_worker(worker_id: str, io_workers: int = SCHEDULER_IO_WORKERS, cpu_workers: int = SCHEDULER_CPU_WORKERS,
+               max_jobs: int = WORKER_MAX_JOBS):
+    """Laço principal: renova a posse, repassa cancelamentos e reivindica jobs enquanto houver capacidade"""
+    broker = get_job_broker()
+    scheduler = JobScheduler(io_workers=io_workers, cpu_workers=cpu_workers, max_queue=max_jobs)
+    reporter = BrokerReporter(broker)
+    print(f"👷 Worker {worker_id}: {io_workers} workers de I/O, {cpu_workers} de CPU, até {max_jobs} jobs")
+
+    last_heartbeat = 0.0
+    while True:
+        now = time.time()
+        if now - last_heartbeat >= BROKER_LEASE_SECONDS / 4:
+            broker.heartbeat(worker_id)
+            requeued = broker.requeue_stale()
+            if requeued:
+                print(f"🔁 {requeued} jobs de workers inativos devolvidos à fila")
+            last_heartbeat = now
+
+        for job_id in broker.cancel_requested(scheduler.job_ids()):
+            scheduler.cancel(job_id)
+
+        claimed = False
+        while len(scheduler.job_ids()) < max_jobs:
+            job = broker.claim(worker_id)
+            if job is None:
+                break
+            job_id, payload = job
+            print(f"📥 Job {job_id} reivindicado: {payload['state']['topic']}")
+            schedule_pipeline(scheduler, job_id, payload['state'], reporter, priority=payload.get('priority', 'normal'))
+            claimed = True
+
+        if not claimed:
+            time.sleep(WORKER_POLL_INTERVAL)
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de renderização de vídeos")
+    parser.add_argument("--io-workers", type=int, default=SCHEDULER_IO_WORKERS, help="Threads para etapas de I/O")
+    parser.add_argument("--cpu-workers", type=int, default=SCHEDULER_CPU_WORKERS, help="Threads para etapas de CPU")
+    parser.add_argument("--max-jobs", type=int, default=WORKER_MAX_JOBS, help="Jobs simultâneos neste worker")
+    parser.add_argument("--worker-id", default=None, help="Identificador do worker (padrão: host-uuid)")
+    args = parser.parse_args()
+
+    worker_id = args.worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    try:
+        run_worker(worker_id, args.io_workers, args.cpu_workers, args.max_jobs)
+    except KeyboardInterrupt:
+        print(f"👋 Worker {worker_id} encerrado")
+
+if __name__ == '__main__':
+    main()
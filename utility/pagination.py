@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+# Status válidos de um vídeo (enum VideoStatus do schema)
+VIDEO_STATUSES = ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED')
+
+# Tamanho máximo de uma página da listagem
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(created_at: datetime, video_id: str) -> str:
+    """Cursor opaco de paginação a partir do último item da página (createdAt, id)"""
+    raw = json.dumps([created_at.isoformat(), str(video_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverso de encode_cursor (ValueError se o cursor for inválido)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, video_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(video_id)
+    except Exception:
+        raise ValueError(f"Cursor inválido: {cursor}")
@@ -0,0 +1,122 @@
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+# Cores reconhecidas nos nomes de color_scheme (ex: "dark_red_cyan")
+COLOR_NAMES = {
+    'red': (255, 40, 40),
+    'orange': (255, 140, 0),
+    'yellow': (255, 220, 0),
+    'gold': (255, 190, 60),
+    'green': (40, 200, 80),
+    'teal': (0, 160, 150),
+    'cyan': (0, 220, 255),
+    'blue': (40, 80, 255),
+    'purple': (150, 60, 220),
+    'magenta': (230, 40, 200),
+}
+
+# Modificadores de tom: (brilho, contraste)
+TONE_MODIFIERS = {
+    'dark': (-0.08, 1.1),
+    'intense': (0.0, 1.25),
+    'bright': (0.06, 1.0),
+    'soft': (0.02, 0.9),
+}
+
+# Intensidade do split toning (sombras na 1ª cor, altas luzes na 2ª)
+TINT_STRENGTH = 0.22
+
+def _tint_offset(color) -> np.ndarray:
+    """Deslocamento por canal de uma cor em relação ao cinza"""
+    rgb = np.array(color, dtype=np.float32) / 255.0
+    return rgb - rgb.mean()
+
+@lru_cache(maxsize=64)
+def compile_color_scheme(color_scheme: str) -> Optional[np.ndarray]:
+    """Compila um color_scheme em uma LUT por canal (3 x 256, uint8); None se não reconhecido"""
+    tokens = (color_scheme or '').lower().split('_')
+    colors = [COLOR_NAMES[token] for token in tokens if token in COLOR_NAMES]
+    modifiers = [TONE_MODIFIERS[token] for token in tokens if token in TONE_MODIFIERS]
+    if not colors and not modifiers:
+        return None
+
+    brightness = sum(modifier[0] for modifier in modifiers)
+    contrast = float(np.prod([modifier[1] for modifier in modifiers])) if modifiers else 1.0
+    shadow_tint = _tint_offset(colors[0]) if colors else np.zeros(3, dtype=np.float32)
+    highlight_tint = _tint_offset(colors[-1]) if colors else np.zeros(3, dtype=np.float32)
+
+    x = np.linspace(0.0, 1.0, 256, dtype=np.float32)
+    shadows = (1.0 - x) ** 2
+    highlights = x ** 2
+
+    lut = np.empty((3, 256), dtype=np.uint8)
+    for channel in range(3):
+        curve = (x - 0.5) * contrast + 0.5 + brightness
+        curve += TINT_STRENGTH * (shadows * shadow_tint[channel] + highlights * highlight_tint[channel])
+        lut[channel] = np.clip(np.round(curve * 255.0), 0, 255).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+@lru_cache(maxsize=64)
+def compile_pair_tables(color_scheme: str) -> Optional[np.ndarray]:
+    """Tabelas de 16 bits que gradeiam dois bytes por consulta (3 x 65536, uint16)
+
+    Lido como uint16, um par de pixels RGB vira (R,G), (B,R), (G,B): uma tabela por posição.
+    """
+    lut = compile_color_scheme(color_scheme)
+    if lut is None:
+        return None
+    values = np.arange(65536, dtype=np.uint32)
+    low, high = values & 255, values >> 8
+    tables = np.empty((3, 65536), dtype=np.uint16)
+    for position, (low_channel, high_channel) in enumerate(((0, 1), (2, 0), (1, 2))):
+        # uint16 little-endian: o primeiro byte é o menos significativo
+        tables[position] = lut[low_channel][low] | (lut[high_channel][high].astype(np.uint16) << 8)
+    tables.flags.writeable = False
+    return tables
+
+def apply_lut(frame: np.ndarray, lut: np.ndarray, pair_tables: Optional[np.ndarray] = None) -> np.ndarray:
+    """Aplica a LUT por canal a um frame RGB uint8 (consulta de tabela vetorizada)"""
+    frame = np.ascontiguousarray(frame)
+    if pair_tables is not None and frame.size % 6 == 0:
+        pairs = frame.reshape(-1, 6).view('<u2')
+        graded = np.empty_like(pairs)
+        for position in range(3):
+            np.take(pair_tables[position], pairs[:, position], out=graded[:, position])
+        return graded.view(np.uint8).reshape(frame.shape)
+
+    graded = np.empty_like(frame)
+    for channel in range(3):
+        np.take(lut[channel], frame[..., channel], out=graded[..., channel])
+    return graded
+
+def apply_color_grading(video_clip, timeline, start: float = 0.0):
+    """Aplica o grading de cada seção da timeline ao clip, só dentro da faixa de tempo da seção
+
+    start é a posição do clip na timeline final.
+    """
+    if timeline is None:
+        return video_clip
+
+    clip_end = start + (video_clip.duration or timeline.duration)
+    ranges = []
+    for section in timeline.sections:
+        if section.end <= start or section.start >= clip_end:
+            continue
+        lut = compile_color_scheme(section.color_scheme)
+        if lut is not None:
+            ranges.append((section.start, section.end, lut, compile_pair_tables(section.color_scheme)))
+    if not ranges:
+        return video_clip
+
+    def grade(get_frame, t):
+        frame = get_frame(t)
+        timeline_t = start + t
+        for section_start, section_end, lut, pair_tables in ranges:
+            if section_start <= timeline_t < section_end:
+                return apply_lut(frame, lut, pair_tables)
+        return frame
+
+    return video_clip.fl(grade, keep_duration=True)
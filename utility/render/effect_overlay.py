@@ -0,0 +1,139 @@
+import hashlib
+import os
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from utility.utils import get_ffmpeg_binary
+from utility.render.render_context import RENDER_WORKDIR
+from utility.templates.asset_catalog import get_asset_catalog
+
+# Efeitos já redimensionados para a resolução de saída, reaproveitados entre jobs
+EFFECT_CACHE_DIR = os.environ.get("EFFECT_CACHE_DIR", os.path.join(RENDER_WORKDIR, "_cache", "effects"))
+
+# Modos de mistura do overlay sobre o frame
+# - screen: clareia sem estourar (light leaks, film, partículas sobre fundo preto)
+# - add: soma saturada, mais intensa
+BLEND_MODES = ['screen', 'add']
+
+@dataclass(frozen=True)
+class ScheduledEffect:
+    """Efeito visual posicionado na timeline final"""
+    path: str
+    start: float
+    end: float
+    blend: str = 'screen'
+
+def schedule_effects(timeline) -> Tuple[ScheduledEffect, ...]:
+    """Agenda os efeitos de cada seção da timeline dentro da janela da seção, em sequência"""
+    schedule = []
+    catalog = get_asset_catalog()
+    for section in timeline.sections:
+        start, end = section.start, section.end
+        effects = []
+        for effect_path in section.video_effects:
+            if catalog.exists(effect_path):
+                effects.append(effect_path)
+            else:
+                print(f"   ❌ Efeito visual não encontrado: {effect_path}")
+        if not effects or end <= start:
+            continue
+
+        blend = section.effect_blend if section.effect_blend in BLEND_MODES else 'screen'
+        # Cada efeito ocupa uma fatia igual da seção
+        slot = (end - start) / len(effects)
+        for index, effect_path in enumerate(effects):
+            schedule.append(ScheduledEffect(effect_path, start + index * slot, start + (index + 1) * slot, blend))
+    return tuple(schedule)
+
+def _cached_effect_path(effect_path: str, size: Tuple[int, int], fps: int) -> Path:
+    """Caminho no cache do efeito pré-escalado (muda se o arquivo de origem mudar)"""
+    stat = os.stat(effect_path)
+    key = f"{os.path.abspath(effect_path)}|{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}|{fps}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return Path(EFFECT_CACHE_DIR) / f"{Path(effect_path).stem}_{size[0]}x{size[1]}_{fps}_{digest}.mp4"
+
+def prescale_effect(effect_path: str, size: Tuple[int, int], fps: int) -> str:
+    """Redimensiona o efeito para a resolução/fps de saída uma única vez e guarda no cache"""
+    cached_path = _cached_effect_path(effect_path, size, fps)
+    if cached_path.exists():
+        return str(cached_path)
+
+    cached_path.parent.mkdir(parents=True, exist_ok=True)
+    # Escreve em arquivo temporário e renomeia: jobs simultâneos não leem arquivo pela metade
+    temp_path = cached_path.with_name(f"{cached_path.stem}.{os.getpid()}.tmp.mp4")
+    subprocess.run([
+        get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-i', effect_path,
+        '-vf', f"scale={size[0]}:{size[1]},fps={fps}",
+        '-an', '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p',
+        str(temp_path)
+    ], check=True)
+    os.replace(temp_path, cached_path)
+    print(f"   🗂️ Efeito pré-escalado em cache: {cached_path.name}")
+    return str(cached_path)
+
+def prepare_effects(schedule, size: Tuple[int, int], fps: int) -> Tuple[ScheduledEffect, ...]:
+    """Troca os caminhos dos efeitos pelas versões pré-escaladas do cache"""
+    prepared = []
+    catalog = get_asset_catalog()
+    for effect in schedule:
+        try:
+            scaled_path = catalog.prescaled_effect(effect.path, size, fps)
+            prepared.append(ScheduledEffect(scaled_path, effect.start, effect.end, effect.blend))
+        except Exception as e:
+            print(f"   ❌ Erro ao preparar efeito visual {effect.path}: {e}")
+    return tuple(prepared)
+
+def blend_frames(base: np.ndarray, overlay: np.ndarray, mode: str = 'screen') -> np.ndarray:
+    """Mistura dois frames RGB uint8 de forma vetorizada"""
+    base16 = base.astype(np.uint16)
+    overlay16 = overlay.astype(np.uint16)
+    if mode == 'add':
+        blended = np.minimum(base16 + overlay16, 255)
+    else:
+        # screen: 1 - (1 - a)(1 - b), em inteiros
+        blended = base16 + overlay16 - (base16 * overlay16 + 127) // 255
+    return blended.astype(np.uint8)
+
+def apply_effect_overlays(video_clip, schedule, offset: float = 0.0):
+    """Aplica os efeitos agendados em uma única passada sobre a timeline final
+
+    offset é o início do trecho renderizado na timeline (renderização segmentada).
+    """
+    if not schedule:
+        return video_clip
+
+    from moviepy.editor import VideoFileClip
+
+    window_end = offset + video_clip.duration if video_clip.duration else float('inf')
+    active = [effect for effect in schedule if effect.end > offset and effect.start < window_end]
+    if not active:
+        return video_clip
+
+    # Cada arquivo de efeito é aberto uma vez, independente de quantos clips de fundo existam
+    readers: Dict[str, object] = {}
+    for effect in active:
+        if effect.path not in readers:
+            readers[effect.path] = VideoFileClip(effect.path, audio=False)
+
+    print(f"🎬 Aplicando {len(active)} efeitos visuais do template em passada única")
+
+    def blend(get_frame, t):
+        frame = get_frame(t)
+        timeline_t = t + offset
+        for effect in active:
+            if effect.start <= timeline_t < effect.end:
+                reader = readers[effect.path]
+                # Efeitos mais curtos que a janela são repetidos em loop
+                local_t = (timeline_t - effect.start) % reader.duration
+                overlay = reader.get_frame(local_t)
+                if overlay.shape != frame.shape:
+                    continue
+                frame = blend_frames(frame, overlay, effect.blend)
+        return frame
+
+    return video_clip.fl(blend, keep_duration=True)
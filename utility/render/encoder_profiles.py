@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """Perfil de saída do encoder (qualidade x velocidade)"""
+    name: str
+    preset: str = 'veryfast'
+    crf: int = 23
+    threads: Optional[int] = None  # None = automático
+    scale: float = 1.0
+    fps: int = 25
+    audio_bitrate: str = '128k'
+    codec: str = 'libx264'
+    audio_codec: str = 'aac'
+
+    def ffmpeg_params(self) -> List[str]:
+        """Parâmetros extras do ffmpeg (controle de qualidade por CRF)"""
+        return ['-crf', str(self.crf)]
+
+    def scaled_size(self, size) -> tuple:
+        """Aplica a escala de resolução mantendo dimensões pares (exigência do yuv420p)"""
+        width, height = size
+        return (max(2, int(width * self.scale) // 2 * 2), max(2, int(height * self.scale) // 2 * 2))
+
+# moov no início do MP4: o player começa a tocar antes de baixar o arquivo inteiro (só no arquivo final)
+FASTSTART_PARAMS = ['-movflags', '+faststart']
+
+ENCODER_PROFILES = {
+    # Rascunho para aprovação de conteúdo: baixa resolução, encode em segundos
+    'draft': EncoderProfile(name='draft', preset='ultrafast', crf=32, scale=0.33, fps=15, audio_bitrate='64k'),
+    'preview': EncoderProfile(name='preview', preset='veryfast', crf=28, scale=0.5, fps=25, audio_bitrate='96k'),
+    # Mesmo resultado do encode original (veryfast, 25 fps)
+    'standard': EncoderProfile(name='standard', preset='veryfast', crf=23, scale=1.0, fps=25, audio_bitrate='128k'),
+    'archival': EncoderProfile(name='archival', preset='slow', crf=18, scale=1.0, fps=30, audio_bitrate='192k'),
+}
+
+DEFAULT_ENCODER_PROFILE = 'standard'
+
+def get_encoder_profile(name: Optional[str] = None) -> EncoderProfile:
+    """Retorna um perfil pelo nome (ou o padrão)"""
+    profile = ENCODER_PROFILES.get(name or DEFAULT_ENCODER_PROFILE)
+    if profile is None:
+        print(f"⚠️ Perfil de encoder desconhecido: {name}, usando '{DEFAULT_ENCODER_PROFILE}'")
+        profile = ENCODER_PROFILES[DEFAULT_ENCODER_PROFILE]
+    return profile
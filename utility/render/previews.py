@@ -0,0 +1,67 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+from utility.utils import get_ffmpeg_binary, get_media_duration
+from utility.render.encoder_profiles import FASTSTART_PARAMS
+
+# Pôsteres e prévias dos vídeos finalizados, nomeados pelo hash do vídeo
+PREVIEW_DIR = os.environ.get("PREVIEW_DIR", "renders/_cache/previews")
+
+# Prévia animada: duração (s), largura (px) e fps
+PREVIEW_SECONDS = float(os.environ.get("PREVIEW_SECONDS", "3"))
+PREVIEW_WIDTH = int(os.environ.get("PREVIEW_WIDTH", "320"))
+PREVIEW_FPS = 12
+
+# Tipo de prévia -> extensão do arquivo
+PREVIEW_KINDS = {'poster': 'jpg', 'clip': 'mp4'}
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def preview_path(video_hash: str, kind: str) -> Optional[Path]:
+    """Arquivo de uma prévia (None se o hash ou o tipo forem inválidos)"""
+    if kind not in PREVIEW_KINDS or not _HASH_PATTERN.match(video_hash or ''):
+        return None
+    return Path(PREVIEW_DIR) / f"{video_hash}.{PREVIEW_KINDS[kind]}"
+
+def _run_ffmpeg(args, target: Path):
+    """Executa o ffmpeg gravando em arquivo temporário e renomeia (jobs simultâneos não leem pela metade)"""
+    temp_path = target.with_name(f"{target.stem}.{os.getpid()}.tmp{target.suffix}")
+    try:
+        subprocess.run([get_ffmpeg_binary(), '-y', '-loglevel', 'error', *args, str(temp_path)], check=True)
+        os.replace(temp_path, target)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+def generate_previews(video_path: str, video_hash: str) -> Dict[str, str]:
+    """Gera (ou reaproveita do cache) o pôster e a prévia de alguns segundos do vídeo
+
+    O pôster é um frame a 10% da duração; a prévia começa a 20%, sem áudio e em baixa taxa.
+    """
+    poster, clip = preview_path(video_hash, 'poster'), preview_path(video_hash, 'clip')
+    if poster is None:
+        raise ValueError(f"Hash de vídeo inválido: {video_hash}")
+    if poster.exists() and clip.exists():
+        print(f"♻️ Prévias reaproveitadas do cache: {video_hash[:12]}")
+        return {'poster': str(poster), 'clip': str(clip)}
+
+    poster.parent.mkdir(parents=True, exist_ok=True)
+    duration = get_media_duration(video_path) or 0.0
+    scale = f"scale={PREVIEW_WIDTH}:-2"
+
+    if not poster.exists():
+        _run_ffmpeg(['-ss', f"{duration * 0.1:.2f}", '-i', video_path,
+                     '-frames:v', '1', '-vf', scale, '-q:v', '4'], poster)
+
+    if not clip.exists():
+        start = max(0.0, min(duration * 0.2, duration - PREVIEW_SECONDS))
+        _run_ffmpeg(['-ss', f"{start:.2f}", '-t', f"{PREVIEW_SECONDS:.2f}", '-i', video_path,
+                     '-an', '-vf', f"{scale},fps={PREVIEW_FPS}",
+                     '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '32', '-pix_fmt', 'yuv420p',
+                     *FASTSTART_PARAMS], clip)
+
+    print(f"🖼️ Prévias geradas: {poster.name}, {clip.name}")
+    return {'poster': str(poster), 'clip': str(clip)}
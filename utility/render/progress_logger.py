@@ -0,0 +1,25 @@
+from typing import Callable, Dict, Tuple
+
+from proglog import ProgressBarLogger
+
+class MoviePyProgressLogger(ProgressBarLogger):
+    """Logger do proglog que repassa as barras do write_videofile como progresso
+
+    O MoviePy escreve primeiro o áudio (barra 'chunk') e depois os frames (barra 't');
+    cada barra ocupa sua faixa da fração reportada.
+    """
+
+    BAR_RANGES: Dict[str, Tuple[float, float]] = {'chunk': (0.0, 0.1), 't': (0.1, 1.0)}
+    BAR_DETAILS = {'chunk': "áudio", 't': "codificação"}
+
+    def __init__(self, report: Callable):
+        super().__init__()
+        self.report = report
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if attr != 'index' or bar not in self.BAR_RANGES:
+            return
+        total = self.bars[bar].get('total')
+        if total:
+            start, end = self.BAR_RANGES[bar]
+            self.report(start + (end - start) * min(value / total, 1.0), self.BAR_DETAILS[bar])
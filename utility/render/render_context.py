@@ -0,0 +1,57 @@
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional
+
+# Diretório base onde cada job ganha seu próprio workspace
+RENDER_WORKDIR = os.environ.get("RENDER_WORKDIR", "renders")
+
+class RenderContext:
+    """Workspace isolado de um job: áudio, clips, configurações e saída"""
+
+    def __init__(self, job_id: Optional[str] = None, base_dir: str = RENDER_WORKDIR):
+        self.job_id = str(job_id) if job_id else uuid.uuid4().hex
+        self.work_dir = Path(base_dir) / self.job_id
+        self.clips_dir = self.work_dir / "clips"
+        self.configs_dir = self.work_dir / "configs"
+        self.segments_dir = self.work_dir / "segments"
+        # Bytes baixados pelo job (clips de fundo), registrados por etapa
+        self.downloaded_bytes = 0
+        # Callback de progresso da etapa em execução: (fração 0-1, detalhe)
+        self.on_progress = None
+
+        # configs_dir só é criado quando algo grava nele (dump de depuração do plano)
+        self.clips_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def audio_path(self) -> str:
+        """Caminho do áudio TTS do job"""
+        return str(self.work_dir / "audio_tts.wav")
+
+    @property
+    def output_path(self) -> str:
+        """Caminho do vídeo final do job"""
+        return str(self.work_dir / "rendered_video.mp4")
+
+    def config_path(self, name: str) -> Path:
+        """Caminho de um arquivo de configuração do template (visual, audio...)"""
+        return self.configs_dir / f"{name}_config.json"
+
+    def clip_path(self, index: int) -> str:
+        """Caminho de download de um clip de fundo"""
+        return str(self.clips_dir / f"clip_{index:03d}.mp4")
+
+    def report_progress(self, fraction: float, detail: Optional[str] = None):
+        """Repassa o avanço da etapa em execução (sem callback, não faz nada)"""
+        if self.on_progress is not None:
+            self.on_progress(fraction, detail)
+
+    def cleanup(self):
+        """Remove clips baixados, configurações e segmentos, mantendo áudio e vídeo final"""
+        for directory in (self.clips_dir, self.configs_dir, self.segments_dir):
+            shutil.rmtree(directory, ignore_errors=True)
+        print(f"🧹 Workspace limpo: {self.work_dir}")
+
+    def __repr__(self):
+        return f"RenderContext(job_id={self.job_id!r}, work_dir={str(self.work_dir)!r})"
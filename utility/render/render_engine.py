@@ -1,211 +1,150 @@
-import time
-import os
-import tempfile
-import zipfile
-import platform
-import subprocess
-import json
-from pathlib import Path
-from moviepy.editor import (AudioFileClip, CompositeVideoClip, CompositeAudioClip, ImageClip,
-                            TextClip, VideoFileClip)
-from moviepy.audio.fx.audio_loop import audio_loop
-from moviepy.audio.fx.audio_normalize import audio_normalize
+from dataclasses import asdict, replace
+from moviepy.editor import AudioFileClip, CompositeVideoClip, VideoFileClip
 import requests
+from utility.audio.audio_mixer import MIX_SAMPLE_RATE, decode_pcm, mix_template_audio, to_audio_clip
+from utility.audio.pause_engine import insert_pauses, remap_timeline
+from utility.render.text_renderer import make_caption_clip
+from utility.captions.subtitle_writer import DEFAULT_VIDEO_SIZE, export_subtitles
+from utility.render.render_context import RenderContext
+from utility.render.render_plan import TextStyle
+from utility.render.timeline import RenderTimeline, compile_timeline
+from utility.render.color_grading import apply_color_grading
+from utility.render.segment_renderer import render_segmented
+from utility.render.encoder_profiles import FASTSTART_PARAMS, get_encoder_profile
+from utility.render.effect_overlay import apply_effect_overlays, prepare_effects, schedule_effects
+from utility.render.progress_logger import MoviePyProgressLogger
+from utility.jobs.scheduler import JobCancelled
 
-def download_file(url, filename):
-    with open(filename, 'wb') as f:
-        headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers)
-        f.write(response.content)
+# Fração da etapa de renderização ocupada pelos downloads dos clips (o resto é codificação)
+DOWNLOAD_PROGRESS_SHARE = 0.2
 
-def search_program(program_name):
-    try: 
-        search_cmd = "where" if platform.system() == "Windows" else "which"
-        return subprocess.check_output([search_cmd, program_name]).decode().strip()
-    except subprocess.CalledProcessError:
-        return None
+def download_file(url, filename, on_progress=None):
+    """Baixa o arquivo em blocos; on_progress(bytes baixados, total ou None); retorna o total de bytes"""
+    headers = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    downloaded = 0
+    with requests.get(url, headers=headers, stream=True) as response, open(filename, 'wb') as f:
+        total = int(response.headers.get('Content-Length') or 0) or None
+        for chunk in response.iter_content(chunk_size=256 * 1024):
+            f.write(chunk)
+            downloaded += len(chunk)
+            if on_progress is not None:
+                on_progress(downloaded, total)
+    return downloaded
 
-def get_program_path(program_name):
-    program_path = search_program(program_name)
-    return program_path
+def prepare_narration(audio_file_path, render_plan):
+    """Decodifica a narração e insere as pausas estratégicas
 
-def load_template_configs():
-    """Carrega configurações de template se disponíveis"""
-    configs = {}
-    
-    # Carregar configurações visuais
-    visual_config_file = Path(__file__).parent.parent.parent / "temp_visual_config.json"
-    if visual_config_file.exists():
-        try:
-            with open(visual_config_file, 'r', encoding='utf-8') as f:
-                configs['visual'] = json.load(f)
-            print("✅ Configurações visuais do template carregadas")
-        except Exception as e:
-            print(f"⚠️ Erro ao carregar configurações visuais: {e}")
-    
-    # Carregar configurações de áudio
-    audio_config_file = Path(__file__).parent.parent.parent / "temp_audio_config.json"
-    if audio_config_file.exists():
-        try:
-            with open(audio_config_file, 'r', encoding='utf-8') as f:
-                configs['audio'] = json.load(f)
-            print("✅ Configurações de áudio do template carregadas")
-        except Exception as e:
-            print(f"⚠️ Erro ao carregar configurações de áudio: {e}")
+    Retorna o PCM e o remapeamento de tempo das pausas (None sem pausas);
+    sem template retorna (None, None) e o áudio é usado como está.
+    """
+    if render_plan is None:
+        return None, None
+    
+    narration = decode_pcm(audio_file_path)
+    pause_remap = None
+    if render_plan.pauses:
+        print(f"⏱️ Aplicando {len(render_plan.pauses)} pausas estratégicas")
+        narration, pause_remap = insert_pauses(narration, render_plan.pauses, MIX_SAMPLE_RATE)
+    return narration, pause_remap
+
+def build_audio_track(audio_file_path, narration, timeline, render_plan):
+    """Monta a faixa final: narração, efeitos e trilha das seções mixados uma vez"""
+    if narration is None:
+        return AudioFileClip(audio_file_path)
+    
+    print(f"🎵 Mixando áudio do template (volume {render_plan.audio.volume}, "
+          f"efeitos {render_plan.audio.effects_volume}, trilha {render_plan.audio.bg_music_volume})")
+    return to_audio_clip(mix_template_audio(narration, timeline, render_plan.audio))
+
+def build_visual_clips(background_clips, timed_captions, text_style, window=None, target_height=None,
+                       timeline=None):
+    """Monta os clips de fundo e de legenda; com window=(início, fim) só os da janela, com tempos relativos"""
+    offset, window_end = window if window else (0, float('inf'))
     
-    # Carregar configurações de pausas
-    pauses_config_file = Path(__file__).parent.parent.parent / "temp_pauses_config.json"
-    if pauses_config_file.exists():
+    visual_clips = []
+    for video_filename, t1, t2 in background_clips:
+        if t2 <= offset or t1 >= window_end:
+            continue
         try:
-            with open(pauses_config_file, 'r', encoding='utf-8') as f:
-                configs['pauses'] = json.load(f)
-            print("✅ Configurações de pausas do template carregadas")
+            # Create VideoFileClip from the downloaded file (reduzido já na decodificação, se pedido)
+            if target_height:
+                video_clip = VideoFileClip(video_filename, target_resolution=(target_height, None))
+            else:
+                video_clip = VideoFileClip(video_filename)
+            # Grading de cor da seção aplicado só ao fundo (legendas mantêm a cor original)
+            video_clip = apply_color_grading(video_clip, timeline, start=t1)
+            video_clip = video_clip.set_start(t1 - offset)
+            video_clip = video_clip.set_end(t2 - offset)
+            
+            visual_clips.append(video_clip)
         except Exception as e:
-            print(f"⚠️ Erro ao carregar configurações de pausas: {e}")
+            print(f"❌ Erro ao processar vídeo {video_filename}: {e}")
+            continue
     
-    # Carregar configurações de efeitos
-    effects_config_file = Path(__file__).parent.parent.parent / "temp_effects_config.json"
-    if effects_config_file.exists():
-        try:
-            with open(effects_config_file, 'r', encoding='utf-8') as f:
-                configs['effects'] = json.load(f)
-            print("✅ Configurações de efeitos do template carregadas")
-        except Exception as e:
-            print(f"⚠️ Erro ao carregar configurações de efeitos: {e}")
+    # Legendas rasterizadas em processo (Pillow), com cache por texto/estilo
+    for (t1, t2), text in timed_captions:
+        if t2 <= offset or t1 >= window_end:
+            continue
+        text_clip = make_caption_clip(text, t1 - offset, t2 - offset,
+                                      font=text_style.font,
+                                      fontsize=text_style.fontsize,
+                                      color=text_style.color,
+                                      stroke_color="black",
+                                      stroke_width=text_style.stroke_width,
+                                      margin_bottom=text_style.margin_bottom)
+        visual_clips.append(text_clip)
     
-    return configs
+    return visual_clips
 
-def apply_template_effects_to_audio(audio_clip, template_configs):
-    """Aplica efeitos de áudio do template"""
-    if 'audio' not in template_configs:
-        return audio_clip
-    
-    audio_config = template_configs['audio']
-    
-    # Aplicar volume do template
-    volume = audio_config.get('volume', 1.0)
-    if volume != 1.0:
-        audio_clip = audio_clip.volumex(volume)
-        print(f"🎵 Aplicado volume do template: {volume}")
-    
-    # Aplicar efeitos sonoros se disponíveis
-    if 'effects' in template_configs:
-        effects_config = template_configs['effects']
-        audio_effects = []
-        
-        for section_name, section_data in effects_config.items():
-            assets = section_data.get('assets', {})
-            audio_effects.extend(assets.get('audio_effects', []))
-        
-        effects_volume = audio_config.get('effects_volume', 0.5)
-        if audio_effects:
-            print(f"🎵 Aplicando {len(audio_effects)} efeitos sonoros do template")
-            # Aplicar efeitos sonoros reais
-            for effect_path in audio_effects:
-                if os.path.exists(effect_path):
-                    try:
-                        effect_clip = AudioFileClip(effect_path)
-                        # Aplicar efeito com volume reduzido
-                        effect_clip = effect_clip.volumex(effects_volume)
-                        # Combinar com áudio principal
-                        audio_clip = CompositeAudioClip([audio_clip, effect_clip])
-                        print(f"   ✅ Efeito aplicado: {effect_path}")
-                    except Exception as e:
-                        print(f"   ❌ Erro ao aplicar efeito {effect_path}: {e}")
-                else:
-                    print(f"   ❌ Efeito não encontrado: {effect_path}")
-    
-    return audio_clip
+def probe_video_size(video_filename):
+    """Lê a resolução de um vídeo sem decodificar frames"""
+    clip = VideoFileClip(video_filename, audio=False)
+    size = clip.size
+    clip.close()
+    return size
 
-def apply_strategic_pauses(audio_clip, pauses_config):
-    """Aplica pausas estratégicas ao áudio"""
-    print(f"⏱️ Aplicando {len(pauses_config)} pausas estratégicas")
-    
-    # Ordenar pausas por posição
-    sorted_pauses = sorted(pauses_config, key=lambda x: x.get('position', 0))
-    
-    # Criar clips de áudio com pausas
-    audio_clips = []
-    current_time = 0
-    
-    for pause in sorted_pauses:
-        pause_position = pause.get('position', 0)
-        pause_duration = pause.get('duration', 0)
-        
-        # Adicionar áudio até a pausa
-        if pause_position > current_time:
-            segment = audio_clip.subclip(current_time, pause_position)
-            audio_clips.append(segment)
-        
-        # Adicionar pausa (silêncio)
-        if pause_duration > 0:
-            from moviepy.audio.AudioClip import AudioClip
-            silence = AudioClip(lambda t: 0, duration=pause_duration)
-            audio_clips.append(silence)
-            print(f"   ⏸️ Pausa em {pause_position:.1f}s por {pause_duration:.1f}s: {pause.get('description', '')}")
-        
-        current_time = pause_position + pause_duration
-    
-    # Adicionar o resto do áudio
-    if current_time < audio_clip.duration:
-        final_segment = audio_clip.subclip(current_time, audio_clip.duration)
-        audio_clips.append(final_segment)
-    
-    # Combinar todos os clips
-    if audio_clips:
-        return CompositeAudioClip(audio_clips)
-    else:
-        return audio_clip
+def scale_text_style(text_style, scale):
+    """Ajusta o estilo de texto à escala de resolução do perfil de encoder"""
+    if scale == 1.0:
+        return text_style
+    return replace(text_style,
+                   fontsize=max(1, round(text_style.fontsize * scale)),
+                   stroke_width=round(text_style.stroke_width * scale),
+                   margin_bottom=round(text_style.margin_bottom * scale))
 
-def apply_template_effects_to_video(video_clip, template_configs):
-    """Aplica efeitos visuais do template"""
-    if 'effects' not in template_configs:
-        return video_clip
-    
-    effects_config = template_configs['effects']
-    video_effects = []
-    
-    # Coletar todos os efeitos de vídeo do template
-    for section_name, section_data in effects_config.items():
-        assets = section_data.get('assets', {})
-        video_effects.extend(assets.get('video_effects', []))
-    
-    if video_effects:
-        print(f"🎬 Aplicando {len(video_effects)} efeitos visuais do template")
-        # Aplicar efeitos visuais reais
-        for effect_path in video_effects:
-            if os.path.exists(effect_path):
-                try:
-                    # Carregar efeito visual
-                    effect_clip = VideoFileClip(effect_path)
-                    # Redimensionar para combinar com vídeo principal
-                    effect_clip = effect_clip.resize(video_clip.size)
-                    # Aplicar efeito como overlay
-                    video_clip = CompositeVideoClip([video_clip, effect_clip])
-                    print(f"   ✅ Efeito visual aplicado: {effect_path}")
-                except Exception as e:
-                    print(f"   ❌ Erro ao aplicar efeito visual {effect_path}: {e}")
-            else:
-                print(f"   ❌ Efeito visual não encontrado: {effect_path}")
-    
-    return video_clip
-
-def get_output_media(audio_file_path, timed_captions, background_video_data, video_server):
-    OUTPUT_FILE_NAME = "rendered_video.mp4"
-    magick_path = get_program_path("magick")
-    print(magick_path)
-    if magick_path:
-        os.environ['IMAGEMAGICK_BINARY'] = magick_path
-    else:
-        os.environ['IMAGEMAGICK_BINARY'] = '/usr/bin/convert'
-    
-    # Carregar configurações de template
-    template_configs = load_template_configs()
-    
-    visual_clips = []
-    for (t1, t2), video_url in background_video_data:
+def get_output_media(audio_file_path, timed_captions, background_video_data, video_server, subtitle_mode="burn",
+                     context=None, render_plan=None, render_mode="single", workers=None, encoder_profile=None):
+    # Cada render usa seu próprio workspace para permitir jobs simultâneos
+    if context is None:
+        context = RenderContext()
+    OUTPUT_FILE_NAME = context.output_path
+    
+    # Configurações de template vêm do RenderPlan (None = sem template)
+    if render_plan is not None:
+        print(f"✅ RenderPlan do template carregado: {render_plan.template_name}")
+    
+    # Narração com as pausas estratégicas já inseridas
+    narration, pause_remap = prepare_narration(audio_file_path, render_plan)
+    
+    # Pausas inseridas deslocam legendas e vídeos de fundo na mesma medida
+    if pause_remap is not None:
+        timed_captions, background_video_data = remap_timeline(timed_captions, background_video_data, pause_remap)
+        print(f"   ⏱️ Timeline deslocada em {pause_remap.total_pause:.1f}s de pausas")
+    
+    # Seções do template posicionadas sobre os tempos reais da narração
+    timeline = RenderTimeline(duration=0.0)
+    if narration is not None:
+        timeline = compile_timeline(render_plan, len(narration) / MIX_SAMPLE_RATE, timed_captions)
+        timeline.describe()
+    
+    # Narração, efeitos e trilha mixados em PCM uma única vez
+    audio = build_audio_track(audio_file_path, narration, timeline, render_plan)
+    
+    background_clips = []
+    clip_count = max(1, len(background_video_data))
+    for index, ((t1, t2), video_url) in enumerate(background_video_data):
         # Verificar se a URL é válida
         if video_url is None or video_url == "None":
             print(f"⚠️ URL inválida para intervalo {t1}-{t2}, pulando...")
@@ -213,102 +152,86 @@ def get_output_media(audio_file_path, timed_captions, background_video_data, vid
             
         try:
             # Download the video file
-            video_filename = tempfile.NamedTemporaryFile(delete=False).name
-            download_file(video_url, video_filename)
-            
-            # Create VideoFileClip from the downloaded file
-            video_clip = VideoFileClip(video_filename)
-            video_clip = video_clip.set_start(t1)
-            video_clip = video_clip.set_end(t2)
-            
-            # Aplicar efeitos do template ao vídeo
-            video_clip = apply_template_effects_to_video(video_clip, template_configs)
-            
-            visual_clips.append(video_clip)
+            video_filename = context.clip_path(index)
+            on_chunk = lambda done, total, index=index: context.report_progress(
+                DOWNLOAD_PROGRESS_SHARE * (index + (done / total if total else 0)) / clip_count,
+                f"download {index + 1}/{clip_count}")
+            context.downloaded_bytes += download_file(video_url, video_filename, on_progress=on_chunk)
+            background_clips.append((video_filename, t1, t2))
+        except JobCancelled:
+            raise
         except Exception as e:
             print(f"❌ Erro ao processar vídeo {video_url}: {e}")
             continue
     
-    audio_clips = []
-    audio_file_clip = AudioFileClip(audio_file_path)
-    
-    # Aplicar efeitos do template ao áudio
-    audio_file_clip = apply_template_effects_to_audio(audio_file_clip, template_configs)
-    
-    # Aplicar pausas estratégicas se configuradas
-    if 'pauses' in template_configs and template_configs['pauses']:
-        audio_file_clip = apply_strategic_pauses(audio_file_clip, template_configs['pauses'])
+    # Perfil de encoder: escolhido pelo chamador, pelo template ou o padrão
+    if not encoder_profile and render_plan is not None:
+        encoder_profile = render_plan.encoder_profile
+    profile = get_encoder_profile(encoder_profile)
+    print(f"⚙️ Perfil de encoder: {profile.name} (preset={profile.preset}, crf={profile.crf}, "
+          f"escala={profile.scale}, fps={profile.fps})")
     
-    audio_clips.append(audio_file_clip)
-
     # Obter configurações de texto do template ou usar padrão
-    text_config = template_configs.get('visual', {})
-    font = text_config.get('font', 'Arial-Bold')
-    fontsize = text_config.get('fontsize', 90)
-    stroke_width = text_config.get('stroke_width', 4)
-    color = text_config.get('color', 'white')
-    position = text_config.get('position', 'center_bottom')
-    margin_bottom = text_config.get('margin_bottom', 100)
+    text_style = render_plan.text_style if render_plan is not None else TextStyle()
+    text_style = scale_text_style(text_style, profile.scale)
     
     print(f"🎨 Aplicando estilo de texto do template:")
-    print(f"   • Fonte: {font}")
-    print(f"   • Tamanho: {fontsize}")
-    print(f"   • Cor: {color}")
-    print(f"   • Posição: {position}")
-
-    for (t1, t2), text in timed_captions:
-        text_clip = (TextClip(txt=text,
-                              fontsize=fontsize,
-                              font=font,
-                              color=color,
-                              stroke_color="black",
-                              stroke_width=stroke_width,
-                              method="label")
-                  .set_start(t1)
-                  .set_end(t2)
-                  .set_position(("center", "bottom"))
-                  .margin(bottom=margin_bottom)
-                  .crossfadein(0.3)
-                  .crossfadeout(0.3))
-        visual_clips.append(text_clip)
+    print(f"   • Fonte: {text_style.font}")
+    print(f"   • Tamanho: {text_style.fontsize}")
+    print(f"   • Cor: {text_style.color}")
+    print(f"   • Posição: {text_style.position}")
+    print(f"   • Legendas: {subtitle_mode}")
 
-    video = CompositeVideoClip(visual_clips)
-    
-    if audio_clips:
-        audio = CompositeAudioClip(audio_clips)
+    # Nos modos de legenda externa (srt/vtt/ass/faixa) nada é desenhado nos frames
+    burn_captions = subtitle_mode == "burn"
+    caption_clips = timed_captions if burn_captions else []
+    
+    # Resolução final: a do primeiro clip de fundo, reduzida pela escala do perfil
+    video_size = None
+    target_height = None
+    if background_clips:
+        video_size = profile.scaled_size(probe_video_size(background_clips[0][0]))
+        if profile.scale != 1.0:
+            target_height = video_size[1]
+    
+    # Efeitos visuais do template: agendados por seção na timeline final e pré-escalados uma vez
+    effect_schedule = ()
+    if video_size:
+        effect_schedule = prepare_effects(schedule_effects(timeline), video_size, profile.fps)
+    
+    # Codificação reportada na faixa restante da etapa
+    report_encoding = lambda fraction, detail=None: context.report_progress(
+        DOWNLOAD_PROGRESS_SHARE + (1 - DOWNLOAD_PROGRESS_SHARE) * fraction, detail)
+    
+    if render_mode == "segmented" and background_clips:
+        render_segmented(background_clips, caption_clips, text_style, effect_schedule, audio,
+                         audio.duration, video_size, OUTPUT_FILE_NAME, context,
+                         profile=profile, workers=workers, target_height=target_height, timeline=timeline,
+                         on_progress=report_encoding)
+    else:
+        visual_clips = build_visual_clips(background_clips, caption_clips, text_style,
+                                          target_height=target_height, timeline=timeline)
+        video = CompositeVideoClip(visual_clips, size=video_size)
         video.duration = audio.duration
+        video = apply_effect_overlays(video, effect_schedule)
         video.audio = audio
+        video_size = video.size
 
-    video.write_videofile(OUTPUT_FILE_NAME, codec='libx264', audio_codec='aac', fps=25, preset='veryfast')
+        video.write_videofile(OUTPUT_FILE_NAME, codec=profile.codec, audio_codec=profile.audio_codec,
+                              fps=profile.fps, preset=profile.preset, threads=profile.threads,
+                              audio_bitrate=profile.audio_bitrate, ffmpeg_params=profile.ffmpeg_params() + FASTSTART_PARAMS,
+                              logger=MoviePyProgressLogger(report_encoding))
+        
+        for clip in visual_clips:
+            clip.close()
     
-    # Clean up downloaded files
-    for (t1, t2), video_url in background_video_data:
-        if video_url and video_url != "None":
-            try:
-                video_filename = tempfile.NamedTemporaryFile(delete=False).name
-                os.remove(video_filename)
-            except:
-                pass
-
-    # Limpar arquivos de configuração temporários
-    cleanup_temp_configs()
+    if not burn_captions:
+        # Sem clips de fundo a resolução não é conhecida: usa a saída padrão do perfil
+        video_size = video_size or profile.scaled_size(DEFAULT_VIDEO_SIZE)
+        OUTPUT_FILE_NAME = export_subtitles(timed_captions, OUTPUT_FILE_NAME, subtitle_mode,
+                                            text_style=asdict(text_style), video_size=video_size)
+    
+    # Limpar clips baixados e arquivos de configuração do job
+    context.cleanup()
 
     return OUTPUT_FILE_NAME
-
-def cleanup_temp_configs():
-    """Remove arquivos de configuração temporários"""
-    temp_files = [
-        "temp_visual_config.json",
-        "temp_audio_config.json", 
-        "temp_pauses_config.json",
-        "temp_effects_config.json"
-    ]
-    
-    for filename in temp_files:
-        file_path = Path(__file__).parent.parent.parent / filename
-        if file_path.exists():
-            try:
-                file_path.unlink()
-                print(f"🧹 Arquivo temporário removido: {filename}")
-            except Exception as e:
-                print(f"⚠️ Erro ao remover {filename}: {e}")
@@ -0,0 +1,121 @@
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+@dataclass(frozen=True)
+class TextStyle:
+    """Estilo das legendas"""
+    font: str = 'Arial-Bold'
+    fontsize: int = 90
+    stroke_width: int = 4
+    color: str = 'white'
+    position: str = 'center_bottom'
+    margin_bottom: int = 100
+
+@dataclass(frozen=True)
+class AudioSettings:
+    """Configurações de áudio do template"""
+    voice: str = 'pt-BR-FranciscoNeural'
+    rate: float = 1.0
+    volume: float = 1.0
+    bg_music_volume: float = 0.3
+    effects_volume: float = 0.5
+    music_ducking: float = 0.35
+
+@dataclass(frozen=True)
+class Pause:
+    """Pausa estratégica inserida na narração"""
+    position: float
+    duration: float
+    purpose: str = ''
+    description: str = ''
+    type: str = ''
+
+@dataclass(frozen=True)
+class SectionPlan:
+    """Assets e estilo de uma seção do template"""
+    name: str
+    duration: str = ''
+    tone: str = ''
+    visual_style: str = ''
+    color_scheme: str = ''
+    audio_effects: Tuple[str, ...] = ()
+    video_effects: Tuple[str, ...] = ()
+    background_music: str = ''
+    effect_blend: str = 'screen'
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """Plano de renderização imutável produzido a partir de um template"""
+    template_id: str
+    template_name: str = ''
+    text_style: TextStyle = field(default_factory=TextStyle)
+    audio: AudioSettings = field(default_factory=AudioSettings)
+    pauses: Tuple[Pause, ...] = ()
+    sections: Tuple[SectionPlan, ...] = ()
+    encoder_profile: str = ''
+
+    @property
+    def audio_effects(self) -> Tuple[str, ...]:
+        """Todos os efeitos sonoros do template, na ordem das seções"""
+        return tuple(effect for section in self.sections for effect in section.audio_effects)
+
+    @property
+    def video_effects(self) -> Tuple[str, ...]:
+        """Todos os efeitos visuais do template, na ordem das seções"""
+        return tuple(effect for section in self.sections for effect in section.video_effects)
+
+    def to_dict(self) -> Dict:
+        """Serializa o plano (útil para depuração)"""
+        return asdict(self)
+
+    def save(self, path) -> Path:
+        """Salva o plano em JSON para depuração"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RenderPlan':
+        """Reconstrói um plano serializado com to_dict"""
+        return cls(
+            template_id=data['template_id'],
+            template_name=data.get('template_name', ''),
+            text_style=TextStyle(**data.get('text_style', {})),
+            audio=AudioSettings(**data.get('audio', {})),
+            pauses=tuple(Pause(**pause) for pause in data.get('pauses', [])),
+            sections=tuple(
+                SectionPlan(**{**section,
+                               'audio_effects': tuple(section.get('audio_effects', ())),
+                               'video_effects': tuple(section.get('video_effects', ()))})
+                for section in data.get('sections', [])
+            ),
+            encoder_profile=data.get('encoder_profile', '')
+        )
+
+def section_plan_from_template(name: str, section_data: Dict) -> SectionPlan:
+    """Converte uma seção do JSON do template em SectionPlan"""
+    assets = section_data.get('assets', {})
+    return SectionPlan(
+        name=name,
+        duration=section_data.get('duration', ''),
+        tone=section_data.get('tone', ''),
+        visual_style=section_data.get('visual_style', ''),
+        color_scheme=section_data.get('color_scheme', ''),
+        audio_effects=tuple(assets.get('audio_effects', [])),
+        video_effects=tuple(assets.get('video_effects', [])),
+        background_music=assets.get('background_music', ''),
+        # Fora de 'assets': lá toda chave é validada como lista de arquivos
+        effect_blend=section_data.get('effects_blend', 'screen')
+    )
+
+def load_render_plan(path) -> Optional[RenderPlan]:
+    """Carrega um plano salvo com RenderPlan.save"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return RenderPlan.from_dict(json.load(f))
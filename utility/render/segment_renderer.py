@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from utility.utils import get_ffmpeg_binary
+from utility.render.encoder_profiles import FASTSTART_PARAMS, EncoderProfile, get_encoder_profile
+
+# Modos de renderização
+# - single: um único write_videofile para o vídeo inteiro
+# - segmented: segmentos renderizados em paralelo e concatenados por stream copy
+RENDER_MODES = ['single', 'segmented']
+
+def plan_segments(background_video_data, duration: float, fps: int = 25) -> List[Tuple[float, float]]:
+    """Divide a timeline nos limites dos clips de fundo, alinhados aos frames"""
+    boundaries = {0.0, round(duration * fps) / fps}
+    for (t1, t2), video_url in background_video_data:
+        for t in (t1, t2):
+            if 0 < t < duration:
+                boundaries.add(round(t * fps) / fps)
+
+    points = sorted(boundaries)
+    return [(start, end) for start, end in zip(points, points[1:]) if end - start >= 1.0 / fps]
+
+def _render_segment(args) -> str:
+    """Renderiza um segmento sem áudio (executado no pool de processos)"""
+    (index, start, end, segment_path, background_clips, timed_captions,
+     text_style, effect_schedule, size, profile, threads, target_height, timeline) = args
+
+    # Import tardio: o processo filho carrega o MoviePy só quando precisa
+    from moviepy.editor import ColorClip, CompositeVideoClip
+    from utility.render.render_engine import build_visual_clips
+    from utility.render.effect_overlay import apply_effect_overlays
+
+    clips = build_visual_clips(background_clips, timed_captions, text_style,
+                               window=(start, end), target_height=target_height, timeline=timeline)
+    if not clips:
+        # Janela sem fundo nem legenda (clip pulado ou pausa sem fala): quadro preto mantém a duração
+        clips = [ColorClip(size, color=(0, 0, 0), duration=end - start)]
+    video = CompositeVideoClip(clips, size=size).set_duration(end - start)
+    video = apply_effect_overlays(video, effect_schedule, offset=start)
+
+    # GOP fechado: cada segmento começa em keyframe e não referencia o vizinho
+    video.write_videofile(segment_path, fps=profile.fps, audio=False, logger=None,
+                          codec=profile.codec, preset=profile.preset, threads=threads,
+                          ffmpeg_params=['-flags', '+cgop', '-g', str(profile.fps * 2)] + profile.ffmpeg_params())
+
+    for clip in clips:
+        clip.close()
+    print(f"   ✅ Segmento {index} renderizado ({start:.2f}s-{end:.2f}s)")
+    return segment_path
+
+def concat_segments(segment_paths: List[str], output_path: str) -> str:
+    """Junta os segmentos com o concat demuxer do ffmpeg (sem recodificar)"""
+    list_file = Path(output_path).with_suffix('.txt')
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            f.write(f"file '{Path(path).resolve().as_posix()}'\n")
+
+    subprocess.run([
+        get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_file),
+        '-c', 'copy', output_path
+    ], check=True)
+    os.remove(list_file)
+    return output_path
+
+def mux_audio(video_path: str, audio_path: str, output_path: str) -> str:
+    """Adiciona a faixa de áudio final ao vídeo concatenado"""
+    subprocess.run([
+        get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-i', video_path, '-i', audio_path,
+        '-map', '0:v:0', '-map', '1:a:0',
+        '-c', 'copy', '-shortest', *FASTSTART_PARAMS, output_path
+    ], check=True)
+    return output_path
+
+def render_segmented(background_clips, timed_captions, text_style, effect_schedule, audio_clip,
+                     duration: float, size: Tuple[int, int], output_path: str, context,
+                     profile: Optional[EncoderProfile] = None, workers: Optional[int] = None,
+                     target_height: Optional[int] = None, timeline=None, on_progress=None) -> str:
+    """Renderiza o vídeo em segmentos paralelos e mixa o áudio uma única vez
+
+    on_progress(fração, detalhe) é chamado a cada segmento concluído (os processos filhos não reportam frames).
+    """
+    report = on_progress or (lambda fraction, detail=None: None)
+    profile = profile or get_encoder_profile()
+    fps = profile.fps
+    workers = workers or os.cpu_count() or 1
+
+    segments_dir = context.segments_dir
+    segments_dir.mkdir(parents=True, exist_ok=True)
+
+    segments = plan_segments([((t1, t2), path) for path, t1, t2 in background_clips], duration, fps)
+
+    # Sem threads fixas no perfil, os núcleos são divididos entre os processos
+    workers = min(workers, len(segments))
+    threads = profile.threads or max(1, (os.cpu_count() or 1) // workers)
+    print(f"🧩 Renderização segmentada: {len(segments)} segmentos em {workers} processos ({threads} threads cada)")
+    
+    jobs = [
+        (index, start, end, str(segments_dir / f"segment_{index:03d}.mp4"), background_clips,
+         timed_captions, text_style, effect_schedule, size, profile, threads, target_height, timeline)
+        for index, (start, end) in enumerate(segments)
+    ]
+
+    # spawn evita herdar threads/sockets do servidor web via fork
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        futures = [executor.submit(_render_segment, job) for job in jobs]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                report(0.9 * done / len(jobs), f"segmento {done}/{len(jobs)}")
+        except BaseException:
+            # Falha ou cancelamento: segmentos ainda na fila não chegam a ser renderizados
+            for future in futures:
+                future.cancel()
+            raise
+        segment_paths = [future.result() for future in futures]
+
+    # Áudio final renderizado uma vez e multiplexado sem recodificar o vídeo
+    video_only_path = str(segments_dir / "video_only.mp4")
+    audio_path = str(segments_dir / "audio.m4a")
+    concat_segments(segment_paths, video_only_path)
+    report(0.95, "áudio")
+    audio_clip.write_audiofile(audio_path, fps=44100, codec=profile.audio_codec,
+                               bitrate=profile.audio_bitrate, logger=None)
+    mux_audio(video_only_path, audio_path, output_path)
+    report(1.0, "concluído")
+
+    for path in segment_paths + [video_only_path, audio_path]:
+        os.remove(path)
+    print(f"✅ Segmentos concatenados: {output_path}")
+    return output_path
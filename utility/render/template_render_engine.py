@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 from typing import Dict, List, Optional, Tuple
@@ -8,24 +7,35 @@ import random
 # Adicionar o diretório raiz ao path para importar módulos
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from utility.templates.template_manager import TemplateManager
+from utility.templates.template_manager import get_template_manager
+from utility.templates.asset_catalog import get_asset_catalog
+from utility.templates.template_recommender import get_template_recommender
+from utility.render.render_context import RenderContext
+from utility.render.render_plan import (AudioSettings, Pause, RenderPlan, SectionPlan, TextStyle,
+                                        section_plan_from_template)
+from utility.render.timeline import compile_timeline
+
+# Salva o RenderPlan no workspace do job para depuração
+RENDER_PLAN_DEBUG = os.environ.get("RENDER_PLAN_DEBUG", "").lower() in ("1", "true", "yes")
 
 class TemplateRenderEngine:
     """Motor de renderização com suporte a templates"""
     
     def __init__(self):
-        self.template_manager = TemplateManager()
+        self.template_manager = get_template_manager()
         self.rendered_videos = []
     
-    def apply_template_to_video(self, video_path: str, template_id: str, script: str, audio_path: str) -> Dict:
-        """Aplica um template específico ao vídeo durante a renderização"""
+    def apply_template_to_video(self, video_path: str, template_id: str, script: str, audio_path: str,
+                                context: Optional[RenderContext] = None) -> Optional[RenderPlan]:
+        """Aplica um template e retorna o RenderPlan usado por get_output_media"""
         print(f"🎬 APLICANDO TEMPLATE: {template_id}")
         print("="*50)
         
         # Carregar template
         template = self.template_manager.get_template(template_id)
         if not template:
-            return {'error': f'Template {template_id} não encontrado'}
+            print(f"❌ Template {template_id} não encontrado")
+            return None
         
         # Obter configurações do template
         visual_settings = template.get('visual_settings', {})
@@ -33,32 +43,37 @@ class TemplateRenderEngine:
         pauses_strategy = template.get('pauses_strategy', {})
         
         # Aplicar configurações visuais
-        self._apply_visual_settings(video_path, visual_settings)
+        text_style = self._apply_visual_settings(video_path, visual_settings)
         
         # Aplicar configurações de áudio
-        self._apply_audio_settings(audio_path, audio_settings)
+        audio = self._apply_audio_settings(audio_path, audio_settings)
         
         # Aplicar estratégia de pausas com timestamps reais
         if audio_path and os.path.exists(audio_path):
-            self._apply_pauses_strategy_with_real_timestamps(script, pauses_strategy, audio_path)
+            pauses = self._apply_pauses_strategy_with_real_timestamps(script, pauses_strategy, audio_path)
         else:
-            self._apply_pauses_strategy(script, pauses_strategy)
+            pauses = self._apply_pauses_strategy(script, pauses_strategy)
         
         # Aplicar efeitos de template
-        self._apply_template_effects(video_path, template)
-        
-        return {
-            'success': True,
-            'template_id': template_id,
-            'template_name': template.get('name'),
-            'applied_settings': {
-                'visual': visual_settings,
-                'audio': audio_settings,
-                'pauses': pauses_strategy
-            }
-        }
+        sections = self._apply_template_effects(video_path, template)
+        
+        render_plan = RenderPlan(
+            template_id=template_id,
+            template_name=template.get('name', template_id),
+            text_style=text_style,
+            audio=audio,
+            pauses=pauses,
+            sections=sections,
+            encoder_profile=template.get('render_settings', {}).get('encoder_profile', '')
+        )
+        
+        if RENDER_PLAN_DEBUG and context is not None:
+            plan_file = render_plan.save(context.config_path('render_plan'))
+            print(f"🐞 RenderPlan salvo para depuração: {plan_file}")
+        
+        return render_plan
     
-    def _apply_visual_settings(self, video_path: str, visual_settings: Dict):
+    def _apply_visual_settings(self, video_path: str, visual_settings: Dict) -> TextStyle:
         """Aplica configurações visuais do template"""
         print("🎨 Aplicando configurações visuais...")
         
@@ -78,17 +93,16 @@ class TemplateRenderEngine:
         print(f"   • Cor: {color}")
         print(f"   • Posição: {position}")
         
-        # Salvar configurações para uso no render_engine
-        self._save_visual_config({
-            'font': font,
-            'fontsize': fontsize,
-            'stroke_width': stroke_width,
-            'color': color,
-            'position': position,
-            'margin_bottom': margin_bottom
-        })
+        return TextStyle(
+            font=font,
+            fontsize=fontsize,
+            stroke_width=stroke_width,
+            color=color,
+            position=position,
+            margin_bottom=margin_bottom
+        )
     
-    def _apply_audio_settings(self, audio_path: str, audio_settings: Dict):
+    def _apply_audio_settings(self, audio_path: str, audio_settings: Dict) -> AudioSettings:
         """Aplica configurações de áudio do template"""
         print("🎵 Aplicando configurações de áudio...")
         
@@ -97,23 +111,25 @@ class TemplateRenderEngine:
         volume = audio_settings.get('volume', 1.0)
         bg_music_volume = audio_settings.get('background_music_volume', 0.3)
         effects_volume = audio_settings.get('effects_volume', 0.5)
+        music_ducking = audio_settings.get('music_ducking', 0.35)
         
         print(f"   • Voz: {voice}")
         print(f"   • Taxa: {rate}")
         print(f"   • Volume: {volume}")
         print(f"   • Volume música: {bg_music_volume}")
         print(f"   • Volume efeitos: {effects_volume}")
-        
-        # Salvar configurações para uso no render_engine
-        self._save_audio_config({
-            'voice': voice,
-            'rate': rate,
-            'volume': volume,
-            'bg_music_volume': bg_music_volume,
-            'effects_volume': effects_volume
-        })
+        print(f"   • Ducking da trilha: {music_ducking}")
+        
+        return AudioSettings(
+            voice=voice,
+            rate=rate,
+            volume=volume,
+            bg_music_volume=bg_music_volume,
+            effects_volume=effects_volume,
+            music_ducking=music_ducking
+        )
     
-    def _apply_pauses_strategy(self, script: str, pauses_strategy: Dict):
+    def _apply_pauses_strategy(self, script: str, pauses_strategy: Dict) -> Tuple[Pause, ...]:
         """Aplica estratégia de pausas ao script"""
         print("⏱️ Aplicando estratégia de pausas...")
         
@@ -135,10 +151,10 @@ class TemplateRenderEngine:
         for pause in all_pauses:
             print(f"   • {pause['position']:.1f}s ({pause['duration']:.1f}s): {pause['description']}")
         
-        # Salvar pausas para uso no render_engine
-        self._save_pauses_config(all_pauses)
+        return self._to_pauses(all_pauses)
     
-    def _apply_pauses_strategy_with_real_timestamps(self, script: str, pauses_strategy: Dict, audio_path: str):
+    def _apply_pauses_strategy_with_real_timestamps(self, script: str, pauses_strategy: Dict,
+                                                    audio_path: str) -> Tuple[Pause, ...]:
         """Aplica estratégia de pausas usando timestamps reais do áudio"""
         print("⏱️ Aplicando estratégia de pausas com timestamps reais...")
         
@@ -151,8 +167,7 @@ class TemplateRenderEngine:
             
             if not timed_captions:
                 print("⚠️ Não foi possível obter timestamps reais, usando estratégia padrão")
-                self._apply_pauses_strategy(script, pauses_strategy)
-                return
+                return self._apply_pauses_strategy(script, pauses_strategy)
             
             # Calcular duração real baseada no último timestamp
             real_duration = max(t2 for (t1, t2), text in timed_captions)
@@ -207,19 +222,19 @@ class TemplateRenderEngine:
             for pause in all_pauses:
                 print(f"   • {pause['position']:.1f}s ({pause['duration']:.1f}s): {pause['description']}")
             
-            # Salvar pausas ajustadas para uso no render_engine
-            self._save_pauses_config(all_pauses)
+            return self._to_pauses(all_pauses)
             
         except Exception as e:
             print(f"⚠️ Erro ao aplicar pausas com timestamps reais: {e}")
             print("🔄 Usando estratégia padrão...")
-            self._apply_pauses_strategy(script, pauses_strategy)
+            return self._apply_pauses_strategy(script, pauses_strategy)
     
-    def _apply_template_effects(self, video_path: str, template: Dict):
+    def _apply_template_effects(self, video_path: str, template: Dict) -> Tuple[SectionPlan, ...]:
         """Aplica efeitos específicos do template"""
         print("✨ Aplicando efeitos do template...")
         
         sections = template.get('sections', {})
+        catalog = get_asset_catalog()
         
         for section_name, section_data in sections.items():
             print(f"   • Seção: {section_name}")
@@ -227,7 +242,7 @@ class TemplateRenderEngine:
             # Efeitos de áudio
             audio_effects = section_data.get('assets', {}).get('audio_effects', [])
             for effect in audio_effects:
-                if os.path.exists(effect):
+                if catalog.exists(effect):
                     print(f"     - Áudio: {effect}")
                 else:
                     print(f"     - Áudio: {effect} (não encontrado)")
@@ -235,114 +250,41 @@ class TemplateRenderEngine:
             # Efeitos de vídeo
             video_effects = section_data.get('assets', {}).get('video_effects', [])
             for effect in video_effects:
-                if os.path.exists(effect):
+                if catalog.exists(effect):
                     print(f"     - Vídeo: {effect}")
                 else:
                     print(f"     - Vídeo: {effect} (não encontrado)")
             
             # Música de fundo
             bg_music = section_data.get('assets', {}).get('background_music', '')
-            if bg_music and os.path.exists(bg_music):
+            if bg_music and catalog.exists(bg_music):
                 print(f"     - Música: {bg_music}")
             elif bg_music:
                 print(f"     - Música: {bg_music} (não encontrado)")
         
-        # Salvar efeitos para uso no render_engine
-        self._save_effects_config(sections)
-    
-    def _save_visual_config(self, config: Dict):
-        """Salva configurações visuais para uso posterior"""
-        config_file = Path(__file__).parent.parent.parent / "temp_visual_config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
-    
-    def _save_audio_config(self, config: Dict):
-        """Salva configurações de áudio para uso posterior"""
-        config_file = Path(__file__).parent.parent.parent / "temp_audio_config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
-    
-    def _save_pauses_config(self, pauses: List[Dict]):
-        """Salva configurações de pausas para uso posterior"""
-        config_file = Path(__file__).parent.parent.parent / "temp_pauses_config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(pauses, f, indent=2, ensure_ascii=False)
+        return tuple(section_plan_from_template(section_name, section_data)
+                     for section_name, section_data in sections.items())
     
-    def _save_effects_config(self, sections: Dict):
-        """Salva configurações de efeitos para uso posterior"""
-        config_file = Path(__file__).parent.parent.parent / "temp_effects_config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(sections, f, indent=2, ensure_ascii=False)
+    def _to_pauses(self, all_pauses: List[Dict]) -> Tuple[Pause, ...]:
+        """Converte a lista de pausas ordenadas em objetos Pause"""
+        return tuple(
+            Pause(
+                position=pause['position'],
+                duration=pause['duration'],
+                purpose=pause['purpose'],
+                description=pause['description'],
+                type=pause['type']
+            )
+            for pause in all_pauses
+        )
     
     def get_template_recommendations(self, topic: str) -> List[Dict]:
         """Recomenda templates baseado no tópico"""
-        templates = self.template_manager.list_templates()
-        recommendations = []
-        
-        topic_lower = topic.lower()
-        
-        for template in templates:
-            score = 0
-            reasons = []
-            
-            # Análise baseada em palavras-chave
-            if any(word in topic_lower for word in ['bíblico', 'religioso', 'profecia', 'apocalipse', 'deus', 'jesus', 'bíblia']):
-                if 'religioso' in template['name'].lower():
-                    score += 3
-                    reasons.append("Conteúdo religioso detectado")
-            
-            if any(word in topic_lower for word in ['curioso', 'interessante', 'fato', 'descoberta']):
-                if 'curioso' in template['name'].lower():
-                    score += 2
-                    reasons.append("Conteúdo educativo detectado")
-            
-            if score > 0:
-                recommendations.append({
-                    'template_id': template['id'],
-                    'name': template['name'],
-                    'description': template['description'],
-                    'score': score,
-                    'reasons': reasons,
-                    'assets_ready': self._check_template_assets(template['id'])
-                })
-        
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        return recommendations
+        return get_template_recommender().recommend(topic)
     
     def _check_template_assets(self, template_id: str) -> bool:
         """Verifica se os assets do template estão disponíveis"""
-        template = self.template_manager.get_template(template_id)
-        if not template:
-            return False
-        
-        sections = template.get('sections', {})
-        missing_assets = 0
-        total_assets = 0
-        
-        for section_name, section_data in sections.items():
-            assets = section_data.get('assets', {})
-            
-            # Verificar efeitos de áudio
-            for effect in assets.get('audio_effects', []):
-                total_assets += 1
-                if not os.path.exists(effect):
-                    missing_assets += 1
-            
-            # Verificar efeitos de vídeo
-            for effect in assets.get('video_effects', []):
-                total_assets += 1
-                if not os.path.exists(effect):
-                    missing_assets += 1
-            
-            # Verificar música de fundo
-            bg_music = assets.get('background_music', '')
-            if bg_music:
-                total_assets += 1
-                if not os.path.exists(bg_music):
-                    missing_assets += 1
-        
-        # Template está pronto se pelo menos 70% dos assets estão disponíveis
-        return total_assets > 0 and (missing_assets / total_assets) <= 0.3
+        return get_template_recommender().assets_ready(template_id)
     
     def preview_template_assets(self, template_id: str) -> Dict:
         """Mostra preview dos assets do template"""
@@ -398,28 +340,20 @@ class TemplateRenderEngine:
             'pauses_strategy': template.get('pauses_strategy', {})
         }
         
-        # Criar plano de execução
-        execution_plan = {
-            'steps': [
-                {'name': 'Gerar áudio do roteiro', 'duration': 30},
-                {'name': 'Gerar legendas temporizadas', 'duration': 20},
-                {'name': 'Buscar vídeos de fundo baseados no roteiro', 'duration': 45},
-                {'name': 'Aplicar efeitos visuais para seção: intro', 'duration': 60},
-                {'name': 'Aplicar efeitos visuais para seção: development', 'duration': 60},
-                {'name': 'Aplicar efeitos visuais para seção: climax', 'duration': 60},
-                {'name': 'Aplicar efeitos visuais para seção: conclusion', 'duration': 60},
-                {'name': 'Aplicar efeitos sonoros do template', 'duration': 40},
-                {'name': 'Renderizar vídeo final com todos os elementos', 'duration': 120}
-            ],
-            'estimated_duration': 495  # 8.25 minutos
-        }
+        # Timeline prevista para a duração estimada do template (a real é compilada no render)
+        duration_range = template.get('duration_range', {})
+        estimated_duration = (duration_range.get('min', 45) + duration_range.get('max', 60)) / 2
+        plan = RenderPlan(template_id=template_id, template_name=template.get('name', template_id),
+                          sections=self._apply_template_effects('', template))
+        timeline = compile_timeline(plan, estimated_duration)
+        timeline.describe()
         
         return {
             'success': True,
             'template_id': template_id,
             'template_name': template.get('name'),
             'render_structure': render_structure,
-            'execution_plan': execution_plan,
+            'timeline': timeline.to_dict(),
             'assets_ready': assets_ready
         }
 
@@ -457,8 +391,8 @@ def main():
             print(f"   ✅ Estrutura de renderização criada!")
             print(f"   Template: {result['template_name']}")
             print(f"   Seções: {len(result['render_structure']['sections'])}")
-            print(f"   Passos: {len(result['execution_plan']['steps'])}")
-            print(f"   Tempo estimado: {result['execution_plan']['estimated_duration']}s")
+            print(f"   Seções na timeline: {len(result['timeline']['sections'])}")
+            print(f"   Duração estimada: {result['timeline']['duration']}s")
         else:
             print(f"   ❌ Erro: {result['error']}")
 
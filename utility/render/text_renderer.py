@@ -0,0 +1,102 @@
+import os
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from moviepy.editor import ImageClip
+
+# Nomes de fonte no estilo ImageMagick ("Arial-Bold") mapeados para arquivos TrueType
+FONT_ALIASES = {
+    'Arial-Bold': ['Arial-Bold.ttf', 'arialbd.ttf', 'Arial Bold.ttf',
+                   'LiberationSans-Bold.ttf', 'DejaVuSans-Bold.ttf'],
+    'Arial': ['Arial.ttf', 'arial.ttf', 'LiberationSans-Regular.ttf', 'DejaVuSans.ttf'],
+}
+
+FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+    'C:\\Windows\\Fonts',
+]
+
+def _font_candidates(font: str):
+    """Lista os nomes de arquivo a tentar para uma fonte"""
+    candidates = [font]
+    candidates.extend(FONT_ALIASES.get(font, []))
+    if not font.lower().endswith(('.ttf', '.otf')):
+        candidates.append(f"{font}.ttf")
+    return candidates
+
+def _find_font_file(filename: str):
+    """Procura um arquivo de fonte nos diretórios do sistema"""
+    for font_dir in FONT_DIRS:
+        if not os.path.isdir(font_dir):
+            continue
+        for root, _, files in os.walk(font_dir):
+            if filename in files:
+                return os.path.join(root, filename)
+    return None
+
+@lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int):
+    """Carrega (e mantém em cache) uma fonte TrueType pelo nome ou caminho"""
+    for candidate in _font_candidates(font):
+        try:
+            return ImageFont.truetype(candidate, fontsize)
+        except OSError:
+            font_path = _find_font_file(candidate)
+            if font_path:
+                return ImageFont.truetype(font_path, fontsize)
+
+    print(f"⚠️ Fonte não encontrada: {font}, usando fonte padrão")
+    return ImageFont.load_default(size=fontsize)
+
+@lru_cache(maxsize=512)
+def render_text(text: str, font: str, fontsize: int, color: str,
+                stroke_color: str = "black", stroke_width: int = 0,
+                margin_bottom: int = 0) -> np.ndarray:
+    """Rasteriza uma linha de texto em um frame RGBA (uint8) reutilizável"""
+    pil_font = load_font(font, fontsize)
+
+    left, top, right, bottom = pil_font.getbbox(text, stroke_width=stroke_width)
+    width = max(1, right - left)
+    height = max(1, bottom - top)
+
+    image = Image.new('RGBA', (width, height + margin_bottom), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.text((-left, -top), text, font=pil_font, fill=color,
+              stroke_width=stroke_width, stroke_fill=stroke_color)
+
+    frame = np.asarray(image)
+    # O frame é compartilhado pelo cache, então não pode ser alterado
+    frame.setflags(write=False)
+    return frame
+
+@lru_cache(maxsize=512)
+def render_caption_layers(text: str, font: str, fontsize: int, color: str,
+                          stroke_color: str = "black", stroke_width: int = 0,
+                          margin_bottom: int = 0):
+    """Retorna a imagem RGB e a máscara (0-1) de uma legenda, em cache"""
+    frame = render_text(text, font, fontsize, color, stroke_color, stroke_width, margin_bottom)
+    rgb = frame[:, :, :3]
+    mask = frame[:, :, 3] / 255.0
+    mask.setflags(write=False)
+    return rgb, mask
+
+def make_caption_clip(text: str, start: float, end: float, font: str = 'Arial-Bold',
+                      fontsize: int = 90, color: str = 'white', stroke_color: str = "black",
+                      stroke_width: int = 4, margin_bottom: int = 0,
+                      fade_duration: float = 0.3) -> ImageClip:
+    """Cria o clip de uma legenda a partir do frame rasterizado em cache"""
+    rgb, mask = render_caption_layers(text, font, fontsize, color, stroke_color,
+                                      stroke_width, margin_bottom)
+    mask_clip = ImageClip(mask, ismask=True)
+
+    return (ImageClip(rgb)
+            .set_mask(mask_clip)
+            .set_start(start)
+            .set_end(end)
+            .set_position(("center", "bottom"))
+            .crossfadein(fade_duration)
+            .crossfadeout(fade_duration))
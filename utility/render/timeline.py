@@ -0,0 +1,141 @@
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Distância máxima (s) para alinhar a troca de seção ao fim de uma legenda
+CAPTION_SNAP_TOLERANCE = 1.5
+
+@dataclass(frozen=True)
+class TimelineSection:
+    """Trecho concreto da timeline: onde a seção começa/termina e o que toca nela"""
+    name: str
+    start: float
+    end: float
+    color_scheme: str = ''
+    visual_style: str = ''
+    audio_effects: Tuple[str, ...] = ()
+    video_effects: Tuple[str, ...] = ()
+    background_music: str = ''
+    effect_blend: str = 'screen'
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+@dataclass(frozen=True)
+class RenderTimeline:
+    """Timeline ordenada executada pelo renderizador"""
+    duration: float
+    sections: Tuple[TimelineSection, ...] = ()
+
+    def section_at(self, t: float) -> Optional[TimelineSection]:
+        """Seção ativa no instante t"""
+        for section in self.sections:
+            if section.start <= t < section.end:
+                return section
+        return self.sections[-1] if self.sections and t >= self.sections[-1].start else None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def describe(self):
+        """Imprime a timeline compilada"""
+        print(f"🗺️ Timeline compilada ({self.duration:.1f}s):")
+        for section in self.sections:
+            print(f"   • {section.name}: {section.start:.1f}s-{section.end:.1f}s "
+                  f"({section.color_scheme or 'sem grading'}, {len(section.video_effects)} efeitos visuais, "
+                  f"{len(section.audio_effects)} efeitos sonoros)")
+
+def parse_duration_range(duration: str) -> Optional[Tuple[float, float]]:
+    """Converte a duração de uma seção do template ('3-5s', '30s') em (mínimo, máximo)"""
+    numbers = re.findall(r'\d+(?:\.\d+)?', duration or '')
+    if not numbers:
+        return None
+    values = [float(number) for number in numbers[:2]]
+    return (values[0], values[-1])
+
+def _fit_durations(ranges: List[Optional[Tuple[float, float]]], total: float) -> List[float]:
+    """Durações que somam `total`, proporcionais ao ponto médio e respeitando as faixas quando possível"""
+    midpoints = [sum(r) / 2 if r else 0.0 for r in ranges]
+    if sum(midpoints) <= 0:
+        return [total / len(ranges)] * len(ranges)
+
+    # Seções sem faixa usam a média das demais
+    known = [m for m in midpoints if m > 0]
+    midpoints = [m if m > 0 else sum(known) / len(known) for m in midpoints]
+    bounds = [r if r else (0.0, float('inf')) for r in ranges]
+
+    def fitted(scale: float) -> List[float]:
+        return [min(max(m * scale, low), high) for m, (low, high) in zip(midpoints, bounds)]
+
+    # Fora do que as faixas permitem: escala proporcional simples
+    if not sum(low for low, _ in bounds) <= total <= sum(high for _, high in bounds):
+        scale = total / sum(midpoints)
+        return [m * scale for m in midpoints]
+
+    # Busca binária na escala até a soma das durações limitadas bater com o total
+    low_scale, high_scale = 0.0, 1.0
+    while sum(fitted(high_scale)) < total:
+        high_scale *= 2
+    for _ in range(60):
+        middle = (low_scale + high_scale) / 2
+        if sum(fitted(middle)) < total:
+            low_scale = middle
+        else:
+            high_scale = middle
+    durations = fitted(high_scale)
+    # Ajuste fino do arredondamento na última seção
+    durations[-1] += total - sum(durations)
+    return durations
+
+def _snap_to_captions(boundaries: List[float], timed_captions, tolerance: float) -> List[float]:
+    """Move cada troca de seção para o fim de legenda mais próximo (sem cortar frases)"""
+    if not timed_captions:
+        return boundaries
+    caption_ends = sorted(t2 for (t1, t2), text in timed_captions)
+
+    snapped = []
+    previous = 0.0
+    for boundary in boundaries:
+        candidates = [end for end in caption_ends if previous < end and abs(end - boundary) <= tolerance]
+        if candidates:
+            boundary = min(candidates, key=lambda end: abs(end - boundary))
+        snapped.append(max(boundary, previous))
+        previous = snapped[-1]
+    return snapped
+
+def compile_timeline(render_plan, duration: float, timed_captions=None,
+                     snap_tolerance: float = CAPTION_SNAP_TOLERANCE) -> RenderTimeline:
+    """Compila as seções do template e os tempos reais da narração em uma timeline concreta"""
+    if render_plan is None or not render_plan.sections or duration <= 0:
+        return RenderTimeline(duration=max(duration, 0.0))
+
+    sections = render_plan.sections
+    durations = _fit_durations([parse_duration_range(section.duration) for section in sections], duration)
+
+    # Fronteiras internas (a última é sempre o fim da narração)
+    boundaries = []
+    elapsed = 0.0
+    for section_duration in durations[:-1]:
+        elapsed += section_duration
+        boundaries.append(elapsed)
+    boundaries = _snap_to_captions(boundaries, timed_captions, snap_tolerance)
+
+    starts = [0.0] + boundaries
+    ends = boundaries + [duration]
+    timeline_sections = tuple(
+        TimelineSection(
+            name=section.name,
+            start=start,
+            end=min(end, duration),
+            color_scheme=section.color_scheme,
+            visual_style=section.visual_style,
+            audio_effects=section.audio_effects,
+            video_effects=section.video_effects,
+            background_music=section.background_music,
+            effect_blend=section.effect_blend
+        )
+        for section, start, end in zip(sections, starts, ends)
+        if end > start
+    )
+    return RenderTimeline(duration=duration, sections=timeline_sections)
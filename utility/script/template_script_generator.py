@@ -7,13 +7,15 @@ from pathlib import Path
 # Adicionar o diretório raiz ao path para importar módulos
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from utility.templates.template_manager import TemplateManager
+from utility.templates.template_manager import get_template_manager
+from utility.templates.asset_catalog import get_asset_catalog
+from utility.templates.template_recommender import get_template_recommender
 
 class TemplateScriptGenerator:
     """Gerador de roteiro adaptativo baseado em templates"""
     
     def __init__(self):
-        self.template_manager = TemplateManager()
+        self.template_manager = get_template_manager()
         self.script_templates = {
             'cinematic_religious': {
                 'intro_patterns': [
@@ -314,24 +316,21 @@ class TemplateScriptGenerator:
             'background_music': []
         }
         
-        # Verificar assets em cada seção
+        # Verificar assets em cada seção (consultas ao catálogo em memória)
+        catalog = get_asset_catalog()
         sections = template.get('sections', {})
         for section_name, section_data in sections.items():
             assets = section_data.get('assets', {})
             
             # Verificar efeitos de áudio
-            for effect in assets.get('audio_effects', []):
-                if not os.path.exists(effect):
-                    missing_assets['audio_effects'].append(effect)
+            missing_assets['audio_effects'].extend(catalog.missing(assets.get('audio_effects', [])))
             
             # Verificar efeitos de vídeo
-            for effect in assets.get('video_effects', []):
-                if not os.path.exists(effect):
-                    missing_assets['video_effects'].append(effect)
+            missing_assets['video_effects'].extend(catalog.missing(assets.get('video_effects', [])))
             
             # Verificar música de fundo
             bg_music = assets.get('background_music', '')
-            if bg_music and not os.path.exists(bg_music):
+            if bg_music and not catalog.exists(bg_music):
                 missing_assets['background_music'].append(bg_music)
         
         total_missing = sum(len(assets) for assets in missing_assets.values())
@@ -353,41 +352,7 @@ class TemplateScriptGenerator:
     
     def get_template_suggestions(self, topic: str) -> List[Dict]:
         """Sugere templates apropriados para um tópico"""
-        templates = self.template_manager.list_templates()
-        suggestions = []
-        
-        # Análise simples baseada em palavras-chave
-        topic_lower = topic.lower()
-        
-        for template in templates:
-            score = 0
-            reasons = []
-            
-            # Verificar se é conteúdo religioso/bíblico
-            if any(word in topic_lower for word in ['bíblico', 'religioso', 'profecia', 'apocalipse', 'deus', 'jesus', 'bíblia']):
-                if 'religioso' in template['name'].lower() or 'cinematográfico' in template['name'].lower():
-                    score += 3
-                    reasons.append("Conteúdo religioso detectado")
-            
-            # Verificar se é conteúdo educativo/curioso
-            if any(word in topic_lower for word in ['curioso', 'interessante', 'fato', 'descoberta', 'ciência', 'história']):
-                if 'curioso' in template['name'].lower() or 'fatos' in template['name'].lower():
-                    score += 2
-                    reasons.append("Conteúdo educativo detectado")
-            
-            if score > 0:
-                suggestions.append({
-                    'template_id': template['id'],
-                    'name': template['name'],
-                    'description': template['description'],
-                    'score': score,
-                    'reasons': reasons
-                })
-        
-        # Ordenar por score
-        suggestions.sort(key=lambda x: x['score'], reverse=True)
-        
-        return suggestions
+        return get_template_recommender().recommend(topic)
     
     def generate_with_suggestions(self, topic: str) -> Dict:
         """Gera roteiro com sugestão automática de template"""
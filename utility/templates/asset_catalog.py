@@ -0,0 +1,259 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+# Diretório raiz dos assets dos templates
+ASSETS_DIR = os.environ.get("ASSETS_DIR", "assets")
+
+# Orçamento de memória do pool de assets decodificados (MB)
+ASSET_POOL_MB = int(os.environ.get("ASSET_POOL_MB", "256"))
+
+# Intervalo (s) da verificação de mudanças no diretório de assets
+ASSET_WATCH_INTERVAL = float(os.environ.get("ASSET_WATCH_INTERVAL", "5"))
+
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.aac', '.m4a', '.ogg', '.flac'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.webm', '.mkv'}
+
+@dataclass(frozen=True)
+class AssetInfo:
+    """Metadados de um asset (duração/resolução/hash preenchidos na sondagem)"""
+    path: str
+    size: int
+    mtime_ns: int
+    kind: str = ''
+    duration: float = 0.0
+    sample_rate: int = 0
+    width: int = 0
+    height: int = 0
+    sha1: str = ''
+    probed: bool = False
+
+def _asset_key(path: str) -> str:
+    """Chave única de um caminho (relativo ou absoluto)"""
+    return os.path.abspath(path)
+
+def _asset_kind(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in AUDIO_EXTENSIONS:
+        return 'audio'
+    if extension in VIDEO_EXTENSIONS:
+        return 'video'
+    return ''
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AssetPool:
+    """Pool LRU limitado por bytes para assets decodificados"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, nbytes: int):
+        with self._lock:
+            if key in self._entries:
+                self.used_bytes -= self._entries.pop(key)[1]
+            # Assets maiores que o orçamento inteiro não ficam no pool
+            if nbytes > self.max_bytes:
+                return value
+            self._entries[key] = (value, nbytes)
+            self.used_bytes += nbytes
+            while self.used_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted_bytes
+        return value
+
+    def evict_path(self, path_key: str):
+        """Remove todas as entradas derivadas de um arquivo (chave começa pelo caminho)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path_key]:
+                self.used_bytes -= self._entries.pop(key)[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+class AssetCatalog:
+    """Catálogo dos assets dos templates: existência e metadados em memória, pool de decodificados"""
+
+    def __init__(self, assets_dir: str = ASSETS_DIR, pool_bytes: int = ASSET_POOL_MB * 1024 * 1024):
+        self.assets_dir = assets_dir
+        self.root_key = _asset_key(assets_dir)
+        self.pool = AssetPool(pool_bytes)
+        self._assets: Dict[str, AssetInfo] = {}
+        # Incrementada a cada mudança no índice (usada para invalidar caches derivados)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.scan()
+
+    def _scan_files(self) -> Dict[str, os.stat_result]:
+        files = {}
+        for root, _, names in os.walk(self.assets_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    files[_asset_key(path)] = os.stat(path)
+                except OSError:
+                    continue
+        return files
+
+    def scan(self) -> int:
+        """(Re)indexa o diretório de assets e invalida o que mudou; retorna quantos mudaram"""
+        files = self._scan_files()
+        changed = 0
+        with self._lock:
+            for key in list(self._assets):
+                if key not in files:
+                    del self._assets[key]
+                    self.pool.evict_path(key)
+                    changed += 1
+            for key, stat in files.items():
+                current = self._assets.get(key)
+                if current and current.mtime_ns == stat.st_mtime_ns and current.size == stat.st_size:
+                    continue
+                if current:
+                    self.pool.evict_path(key)
+                self._assets[key] = AssetInfo(path=key, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                              kind=_asset_kind(key))
+                changed += 1
+            if changed:
+                self.version += 1
+        return changed
+
+    def _in_assets_dir(self, key: str) -> bool:
+        return key.startswith(self.root_key + os.sep)
+
+    def exists(self, path: str) -> bool:
+        """Verifica a existência do asset (consulta em dicionário para arquivos de assets/)"""
+        if not path:
+            return False
+        key = _asset_key(path)
+        if self._in_assets_dir(key):
+            return key in self._assets
+        return os.path.exists(path)
+
+    def get(self, path: str) -> Optional[AssetInfo]:
+        """Metadados básicos do asset (sem sondar o arquivo)"""
+        return self._assets.get(_asset_key(path))
+
+    def describe(self, path: str) -> Optional[AssetInfo]:
+        """Metadados completos: duração, taxa de amostragem, resolução e hash (sondados uma vez)"""
+        info = self.get(path)
+        if info is None or info.probed:
+            return info
+
+        values = {'probed': True}
+        try:
+            from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+            infos = ffmpeg_parse_infos(info.path)
+            values['duration'] = float(infos.get('duration') or 0.0)
+            if infos.get('audio_found'):
+                values['sample_rate'] = int(infos.get('audio_fps') or 0)
+            if infos.get('video_found'):
+                values['width'], values['height'] = infos['video_size']
+            values['sha1'] = _file_sha1(info.path)
+        except Exception as e:
+            print(f"⚠️ Não foi possível sondar o asset {path}: {e}")
+
+        info = replace(info, **values)
+        with self._lock:
+            # Só grava se o arquivo não mudou durante a sondagem
+            current = self._assets.get(info.path)
+            if current and current.mtime_ns == info.mtime_ns:
+                self._assets[info.path] = info
+        return info
+
+    def probe_all(self):
+        """Sonda todos os assets (para rodar em background na inicialização)"""
+        for key in list(self._assets):
+            self.describe(key)
+        print(f"🗂️ Catálogo de assets: {len(self._assets)} arquivos sondados")
+
+    def missing(self, paths) -> list:
+        """Lista os caminhos inexistentes"""
+        return [path for path in paths if not self.exists(path)]
+
+    def load_audio(self, path: str, sample_rate: int):
+        """PCM decodificado do asset, reaproveitado entre jobs pelo pool"""
+        from utility.audio.audio_mixer import decode_pcm
+
+        key = _asset_key(path)
+        info = self._assets.get(key)
+        pool_key = (key, 'pcm', sample_rate, info.mtime_ns if info else 0)
+        pcm = self.pool.get(pool_key)
+        if pcm is None:
+            pcm = decode_pcm(path, sample_rate)
+            self.pool.put(pool_key, pcm, pcm.nbytes)
+        return pcm
+
+    def prescaled_effect(self, path: str, size, fps: int) -> str:
+        """Caminho do efeito de vídeo pré-escalado para a resolução/fps de saída
+
+        Os frames continuam sendo lidos em streaming do arquivo pré-escalado;
+        o pool guarda apenas a resolução do caminho no cache em disco.
+        """
+        from utility.render.effect_overlay import prescale_effect
+
+        key = _asset_key(path)
+        info = self._assets.get(key)
+        pool_key = (key, 'scaled', tuple(size), fps, info.mtime_ns if info else 0)
+        scaled_path = self.pool.get(pool_key)
+        if scaled_path is None or not os.path.exists(scaled_path):
+            scaled_path = prescale_effect(path, size, fps)
+            self.pool.put(pool_key, scaled_path, len(scaled_path))
+        return scaled_path
+
+    def start_watcher(self, interval: float = ASSET_WATCH_INTERVAL):
+        """Inicia a verificação periódica de mudanças nos assets (thread daemon)"""
+        if self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    changed = self.scan()
+                    if changed:
+                        print(f"🔄 Catálogo de assets atualizado: {changed} alterações")
+                except Exception as e:
+                    print(f"⚠️ Erro ao verificar assets: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="asset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def __len__(self):
+        return len(self._assets)
+
+_catalog: Optional[AssetCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_asset_catalog() -> AssetCatalog:
+    """Catálogo compartilhado do processo (criado no primeiro uso)"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = AssetCatalog()
+                print(f"🗂️ Catálogo de assets: {len(_catalog)} arquivos em {_catalog.assets_dir}")
+    return _catalog
@@ -1,48 +1,188 @@
+import hashlib
 import json
 import os
+import threading
+import time
 from typing import Dict, List, Optional
 from pathlib import Path
 
+from utility.templates.asset_catalog import get_asset_catalog
+
+# Intervalo mínimo (s) entre verificações de mudança nos arquivos de template
+TEMPLATE_RELOAD_INTERVAL = float(os.environ.get("TEMPLATE_RELOAD_INTERVAL", "2"))
+
+# Esquema mínimo dos templates: campo -> tipo esperado
+TEMPLATE_SCHEMA = {
+    'template': str,
+    'name': str,
+    'sections': dict,
+}
+TEMPLATE_OPTIONAL_FIELDS = {
+    'description': str,
+    'version': str,
+    'tags': list,
+    'keywords': list,
+    'duration_range': dict,
+    'pauses_strategy': dict,
+    'visual_settings': dict,
+    'audio_settings': dict,
+    'render_settings': dict,
+    'script_generation': dict,
+}
+SECTION_ASSET_FIELDS = {
+    'audio_effects': list,
+    'video_effects': list,
+    'background_music': str,
+}
+
+def validate_template(template_data: Dict) -> List[str]:
+    """Valida um template contra o esquema e retorna a lista de erros"""
+    if not isinstance(template_data, dict):
+        return ['template não é um objeto JSON']
+
+    errors = []
+    for field, expected in TEMPLATE_SCHEMA.items():
+        if field not in template_data:
+            errors.append(f"campo obrigatório ausente: {field}")
+        elif not isinstance(template_data[field], expected):
+            errors.append(f"campo {field} deve ser {expected.__name__}")
+
+    for field, expected in TEMPLATE_OPTIONAL_FIELDS.items():
+        if field in template_data and not isinstance(template_data[field], expected):
+            errors.append(f"campo {field} deve ser {expected.__name__}")
+
+    for section_name, section in (template_data.get('sections') or {}).items():
+        if not isinstance(section, dict):
+            errors.append(f"seção {section_name} deve ser objeto")
+            continue
+        if 'duration' in section and not isinstance(section['duration'], str):
+            errors.append(f"seção {section_name}: duration deve ser texto (ex: '3-5s')")
+        assets = section.get('assets', {})
+        if not isinstance(assets, dict):
+            errors.append(f"seção {section_name}: assets deve ser objeto")
+            continue
+        for field, expected in SECTION_ASSET_FIELDS.items():
+            if field in assets and not isinstance(assets[field], expected):
+                errors.append(f"seção {section_name}: assets.{field} deve ser {expected.__name__}")
+
+    return errors
+
 class TemplateManager:
     """Gerenciador de templates para geração de vídeos"""
     
     def __init__(self, templates_dir: str = "utility/templates"):
         self.templates_dir = Path(templates_dir)
         self.templates = {}
+        self.tag_index: Dict[str, List[str]] = {}
+        self.keyword_index: Dict[str, List[str]] = {}
+        self.etag = ''
+        self.templates_json = '[]'
+        # Sobe a cada carga: caches derivados do conteúdo completo dos templates usam este valor
+        self.generation = 0
+        self._summaries: List[Dict] = []
+        self._file_mtimes: Dict[str, int] = {}
+        self._last_check = 0.0
+        self._lock = threading.RLock()
         self.load_templates()
     
+    def _template_files(self) -> Dict[str, int]:
+        """Arquivos de template e seus mtimes"""
+        files = {}
+        for template_file in self.templates_dir.glob("*.json"):
+            try:
+                files[str(template_file)] = template_file.stat().st_mtime_ns
+            except OSError:
+                continue
+        return files
+    
     def load_templates(self):
-        """Carrega todos os templates disponíveis"""
+        """Carrega todos os templates disponíveis e reconstrói os índices"""
         if not self.templates_dir.exists():
             print(f"❌ Diretório de templates não encontrado: {self.templates_dir}")
             return
         
-        for template_file in self.templates_dir.glob("*.json"):
+        file_mtimes = self._template_files()
+        templates = {}
+        for template_file in sorted(file_mtimes):
             try:
                 with open(template_file, 'r', encoding='utf-8') as f:
                     template_data = json.load(f)
-                    template_id = template_data.get('template')
-                    if template_id:
-                        self.templates[template_id] = template_data
-                        print(f"✅ Template carregado: {template_data.get('name', template_id)}")
+                errors = validate_template(template_data)
+                if errors:
+                    print(f"❌ Template inválido {template_file}: {'; '.join(errors)}")
+                    continue
+                template_id = template_data.get('template')
+                if template_id:
+                    templates[template_id] = template_data
+                    print(f"✅ Template carregado: {template_data.get('name', template_id)}")
             except Exception as e:
                 print(f"❌ Erro ao carregar template {template_file}: {e}")
-    
-    def get_template(self, template_id: str) -> Optional[Dict]:
-        """Retorna um template específico"""
-        return self.templates.get(template_id)
-    
-    def list_templates(self) -> List[Dict]:
-        """Lista todos os templates disponíveis"""
-        return [
+        
+        # Índices e resposta da API são montados uma vez por carga
+        tag_index: Dict[str, List[str]] = {}
+        keyword_index: Dict[str, List[str]] = {}
+        for template_id, template in templates.items():
+            for tag in template.get('tags', []):
+                tag_index.setdefault(str(tag).lower(), []).append(template_id)
+            for keyword in template.get('keywords', []):
+                keyword_index.setdefault(str(keyword).lower(), []).append(template_id)
+        
+        summaries = [
             {
                 'id': template_id,
                 'name': template.get('name', template_id),
                 'description': template.get('description', ''),
-                'version': template.get('version', '1.0')
+                'version': template.get('version', '1.0'),
+                'tags': template.get('tags', [])
             }
-            for template_id, template in self.templates.items()
+            for template_id, template in templates.items()
         ]
+        templates_json = json.dumps(summaries, ensure_ascii=False)
+        
+        # Troca atômica: leitores concorrentes veem a versão antiga ou a nova, nunca parcial
+        with self._lock:
+            self.templates = templates
+            self.tag_index = tag_index
+            self.keyword_index = keyword_index
+            self._summaries = summaries
+            self.templates_json = templates_json
+            self.etag = hashlib.sha1(templates_json.encode('utf-8')).hexdigest()[:16]
+            self._file_mtimes = file_mtimes
+            self._last_check = time.monotonic()
+            self.generation += 1
+    
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """Recarrega os templates se algum arquivo mudou (verificação limitada por intervalo)"""
+        now = time.monotonic()
+        if not force and now - self._last_check < TEMPLATE_RELOAD_INTERVAL:
+            return False
+        self._last_check = now
+        
+        if self._template_files() == self._file_mtimes:
+            return False
+        print("🔄 Arquivos de template alterados, recarregando...")
+        self.load_templates()
+        return True
+    
+    def get_template(self, template_id: str) -> Optional[Dict]:
+        """Retorna um template específico"""
+        self.reload_if_changed()
+        return self.templates.get(template_id)
+    
+    def list_templates(self) -> List[Dict]:
+        """Lista todos os templates disponíveis (lista pré-montada, não modificar)"""
+        self.reload_if_changed()
+        return self._summaries
+    
+    def find_by_tag(self, tag: str) -> List[str]:
+        """IDs dos templates com a tag"""
+        self.reload_if_changed()
+        return self.tag_index.get(tag.lower(), [])
+    
+    def find_by_keyword(self, keyword: str) -> List[str]:
+        """IDs dos templates associados à palavra-chave"""
+        self.reload_if_changed()
+        return self.keyword_index.get(keyword.lower(), [])
     
     def get_template_sections(self, template_id: str) -> Optional[Dict]:
         """Retorna as seções de um template"""
@@ -109,16 +249,14 @@ class TemplateManager:
             'background_music': []
         }
         
+        catalog = get_asset_catalog()
         for section_name, section in template.get('sections', {}).items():
             assets = section.get('assets', {})
             for asset_type, asset_list in assets.items():
                 if isinstance(asset_list, list):
-                    for asset_path in asset_list:
-                        if not os.path.exists(asset_path):
-                            missing_assets[asset_type].append(asset_path)
+                    missing_assets[asset_type].extend(catalog.missing(asset_list))
                 elif isinstance(asset_list, str):
-                    if not os.path.exists(asset_list):
-                        missing_assets[asset_type].append(asset_list)
+                    missing_assets[asset_type].extend(catalog.missing([asset_list]))
         
         return missing_assets
     
@@ -192,6 +330,18 @@ class TemplateManager:
             'has_missing_assets': any(missing_assets.values())
         }
 
+_template_manager: Optional[TemplateManager] = None
+_template_manager_lock = threading.Lock()
+
+def get_template_manager() -> TemplateManager:
+    """Registro de templates compartilhado do processo (carregado no primeiro uso)"""
+    global _template_manager
+    if _template_manager is None:
+        with _template_manager_lock:
+            if _template_manager is None:
+                _template_manager = TemplateManager()
+    return _template_manager
+
 def main():
     """Teste do TemplateManager"""
     print("🎬 TESTE DO TEMPLATE MANAGER")
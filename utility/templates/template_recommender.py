@@ -0,0 +1,199 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utility.templates.asset_catalog import get_asset_catalog
+from utility.templates.template_manager import get_template_manager
+
+# Peso de cada campo do template no índice
+FIELD_WEIGHTS = {
+    'keywords': 3.0,
+    'tags': 2.5,
+    'name': 2.0,
+    'tone': 1.0,
+    'narrative_purpose': 1.0,
+    'description': 1.0,
+}
+
+FIELD_LABELS = {
+    'keywords': 'Palavra-chave',
+    'tags': 'Tag',
+    'name': 'Nome do template',
+    'tone': 'Tom',
+    'narrative_purpose': 'Propósito narrativo',
+    'description': 'Descrição',
+}
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'um', 'uma', 'com', 'por', 'para', 'que', 'se', 'ao', 'sobre', 'the', 'and', 'of',
+}
+
+# Variações da mesma palavra ("biblia", "biblico", "biblica") casam pelo prefixo comum, desde que ele
+# cubra a maior parte da palavra menor ("profe" não liga "professor" a "profecia")
+MIN_PREFIX_COVERAGE = 0.8
+
+# Termos do índice agrupados pelos primeiros caracteres (tamanho mínimo de um token)
+PREFIX_BUCKET = 3
+
+# Template pronto se pelo menos 70% dos assets estão disponíveis
+ASSETS_READY_RATIO = 0.7
+
+QUERY_CACHE_SIZE = 512
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos"""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def tokenize(text: str) -> List[str]:
+    """Palavras normalizadas, sem stopwords"""
+    return [word for word in re.findall(r'[a-z0-9]+', normalize_text(text).replace('_', ' '))
+            if word not in STOPWORDS and len(word) >= PREFIX_BUCKET]
+
+def words_match(first: str, second: str) -> bool:
+    """Mesma palavra ou variação: o prefixo comum cobre MIN_PREFIX_COVERAGE da palavra menor"""
+    if first == second:
+        return True
+    shared = len(os.path.commonprefix([first, second]))
+    return shared / min(len(first), len(second)) >= MIN_PREFIX_COVERAGE
+
+def template_assets_ready(template: Dict, catalog) -> bool:
+    """Verifica se a maior parte dos assets do template existe (consultas ao catálogo)"""
+    total_assets = 0
+    missing_assets = 0
+    for section in template.get('sections', {}).values():
+        assets = section.get('assets', {})
+        paths = list(assets.get('audio_effects', [])) + list(assets.get('video_effects', []))
+        if assets.get('background_music'):
+            paths.append(assets['background_music'])
+        total_assets += len(paths)
+        missing_assets += len(catalog.missing(paths))
+    return total_assets > 0 and (missing_assets / total_assets) <= 1 - ASSETS_READY_RATIO
+
+class TemplateRecommender:
+    """Recomendação de templates por índice invertido sobre os metadados dos templates"""
+
+    def __init__(self, template_manager=None, catalog=None):
+        self.template_manager = template_manager or get_template_manager()
+        self.catalog = catalog or get_asset_catalog()
+        # palavra -> {template_id: (peso, motivo)}
+        self._index: Dict[str, Dict[str, Tuple[float, str]]] = {}
+        # prefixo -> palavras do índice (candidatas a variação de uma palavra da consulta)
+        self._buckets: Dict[str, List[str]] = {}
+        self._index_generation = None
+        self._ready: Dict[str, bool] = {}
+        self._ready_version: Optional[Tuple[int, int]] = None
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _template_fields(self, template: Dict):
+        """Textos indexáveis do template, por campo"""
+        yield 'name', template.get('name', '')
+        yield 'description', template.get('description', '')
+        for keyword in template.get('keywords', []):
+            yield 'keywords', keyword
+        for tag in template.get('tags', []):
+            yield 'tags', tag
+        yield 'tone', template.get('script_generation', {}).get('tone', '')
+        for section in template.get('sections', {}).values():
+            yield 'tone', section.get('tone', '')
+            yield 'tone', section.get('visual_style', '')
+            yield 'narrative_purpose', section.get('narrative_purpose', '')
+
+    def _ensure_index(self):
+        """Reconstrói o índice quando os templates mudam (qualquer campo, não só o resumo da listagem)"""
+        self.template_manager.reload_if_changed()
+        generation = self.template_manager.generation
+        if generation == self._index_generation:
+            return
+
+        index: Dict[str, Dict[str, Tuple[float, str]]] = {}
+        for template_id, template in self.template_manager.templates.items():
+            for field, text in self._template_fields(template):
+                weight = FIELD_WEIGHTS[field]
+                for word in tokenize(text):
+                    postings = index.setdefault(word, {})
+                    current = postings.get(template_id)
+                    # Por termo vale o campo de maior peso
+                    if current is None or weight > current[0]:
+                        postings[template_id] = (weight, f"{FIELD_LABELS[field]}: {word}")
+
+        buckets: Dict[str, List[str]] = {}
+        for word in index:
+            buckets.setdefault(word[:PREFIX_BUCKET], []).append(word)
+
+        with self._lock:
+            self._index = index
+            self._buckets = buckets
+            self._index_generation = generation
+            self._queries.clear()
+        print(f"🔎 Índice de recomendação: {len(index)} termos")
+
+    def assets_ready(self, template_id: str) -> bool:
+        """Prontidão dos assets, recalculada só quando templates ou assets mudam"""
+        version = (self.template_manager.generation, self.catalog.version)
+        if version != self._ready_version:
+            self._ready = {}
+            self._ready_version = version
+        if template_id not in self._ready:
+            template = self.template_manager.templates.get(template_id)
+            self._ready[template_id] = bool(template) and template_assets_ready(template, self.catalog)
+        return self._ready[template_id]
+
+    def recommend(self, topic: str, top_k: int = 5) -> List[Dict]:
+        """Top-k templates para o tópico, com pontuação e motivos"""
+        self._ensure_index()
+        query = tuple(sorted(set(tokenize(topic))))
+        cache_key = (query, top_k)
+
+        ranked = self._queries.get(cache_key)
+        if ranked is None:
+            scores: Dict[str, float] = {}
+            reasons: Dict[str, List[str]] = {}
+            for query_word in query:
+                # Por palavra da consulta vale o termo de maior peso entre as variações que casam
+                best: Dict[str, Tuple[float, str]] = {}
+                for word in self._buckets.get(query_word[:PREFIX_BUCKET], []):
+                    if not words_match(query_word, word):
+                        continue
+                    for template_id, (weight, reason) in self._index[word].items():
+                        if template_id not in best or weight > best[template_id][0]:
+                            best[template_id] = (weight, reason)
+                for template_id, (weight, reason) in best.items():
+                    scores[template_id] = scores.get(template_id, 0.0) + weight
+                    reasons.setdefault(template_id, []).append(reason)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            ranked = [(template_id, score, tuple(reasons[template_id])) for template_id, score in ranked]
+            with self._lock:
+                self._queries[cache_key] = ranked
+                if len(self._queries) > QUERY_CACHE_SIZE:
+                    self._queries.popitem(last=False)
+
+        recommendations = []
+        for template_id, score, template_reasons in ranked:
+            template = self.template_manager.templates.get(template_id, {})
+            recommendations.append({
+                'template_id': template_id,
+                'name': template.get('name', template_id),
+                'description': template.get('description', ''),
+                'score': round(score, 2),
+                'reasons': list(template_reasons),
+                'assets_ready': self.assets_ready(template_id)
+            })
+        return recommendations
+
+_recommender: Optional[TemplateRecommender] = None
+_recommender_lock = threading.Lock()
+
+def get_template_recommender() -> TemplateRecommender:
+    """Recomendador compartilhado do processo"""
+    global _recommender
+    if _recommender is None:
+        with _recommender_lock:
+            if _recommender is None:
+                _recommender = TemplateRecommender()
+    return _recommender
@@ -10,6 +10,23 @@ LOG_TYPE_PEXEL = "PEXEL"
 DIRECTORY_LOG_GPT = ".logs/gpt_logs"
 DIRECTORY_LOG_PEXEL = ".logs/pexel_logs"
 
+# binário do ffmpeg (o mesmo usado pelo MoviePy via imageio-ffmpeg)
+def get_ffmpeg_binary():
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+
+# duração real de um arquivo de mídia (s), lida do cabeçalho pelo ffmpeg
+def get_media_duration(path):
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        return float(ffmpeg_parse_infos(path).get('duration') or 0.0)
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler a duração de {path}: {e}")
+        return None
+
 # method to log response from pexel and openai
 def log_response(log_type, query,response):
     log_entry = {